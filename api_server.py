@@ -0,0 +1,339 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from audio_translation_pipeline import AudioTranslationPipeline
+from src.audio import AUDIO_FORMATS, AudioBuffer, extension_for_format, format_for_content_type
+from src.transport import UPSTREAM_ERRORS
+from src.warmup import Readiness, warmup_enabled
+
+logger = logging.getLogger(__name__)
+
+# Most clips one /pipeline/batch call may carry
+MAX_BATCH = 32
+# Set to 1 on /pipeline or /pipeline/stream to profile that job (see src/profiling.py)
+PROFILE_HEADER = 'X-Vangmaya-Profile'
+
+
+class AudioStore:
+    """
+    The last few generated clips, kept in memory for GET /audio/{job_id}.
+
+    JSON responses link to the audio instead of inlining it as base64; the
+    store is bounded so clients that never fetch their audio cost nothing
+    once it falls out.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self._items: "OrderedDict[str, AudioBuffer]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, job_id: str, audio: AudioBuffer) -> None:
+        with self._lock:
+            self._items[job_id] = audio
+            self._items.move_to_end(job_id)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[AudioBuffer]:
+        with self._lock:
+            return self._items.get(job_id)
+
+
+def create_app(pipeline_factory: Callable[[], AudioTranslationPipeline] = AudioTranslationPipeline):
+    """
+    Build the FastAPI app serving the pipeline and its stages.
+
+    Audio is uploaded either as multipart form data (field "file") or as the
+    raw request body with an audio Content-Type. Options go in the query
+    string. The stage clients are blocking, so each call runs on the
+    threadpool and the event loop stays free for other requests.
+    """
+    from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+    from fastapi.responses import JSONResponse, Response, StreamingResponse
+    from pydantic import BaseModel
+    from starlette.concurrency import run_in_threadpool
+
+    state: Dict[str, Any] = {}
+    audio_store = AudioStore(int(os.getenv('VANGMAYA_API_AUDIO_CACHE', '64')))
+
+    @asynccontextmanager
+    async def lifespan(_app):
+        state['pipeline'] = pipeline_factory()
+        # Warm up in the background; /ready answers 503 until it is done
+        checks = state['pipeline'].warm_up_checks() if warmup_enabled() else {}
+        state['readiness'] = Readiness(checks).start()
+        yield
+        state['readiness'].stop()
+        state['pipeline'].synthesizer.close()
+        state.clear()
+
+    app = FastAPI(title="Vangmaya API", lifespan=lifespan)
+
+    class TranslateRequest(BaseModel):
+        text: str
+        source: str = "en"
+        target: str
+
+    class TranslateBatchRequest(BaseModel):
+        texts: List[str]
+        source: str = "en"
+        target: str
+
+    @app.exception_handler(ValueError)
+    async def bad_request(_request, e: ValueError):
+        return JSONResponse(status_code=400, content={'detail': str(e)})
+
+    async def upstream_error(_request, e: Exception):
+        logger.error(f"Upstream failed: {str(e)}")
+        return JSONResponse(status_code=502, content={'detail': str(e)})
+
+    for error_type in UPSTREAM_ERRORS:
+        app.add_exception_handler(error_type, upstream_error)
+
+    @app.exception_handler(Exception)
+    async def internal_error(_request, e: Exception):
+        # Our own bugs: log the traceback, but keep internals out of the response
+        logger.exception(f"Request failed: {str(e)}")
+        return JSONResponse(status_code=500, content={'detail': 'Internal server error'})
+
+    def check_format(audio_format: str) -> None:
+        if audio_format not in AUDIO_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format {audio_format}. "
+                                                        f"Choose from: {', '.join(AUDIO_FORMATS)}")
+
+    async def spool_upload(request: Request, file: Optional[UploadFile]) -> str:
+        """Write the uploaded audio to a temp file (the stage clients read paths)."""
+        if file is not None:
+            suffix = os.path.splitext(file.filename or '')[1] or '.wav'
+            data = await file.read()
+        else:
+            content_type = request.headers.get('content-type', '')
+            if not content_type.startswith('audio/'):
+                raise HTTPException(status_code=415, detail="Send audio as multipart field 'file' "
+                                                            "or as the body with an audio/* Content-Type")
+            suffix = '.' + extension_for_format(format_for_content_type(content_type))
+            data = await request.body()
+        if not data:
+            raise HTTPException(status_code=400, detail="Empty audio upload")
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix='vangmaya-api-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        return path
+
+    def remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def audio_response(audio: AudioBuffer, audio_format: str) -> Response:
+        return Response(
+            content=audio.to_bytes(audio_format),
+            media_type=audio.content_type(audio_format),
+            headers={'Content-Disposition': f"attachment; filename=speech.{extension_for_format(audio_format)}"}
+        )
+
+    def wants_profile(request: Request) -> bool:
+        # Ask for a profile of one job without turning on VANGMAYA_PROFILE_EVERY
+        return request.headers.get(PROFILE_HEADER, '').lower() in ('1', 'true', 'yes')
+
+    def pipeline_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+        audio_store.put(result['job_id'], result['audio'])
+        return {
+            'job_id': result['job_id'],
+            'source_language': result['source_language'],
+            'target_language': result['target_language'],
+            'original_text': result['original_text'],
+            'translated_text': result['translated_text'],
+            'audio_format': result['audio_format'],
+            'audio_url': f"/audio/{result['job_id']}",
+        }
+
+    @app.get("/health")
+    def health():
+        return {'status': 'ok' if 'pipeline' in state else 'starting'}
+
+    @app.get("/ready")
+    def ready():
+        status = state['readiness'].status()
+        return JSONResponse(status_code=200 if status['ready'] else 503, content=status)
+
+    @app.post("/transcribe")
+    async def transcribe(request: Request, source: str, file: Optional[UploadFile] = File(None)):
+        path = await spool_upload(request, file)
+        try:
+            result = await run_in_threadpool(state['pipeline'].transcriber.transcribe, path, source)
+        finally:
+            remove(path)
+        output = result.get('output', [{}])[0]
+        return {'source_language': source, 'text': output.get('source', '')}
+
+    @app.post("/translate")
+    async def translate(request: TranslateRequest):
+        translated = await run_in_threadpool(
+            state['pipeline'].translator.translate, request.text, request.target, request.source)
+        return {'source_language': request.source, 'target_language': request.target,
+                'translated_text': translated}
+
+    @app.post("/translate/batch")
+    async def translate_batch(request: TranslateBatchRequest):
+        if len(request.texts) > MAX_BATCH:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH} texts per call")
+        translator = state['pipeline'].translator
+        translations = await asyncio.gather(*(
+            run_in_threadpool(translator.translate, text, request.target, request.source)
+            for text in request.texts
+        ))
+        return {'source_language': request.source, 'target_language': request.target,
+                'translations': list(translations)}
+
+    @app.post("/synthesize")
+    async def synthesize(
+        request: Request,
+        text: str = Form(...),
+        ref_text: str = Form(...),
+        file: UploadFile = File(...),
+        format: str = 'wav'
+    ):
+        check_format(format)
+        path = await spool_upload(request, file)
+        try:
+            result = await run_in_threadpool(state['pipeline'].synthesizer.generate_speech, text, path, ref_text)
+        finally:
+            remove(path)
+        return await run_in_threadpool(audio_response, result['audio'], format)
+
+    @app.post("/pipeline")
+    async def pipeline(
+        request: Request,
+        source: str,
+        target: str,
+        response: str = 'json',
+        file: Optional[UploadFile] = File(None)
+    ):
+        """Run the whole pipeline; returns JSON with an audio link, or the audio itself with response=audio."""
+        if response not in ('json', 'audio'):
+            raise HTTPException(status_code=400, detail="response must be json or audio")
+        path = await spool_upload(request, file)
+        received = time.perf_counter()
+        timing = {}
+
+        def run() -> Dict[str, Any]:
+            # Time spent waiting for a threadpool worker, reported apart from the work itself
+            started = time.perf_counter()
+            timing['queue'] = started - received
+            try:
+                return state['pipeline'].process(path, source, target, profile=wants_profile(request), encode=True)
+            finally:
+                timing['process'] = time.perf_counter() - started
+
+        try:
+            result = await run_in_threadpool(run)
+        finally:
+            remove(path)
+        headers = {'Server-Timing': ', '.join(f"{name};dur={seconds * 1000:.1f}"
+                                              for name, seconds in timing.items())}
+        if response == 'audio':
+            reply = await run_in_threadpool(audio_response, result['audio'], result['audio_format'])
+            reply.headers.update(headers)
+            return reply
+        return JSONResponse(content=pipeline_summary(result), headers=headers)
+
+    @app.post("/pipeline/batch")
+    async def pipeline_batch(source: str, target: str, files: List[UploadFile] = File(...)):
+        """Run many clips in one call; each gets its own result or error, in upload order."""
+        if len(files) > MAX_BATCH:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH} clips per call")
+
+        async def run_one(upload: UploadFile) -> Dict[str, Any]:
+            path = await spool_upload(None, upload)
+            try:
+                result = await run_in_threadpool(state['pipeline'].process, path, source, target)
+                return {'filename': upload.filename, **pipeline_summary(result)}
+            except (ValueError, *UPSTREAM_ERRORS) as e:
+                return {'filename': upload.filename, 'error': str(e)}
+            except Exception as e:
+                logger.exception(f"Batch clip {upload.filename} failed: {str(e)}")
+                return {'filename': upload.filename, 'error': 'Internal server error'}
+            finally:
+                remove(path)
+
+        return {'results': list(await asyncio.gather(*(run_one(upload) for upload in files)))}
+
+    @app.post("/pipeline/stream")
+    async def pipeline_stream(
+        request: Request,
+        source: str,
+        target: str,
+        file: Optional[UploadFile] = File(None)
+    ):
+        """
+        Server-sent events as each stage finishes: transcribe, translate, then
+        audio (with its link), or error. The stream always ends with done.
+        """
+        path = await spool_upload(request, file)
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        job_id = uuid.uuid4().hex
+        profile = wants_profile(request)
+
+        def on_stage(stage: str, partial: Dict[str, Any]) -> None:
+            loop.call_soon_threadsafe(events.put_nowait, (stage, partial))
+
+        def run() -> None:
+            try:
+                result = state['pipeline'].process(path, source, target, job_id=job_id, on_stage=on_stage,
+                                                   profile=profile, encode=True)
+                on_stage('audio', pipeline_summary(result))
+            except (ValueError, *UPSTREAM_ERRORS) as e:
+                on_stage('error', {'detail': str(e)})
+            except Exception as e:
+                logger.exception(f"Stream job {job_id} failed: {str(e)}")
+                on_stage('error', {'detail': 'Internal server error'})
+            finally:
+                remove(path)
+                on_stage('done', {'job_id': job_id})
+
+        async def stream():
+            task = loop.run_in_executor(None, run)
+            while True:
+                stage, data = await events.get()
+                yield f"event: {stage}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                if stage == 'done':
+                    break
+            await task
+
+        return StreamingResponse(stream(), media_type='text/event-stream',
+                                 headers={'Cache-Control': 'no-cache'})
+
+    @app.get("/audio/{job_id}")
+    async def audio(job_id: str, format: Optional[str] = None):
+        buffer = audio_store.get(job_id)
+        if buffer is None:
+            raise HTTPException(status_code=404, detail=f"No audio for job {job_id}")
+        audio_format = format or state['pipeline'].output_format
+        check_format(audio_format)
+        return await run_in_threadpool(audio_response, buffer, audio_format)
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vangmaya REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(), host=args.host, port=args.port)
@@ -1,9 +1,26 @@
+import atexit
+import os
 from dotenv import load_dotenv
-from gradio_interface import create_interface
+from gradio_interface import create_interface, pipeline
+from src.metrics import REGISTRY, start_metrics_server
+from src.retention import retention_from_env
+from src.warmup import Readiness, warmup_enabled
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Open connections and build the TTS clients while the app starts
+readiness = Readiness(pipeline.warm_up_checks()).start() if warmup_enabled() else None
+
+# Keep outputs/, uploads/ and deliveries within VANGMAYA_RETENTION_* budgets
+retention = retention_from_env()
+
+# Serve OpenMetrics (and /ready) next to the Gradio app and optionally dump JSON on exit
+if os.getenv('VANGMAYA_METRICS_PORT'):
+    start_metrics_server(int(os.getenv('VANGMAYA_METRICS_PORT')), readiness=readiness)
+if os.getenv('VANGMAYA_METRICS_JSON'):
+    atexit.register(REGISTRY.dump_json, os.getenv('VANGMAYA_METRICS_JSON'))
+
 # Create and launch the interface
 demo = create_interface()
 demo.launch()
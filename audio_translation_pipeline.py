@@ -2,22 +2,71 @@ import logging
 import os
 import shutil
 import base64
-from typing import Dict, Any
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
 from pathlib import Path
+import numpy as np
 from voice_to_text import VoiceToTextConverter
 from translator import TextTranslator
 from text_to_speech import TextToSpeech
+from tts_backends import TTSBackend
+from src.audio import AUDIO_FORMATS, AudioBuffer, extension_for_format
+from src.http_cache import ReplayMissError
+from src.profiling import profiler_from_env
+from src.metrics import PIPELINE_DURATION, PIPELINE_IN_FLIGHT, STAGE_SKIPS, track_stage
+from src.retention import shard_path
+from src.reference import MAX_REF_SECONDS, MIN_REF_SECONDS, REF_SAMPLE_RATE, SILENCE_DBFS, is_silent, select_reference
+from src.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Length of the silent clip returned when there is nothing to say
+EMPTY_OUTPUT_SECONDS = 0.5
+
+@contextmanager
+def _stage(name: str):
+    """Record a pipeline stage in both metrics and the job trace."""
+    with track_stage(name), span(f'stage.{name}'):
+        yield
+
 class AudioTranslationPipeline:
-    def __init__(self):
-        """Initialize pipeline components."""
+    def __init__(
+        self,
+        tts_backend: Optional[TTSBackend] = None,
+        output_format: Optional[str] = None,
+        transcriber: Optional[VoiceToTextConverter] = None,
+        translator: Optional[TextTranslator] = None,
+        synthesizer: Optional[TextToSpeech] = None
+    ):
+        """
+        Initialize pipeline components.
+
+        Args:
+            tts_backend: Speech synthesis backend; defaults to the configured
+                one (see TextToSpeech)
+            output_format: Delivery format of the generated audio (wav, flac,
+                opus or mp3); defaults to VANGMAYA_OUTPUT_FORMAT or wav
+            transcriber, translator, synthesizer: Stage clients to use
+                instead of building the configured ones
+        """
+        self.output_format = (output_format or os.getenv('VANGMAYA_OUTPUT_FORMAT', 'wav')).lower()
+        # Longest reference clip passed to TTS; 0 passes the whole input
+        self.ref_max_seconds = float(os.getenv('VANGMAYA_REF_MAX_SECONDS', str(MAX_REF_SECONDS)))
+        # Inputs never louder than this skip every stage; "off" disables the check
+        silence = os.getenv('VANGMAYA_SILENCE_DBFS', str(SILENCE_DBFS))
+        self.silence_dbfs = None if silence.lower() == 'off' else float(silence)
+        # Samples every Nth job (VANGMAYA_PROFILE_EVERY) and jobs asked for with profile=True
+        self.profiler = profiler_from_env()
+        if self.output_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unsupported output format {self.output_format}. "
+                             f"Choose from: {', '.join(AUDIO_FORMATS)}")
         logger.info("Initializing AudioTranslationPipeline...")
         try:
-            self.transcriber = VoiceToTextConverter()
-            self.translator = TextTranslator()
-            self.synthesizer = TextToSpeech()  # Uses HF space directly
+            self.transcriber = transcriber or VoiceToTextConverter()
+            self.translator = translator or TextTranslator()
+            self.synthesizer = synthesizer or TextToSpeech(backend=tts_backend)
             logger.info("Pipeline components initialized successfully")
         except Exception as e:
             logger.error("Failed to initialize pipeline components: " + str(e))
@@ -27,7 +76,12 @@ class AudioTranslationPipeline:
         self,
         audio_file_path: str,
         source_lang: str,
-        target_lang: str
+        target_lang: str,
+        job_id: Optional[str] = None,
+        output_dir: Optional[str] = None,
+        on_stage: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        profile: bool = False,
+        encode: bool = False
     ) -> Dict[str, Any]:
         """
         Process audio through the complete pipeline.
@@ -36,75 +90,231 @@ class AudioTranslationPipeline:
             audio_file_path: Path to input audio file
             source_lang: Source language code
             target_lang: Target language code
+            job_id: Optional job ID attached to every trace span (generated if omitted)
+            output_dir: Directory to also save the generated audio to; by
+                default nothing is written and the audio stays in memory
+            on_stage: Called as on_stage(stage, partial result) as soon as
+                transcription and translation finish, for streaming callers
+            profile: Run this job under the sampling profiler regardless of
+                VANGMAYA_PROFILE_EVERY (see src/profiling.py)
+            encode: Start encoding the audio in the delivery format on the
+                worker pool before returning, for callers that will ask
+                for the bytes; otherwise it is only encoded when saved or
+                asked for
             
         Returns:
-            Dict containing original text, translated text, and generated audio
+            Dict containing original text, translated text, the generated
+            audio as an AudioBuffer ('audio'), its saved path ('audio_path',
+            None unless output_dir was given), the stages skipped by fast
+            paths ('skipped_stages') and the job ID
         """
-        logger.info(f"Processing audio file: {audio_file_path}")
+        job_id = job_id or uuid.uuid4().hex
+        logger.info(f"Processing audio file: {audio_file_path} (job {job_id})")
         logger.info(f"Source language: {source_lang}, Target language: {target_lang}")
 
-        try:
-            # Step 1: Transcribe audio to text
+        start = time.perf_counter()
+        outcome = 'error'
+        with PIPELINE_IN_FLIGHT.track_inprogress(), span(
+            'pipeline.process', job_id=job_id, source_lang=source_lang, target_lang=target_lang
+        ), self.profiler.profile(job_id, force=profile):
+            try:
+                result = self._run_stages(audio_file_path, source_lang, target_lang, output_dir, on_stage)
+                result['job_id'] = job_id
+                if encode and output_dir is None:
+                    # Saving already encoded it; otherwise overlap the encode with the caller
+                    result['audio'].encode_async(self.output_format)
+                outcome = 'success'
+                return result
+
+            except Exception as e:
+                logger.error(f"Pipeline processing failed: {str(e)}")
+                raise
+            finally:
+                PIPELINE_DURATION.observe(time.perf_counter() - start, outcome=outcome)
+
+    def _run_stages(
+        self,
+        audio_file_path: str,
+        source_lang: str,
+        target_lang: str,
+        output_dir: Optional[str],
+        on_stage: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run transcription, translation and synthesis for one job.
+
+        Stages whose result is already known are skipped: silent input needs
+        no ASR, an identity language pair no translation, and empty text no
+        translation or synthesis (a short silent clip is returned instead).
+        """
+        # Cheap local checks first, so bad requests never reach an upstream
+        for language in (source_lang, target_lang):
+            if not self.translator.is_language_supported(language):
+                raise ValueError(f"Language {language} is not supported")
+        skipped = []
+
+        def notify(stage: str, partial: Dict[str, Any]) -> None:
+            if on_stage is not None:
+                on_stage(stage, partial)
+
+        if self.silence_dbfs is not None and is_silent(audio_file_path, self.silence_dbfs):
+            self._skip(skipped, 'silence', 'transcribe', 'translate', 'synthesize')
+            notify('transcribe', {'original_text': ''})
+            notify('translate', {'translated_text': ''})
+            return self._empty_result(source_lang, target_lang, '', '', output_dir, skipped)
+
+        # Step 1: Transcribe audio to text
+        with _stage('transcribe'):
             transcription = self.transcriber.transcribe(
                 audio_file_path=audio_file_path,
                 source_language=source_lang
             )
-            original_text = transcription.get("output", [{}])[0].get("source", "")
-            logger.info(f"Successfully transcribed audio to text: {original_text}")
-
-            # Step 2: Translate text
-            translated_text = self.translator.translate(
-                text=original_text,
-                source_lang=source_lang,
-                target_lang=target_lang
-            )
+        transcription_output = transcription.get("output", [{}])[0]
+        original_text = transcription_output.get("source", "")
+        logger.info(f"Successfully transcribed audio to text: {original_text}")
+        notify('transcribe', {'original_text': original_text})
+
+        if not original_text.strip():
+            self._skip(skipped, 'empty_text', 'translate', 'synthesize')
+            notify('translate', {'translated_text': ''})
+            return self._empty_result(source_lang, target_lang, original_text, '', output_dir, skipped)
+
+        # Step 2: Translate text
+        if source_lang == target_lang:
+            self._skip(skipped, 'identity_pair', 'translate')
+            translated_text = original_text
+        else:
+            with _stage('translate'):
+                translated_text = self.translator.translate(
+                    text=original_text,
+                    source_lang=source_lang,
+                    target_lang=target_lang
+                )
             logger.info(f"Successfully translated text to {target_lang}: {translated_text}")
+        notify('translate', {'translated_text': translated_text})
 
-            # Step 3: Generate speech in target language
-            logger.info(f"Generating speech using IndicF5 model...")
-            
-            # Create a unique output filename based on timestamp
-            import time
-            output_filename = f"output_{int(time.time())}.wav"
-            output_path = os.path.join("outputs", output_filename)
-            os.makedirs("outputs", exist_ok=True)
-            
-            # Generate the speech with fixed sample rate of 24000 Hz to match reference code
-            max_retries = 3
-            retry_count = 0
+        if not translated_text.strip():
+            self._skip(skipped, 'empty_text', 'synthesize')
+            return self._empty_result(source_lang, target_lang, original_text, translated_text,
+                                      output_dir, skipped)
+
+        # Step 3: Pick a short, clean reference clip so synthesis cost does
+        # not grow with the length of the input
+        with _stage('select_reference'):
+            ref_audio, ref_text = self._select_reference(audio_file_path, transcription_output, original_text)
+
+        # Step 4: Generate speech in target language
+        logger.info(f"Generating speech using IndicF5 model...")
+
+        # Generate the speech with fixed sample rate of 24000 Hz to match reference code
+        max_retries = 3
+        retry_count = 0
+        with _stage('synthesize'):
             while retry_count < max_retries:
                 try:
                     tts_result = self.synthesizer.generate_speech(
                         text=translated_text,             # Translated text to speak
-                        ref_audio_path=audio_file_path,   # Original input audio as reference
-                        ref_text=original_text,           # Original transcribed text
-                        output_path=output_path           # Where to save generated audio
+                        ref_audio_path=ref_audio,         # Reference window of the input audio
+                        ref_text=ref_text                 # Transcript of that window
                     )
-                    logger.info(f"Speech generated successfully: {tts_result['file_path']}")
+                    logger.info("Speech generated successfully")
                     break
+                except ReplayMissError:
+                    # Retrying cannot produce a recording that is not there
+                    raise
                 except Exception as e:
                     retry_count += 1
                     if retry_count < max_retries:
                         logger.warning(f"Speech generation attempt {retry_count} failed: {str(e)}. Retrying...")
                         # Wait a moment before retrying
-                        import time
                         time.sleep(1)
                     else:
                         logger.error(f"All speech generation attempts failed after {max_retries} retries")
                         raise
 
-            return {
-                'source_language': source_lang,
-                'target_language': target_lang,
-                'original_text': original_text,
-                'translated_text': translated_text,
-                'audio_path': tts_result['file_path'],
-                'audio_data': tts_result['file_path']  # All we need is the file path
-            }
+        return self._deliver(source_lang, target_lang, original_text, translated_text,
+                             tts_result['audio'], output_dir, skipped)
+
+    def _deliver(
+        self,
+        source_lang: str,
+        target_lang: str,
+        original_text: str,
+        translated_text: str,
+        audio: AudioBuffer,
+        output_dir: Optional[str],
+        skipped: List[str]
+    ) -> Dict[str, Any]:
+        audio_path = None
+        if output_dir is not None:
+            # Create a unique output filename based on timestamp; the suffix
+            # keeps concurrent jobs finishing in the same second apart. Files
+            # are sharded so no one directory grows huge.
+            output_filename = (f"output_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+                               f".{extension_for_format(self.output_format)}")
+            audio_path = audio.save(shard_path(output_dir, output_filename), self.output_format)
 
+        return {
+            'source_language': source_lang,
+            'target_language': target_lang,
+            'original_text': original_text,
+            'translated_text': translated_text,
+            'audio': audio,
+            'audio_format': self.output_format,
+            'audio_path': audio_path,
+            'skipped_stages': skipped
+        }
+
+    def _empty_result(
+        self,
+        source_lang: str,
+        target_lang: str,
+        original_text: str,
+        translated_text: str,
+        output_dir: Optional[str],
+        skipped: List[str]
+    ) -> Dict[str, Any]:
+        """Result for a job with nothing to say: a short silent clip."""
+        silence = AudioBuffer(samples=np.zeros(int(EMPTY_OUTPUT_SECONDS * REF_SAMPLE_RATE), dtype=np.float32),
+                              sample_rate=REF_SAMPLE_RATE)
+        return self._deliver(source_lang, target_lang, original_text, translated_text, silence, output_dir, skipped)
+
+    @staticmethod
+    def _skip(skipped: List[str], reason: str, *stages: str) -> None:
+        for stage in stages:
+            STAGE_SKIPS.inc(stage=stage, reason=reason)
+            skipped.append(stage)
+        logger.info(f"Skipping {', '.join(stages)}: {reason}")
+
+    def _select_reference(
+        self, audio_file_path: str, transcription_output: Dict[str, Any], original_text: str
+    ) -> Tuple[Union[str, AudioBuffer], str]:
+        """Get (reference audio, reference text) for TTS, falling back to the whole input."""
+        if self.ref_max_seconds <= 0:
+            return audio_file_path, original_text
+        try:
+            clip = select_reference(audio_file_path, transcription_output,
+                                    min(MIN_REF_SECONDS, self.ref_max_seconds), self.ref_max_seconds)
         except Exception as e:
-            logger.error(f"Pipeline processing failed: {str(e)}")
-            raise
+            logger.warning(f"Could not select a reference window, using the whole input: {str(e)}")
+            return audio_file_path, original_text
+        if not clip.trimmed or not clip.text:
+            return audio_file_path, original_text
+        logger.info(f"Using {clip.end - clip.start:.1f}s of {clip.source_duration:.1f}s as the voice reference")
+        return clip.audio, clip.text
+
+    def warm_up_checks(self) -> Dict[str, Callable[[], None]]:
+        """Warm-up callables for each stage, for src.warmup.Readiness."""
+        return {
+            'asr': self.transcriber.warm_up,
+            'translate': self.translator.warm_up,
+            'tts': self.synthesizer.warm_up,
+        }
+
+    def save_delivery(self, result: Dict[str, Any], directory: str) -> str:
+        """Write a result's audio in the delivery format, named after its job; returns the path."""
+        filename = f"{result['job_id']}.{extension_for_format(result['audio_format'])}"
+        return result['audio'].save(shard_path(directory, filename), result['audio_format'])
 
     def get_supported_languages(self) -> Dict[str, str]:
         """Get dictionary of supported languages."""
@@ -0,0 +1,200 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter as TallyCounter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.http_cache import fingerprint
+from src.journal import JobJournal
+from src.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg', '.m4a', '.webm')
+
+# (job ID, audio path, source language, target language)
+BatchJob = Tuple[str, str, str, str]
+
+
+def job_id_for(audio_path: str, source_lang: str, target_lang: str) -> str:
+    """Stable ID so a re-run over the same inputs finds its journal entries."""
+    return fingerprint('batch', os.path.abspath(audio_path), source_lang, target_lang)[:16]
+
+
+def jobs_from_directory(directory: str, source_lang: str, target_lang: str) -> Iterator[BatchJob]:
+    """Every audio file under directory, in a stable order."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                path = os.path.join(root, name)
+                yield job_id_for(path, source_lang, target_lang), path, source_lang, target_lang
+
+
+def jobs_from_manifest(
+    manifest_path: str,
+    source_lang: Optional[str] = None,
+    target_lang: Optional[str] = None
+) -> Iterator[BatchJob]:
+    """
+    Jobs from a JSONL manifest of {"audio", "source", "target", "id"?} lines.
+
+    Relative audio paths are resolved against the manifest's directory;
+    source and target fall back to the given defaults.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            entry = json.loads(line)
+            source = entry.get('source') or source_lang
+            target = entry.get('target') or target_lang
+            if not (entry.get('audio') and source and target):
+                raise ValueError(f"{manifest_path}:{line_number}: needs audio, source and target")
+            path = os.path.join(base, entry['audio'])
+            yield entry.get('id') or job_id_for(path, source, target), path, source, target
+
+
+def run_batch(
+    pipeline,
+    jobs: Iterator[BatchJob],
+    journal: JobJournal,
+    output_dir: str,
+    concurrency: int = 4,
+    retry_failed: bool = False,
+    profile_every: int = 0
+) -> Dict[str, Any]:
+    """
+    Run jobs through the pipeline, skipping any the journal already has as done.
+
+    At most `concurrency` jobs are in flight and only those are held in
+    memory, so the job list can be a lazy iterator over a huge directory.
+    With profile_every set, every Nth job run is profiled (see
+    src/profiling.py) and the summary lists their IDs.
+
+    Returns:
+        Summary with counts, throughput, latency percentiles and the most
+        common errors
+    """
+    latencies: List[float] = []
+    errors = TallyCounter()
+    counts = TallyCounter()
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(concurrency)
+
+    profiled: List[str] = []
+
+    def run_job(job: BatchJob, profile: bool) -> None:
+        job_id, audio_path, source_lang, target_lang = job
+        start = time.perf_counter()
+        try:
+            journal.record(job_id, 'running', audio=audio_path, source=source_lang, target=target_lang)
+            result = pipeline.process(
+                audio_file_path=audio_path,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                job_id=job_id,
+                output_dir=output_dir,
+                profile=profile
+            )
+            elapsed = time.perf_counter() - start
+            journal.record(job_id, 'done', audio=audio_path, source=source_lang, target=target_lang,
+                           output=result['audio_path'], translated_text=result['translated_text'],
+                           seconds=round(elapsed, 4))
+            with lock:
+                latencies.append(elapsed)
+                counts['succeeded'] += 1
+        except Exception as e:
+            journal.record(job_id, 'failed', audio=audio_path, source=source_lang, target=target_lang,
+                           error=str(e), seconds=round(time.perf_counter() - start, 4))
+            with lock:
+                errors[str(e)[:200]] += 1
+                counts['failed'] += 1
+        finally:
+            slots.release()
+
+    started = time.perf_counter()
+    interrupted = False
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch') as executor:
+        try:
+            for job in jobs:
+                counts['total'] += 1
+                status = journal.status(job[0])
+                if status == 'done' or (status == 'failed' and not retry_failed):
+                    counts['skipped'] += 1
+                    continue
+                slots.acquire()
+                profile = profile_every > 0 and (counts['total'] - counts['skipped']) % profile_every == 0
+                if profile:
+                    profiled.append(job[0])
+                executor.submit(run_job, job, profile)
+        except KeyboardInterrupt:
+            # Jobs already running finish and are journaled; the rest resume next time
+            interrupted = True
+            logger.warning("Interrupted; waiting for in-flight jobs to finish")
+    elapsed = time.perf_counter() - started
+
+    processed = counts['succeeded'] + counts['failed']
+    return {
+        'total': counts['total'],
+        'skipped': counts['skipped'],
+        'processed': processed,
+        'succeeded': counts['succeeded'],
+        'failed': counts['failed'],
+        'interrupted': interrupted,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 4),
+        'throughput_jobs_per_s': round(processed / elapsed, 4) if elapsed else 0.0,
+        'latency_s': {
+            'p50': round(percentile(latencies, 50), 4),
+            'p95': round(percentile(latencies, 95), 4),
+            'max': round(max(latencies), 4) if latencies else 0.0,
+        },
+        'top_errors': [{'error': error, 'count': count} for error, count in errors.most_common(5)],
+        'profiled_jobs': profiled,
+    }
+
+
+def add_arguments(parser) -> None:
+    parser.add_argument('input', help='Directory of audio files or a JSONL manifest')
+    parser.add_argument('--source', help='Source language (required for directories)')
+    parser.add_argument('--target', help='Target language (required for directories)')
+    parser.add_argument('--output-dir', default='outputs', help='Where generated audio is written')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--journal', help='Job journal (default: <output-dir>/journal.jsonl)')
+    parser.add_argument('--summary', help='Summary JSON (default: <output-dir>/summary.json)')
+    parser.add_argument('--retry-failed', action='store_true', help='Run jobs that failed last time again')
+    parser.add_argument('--profile-every', type=int, default=0,
+                        help='Profile every Nth job; profiles go to <output-dir>/profiles '
+                             'unless VANGMAYA_PROFILE_DIR is set')
+
+
+def main(args) -> Dict[str, Any]:
+    from audio_translation_pipeline import AudioTranslationPipeline
+
+    if os.path.isdir(args.input):
+        if not (args.source and args.target):
+            raise SystemExit("--source and --target are required when the input is a directory")
+        jobs = jobs_from_directory(args.input, args.source, args.target)
+    else:
+        jobs = jobs_from_manifest(args.input, args.source, args.target)
+
+    journal_path = args.journal or os.path.join(args.output_dir, 'journal.jsonl')
+    summary_path = args.summary or os.path.join(args.output_dir, 'summary.json')
+    pipeline = AudioTranslationPipeline()
+    if args.profile_every and not os.getenv('VANGMAYA_PROFILE_DIR'):
+        pipeline.profiler.directory = os.path.join(args.output_dir, 'profiles')
+    with JobJournal(journal_path) as journal:
+        summary = run_batch(pipeline, jobs, journal, args.output_dir, args.concurrency, args.retry_failed,
+                            args.profile_every)
+    summary['journal'] = journal_path
+
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return summary
@@ -0,0 +1,146 @@
+import argparse
+import json
+import logging
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from src.metrics import REGISTRY
+from src.stats import percentile
+from mock_upstream import MockUpstream, make_wav_bytes, parse_latency_args
+
+logger = logging.getLogger(__name__)
+
+def make_clips(directory: str, count: int, duration: float = 3.0) -> List[str]:
+    """Write count distinct synthetic WAV clips so transcription caches don't hide work."""
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"clip_{i:05d}.wav")
+        with open(path, 'wb') as f:
+            f.write(make_wav_bytes(duration, sample_rate=16000, frequency=180.0 + i))
+        paths.append(path)
+    return paths
+
+
+def run_benchmark(
+    pipeline,
+    jobs: List[Tuple[str, str, str]],
+    concurrency: int = 4,
+    trace_memory: bool = False
+) -> Dict[str, Any]:
+    """
+    Drive the pipeline over a list of jobs at a fixed concurrency.
+
+    Args:
+        pipeline: AudioTranslationPipeline (or anything with the same process())
+        jobs: List of (audio_file_path, source_lang, target_lang)
+        concurrency: Number of jobs in flight at once
+        trace_memory: Track Python allocations with tracemalloc (slows
+            the run down noticeably, so latencies are not comparable)
+
+    Returns:
+        Report with latency percentiles (seconds), throughput (jobs/s),
+        error counts and memory figures
+    """
+    latencies = []
+    errors = []
+
+    def run_job(job):
+        audio_file_path, source_lang, target_lang = job
+        start = time.perf_counter()
+        try:
+            pipeline.process(
+                audio_file_path=audio_file_path,
+                source_lang=source_lang,
+                target_lang=target_lang
+            )
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(str(e))
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run_job, jobs))
+    elapsed = time.perf_counter() - started
+
+    report = {
+        'jobs': len(jobs),
+        'concurrency': concurrency,
+        'succeeded': len(latencies),
+        'failed': len(errors),
+        'elapsed_s': round(elapsed, 4),
+        'throughput_jobs_per_s': round(len(latencies) / elapsed, 4) if elapsed else 0.0,
+        'latency_s': {
+            'p50': round(percentile(latencies, 50), 4),
+            'p95': round(percentile(latencies, 95), 4),
+            'p99': round(percentile(latencies, 99), 4),
+            'max': round(max(latencies), 4) if latencies else 0.0,
+        },
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'sample_errors': errors[:3],
+    }
+    if trace_memory:
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # At most `concurrency` jobs are alive at once, so this bounds per-job allocation
+        report['peak_traced_mb_per_job'] = round(peak_traced / concurrency / 1e6, 3)
+    return report
+
+
+def configure_for_upstream(base_url: str) -> None:
+    """Point every stage client at the given upstream over a direct connection."""
+    os.environ['VANGMAYA_TRANSPORT'] = 'direct'
+    os.environ['VANGMAYA_BASE_URL'] = base_url
+    os.environ['VANGMAYA_TTS_BASE_URL'] = base_url
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark for AudioTranslationPipeline")
+    parser.add_argument('--jobs', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--clip-seconds', type=float, default=3.0)
+    parser.add_argument('--source', default='hi')
+    parser.add_argument('--target', default='ta')
+    parser.add_argument('--latency', action='append',
+                        help='ROUTE=SPEC for the mock upstream, e.g. synthesize=lognormal:0,0.4 (repeatable)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Report per-job allocation peaks (slower run)')
+    parser.add_argument('--metrics-json', help='Write a JSON dump of the pipeline metrics to this file')
+    parser.add_argument('--upstream', help='Use an already running upstream instead of starting the mock')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='vangmaya-bench-')
+    clips = make_clips(workdir, args.jobs, args.clip_seconds)
+    jobs = [(clip, args.source, args.target) for clip in clips]
+
+    upstream = None
+    if args.upstream:
+        base_url = args.upstream
+    else:
+        upstream = MockUpstream(latency=parse_latency_args(args.latency), error_rate=args.error_rate).start()
+        base_url = upstream.base_url
+
+    try:
+        configure_for_upstream(base_url)
+        from audio_translation_pipeline import AudioTranslationPipeline
+
+        report = run_benchmark(AudioTranslationPipeline(), jobs, args.concurrency, args.trace_memory)
+    finally:
+        if upstream is not None:
+            upstream.stop()
+
+    if args.metrics_json:
+        REGISTRY.dump_json(args.metrics_json)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -2,9 +2,7 @@ import os
 import time
 import logging
 from pathlib import Path
-import numpy as np
 from audio_translation_pipeline import AudioTranslationPipeline
-import scipy.io.wavfile as wav
 import shutil
 
 # Ensure uploads directory exists
@@ -84,8 +82,7 @@ def main():
                 output_filename = f"output_{int(time.time())}.wav"
                 output_path = os.path.join("uploads", output_filename)
                 print("\nSaving generated audio...")
-                audio_array = np.array(result['audio_data'], dtype=np.float32)
-                wav.write(output_path, 22050, audio_array)
+                result['audio'].save(output_path)
                 print(f"Generated audio saved to: {output_path}")
             except Exception as e:
                 print(f"\nError saving audio file: {str(e)}")
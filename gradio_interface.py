@@ -1,7 +1,14 @@
 import gradio as gr
 import logging
 import os
+import time
 from audio_translation_pipeline import AudioTranslationPipeline
+from src.job_queue import JobQueue, WorkerPool
+from src.languages import LANGUAGES
+from src.metrics import start_metrics_server
+from src.retention import DELIVERY_DIR, retention_from_env
+from src.warmup import Readiness, warmup_enabled
+from workers import INTERACTIVE_PRIORITY, PIPELINE_HANDLER, enqueue_translation, queue_path
 
 logging.basicConfig(level=logging.ERROR, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -9,21 +16,52 @@ for name in logging.root.manager.loggerDict:
     logging.getLogger(name).setLevel(logging.ERROR)
 
 pipeline = AudioTranslationPipeline()
+# With VANGMAYA_QUEUE_PATH set, requests are queued for worker processes
+# instead of running on the Gradio request thread
+job_queue = JobQueue(queue_path()) if os.getenv('VANGMAYA_QUEUE_PATH') else None
 
-LANGUAGES = {
-    "Hindi (हिन्दी)": "hi",
-    "English": "en",
-    "Bengali (বাংলা)": "bn",
-    "Telugu (తెలుగు)": "te",
-    "Tamil (தமிழ்)": "ta",
-    "Marathi (मराठी)": "mr",
-    "Kannada (ಕನ್ನಡ)": "kn",
-    "Gujarati (ગુજરાતી)": "gu",
-    "Malayalam (മലയാളം)": "ml",
-    "Punjabi (ਪੰਜਾਬੀ)": "pa"
-}
 
 def process_audio(audio_path, source_lang, target_lang):
+    if job_queue is not None:
+        yield from process_queued(audio_path, source_lang, target_lang)
+        return
+    yield run_pipeline(audio_path, source_lang, target_lang)
+
+def format_error(error_msg):
+    if "All proxies failed" in error_msg:
+        return "Service is busy. Please try again in a moment.", None
+    return f"Error: {error_msg}", None
+
+def process_queued(audio_path, source_lang, target_lang, poll_interval=0.5):
+    """Queue the job and report its progress until a worker finishes it."""
+    if audio_path is None:
+        yield "Please upload or record audio to translate.", None
+        return
+    try:
+        job_id = enqueue_translation(job_queue, audio_path, LANGUAGES[source_lang], LANGUAGES[target_lang],
+                                     priority=INTERACTIVE_PRIORITY, output_dir=DELIVERY_DIR)
+        while True:
+            job = job_queue.get(job_id)
+            if job['status'] == 'done':
+                break
+            if job['status'] == 'failed':
+                yield format_error(job['error'] or "Job failed")
+                return
+            if job['status'] == 'queued':
+                yield f"Queued ({job['position']} ahead of you)...", None
+            else:
+                yield "Processing your audio...", None
+            time.sleep(poll_interval)
+    except Exception as e:
+        yield format_error(str(e))
+        return
+
+    result = job['result']
+    output_text = f"Original ({source_lang}):\n{result['original_text']}\n\nTranslation ({target_lang}):\n{result['translated_text']}"
+    # The worker wrote the audio to DELIVERY_DIR; Gradio serves it from there
+    yield output_text, result['audio_path']
+
+def run_pipeline(audio_path, source_lang, target_lang):
     try:
         if audio_path is None:
             return "Please upload or record audio to translate.", None
@@ -36,13 +74,14 @@ def process_audio(audio_path, source_lang, target_lang):
         )
         
         output_text = f"Original ({source_lang}):\n{result['original_text']}\n\nTranslation ({target_lang}):\n{result['translated_text']}"
-        return output_text, result['audio_path']
+        if result['audio_format'] == 'wav':
+            # Hand the waveform straight to Gradio; no output file is written
+            return output_text, result['audio'].to_gradio()
+        # Compressed deliveries are served from files under DELIVERY_DIR
+        return output_text, pipeline.save_delivery(result, DELIVERY_DIR)
         
     except Exception as e:
-        error_msg = str(e)
-        if "All proxies failed" in error_msg:
-            return "Service is busy. Please try again in a moment.", None
-        return f"Error: {error_msg}", None
+        return format_error(str(e))
 
 def create_interface():
     with gr.Blocks() as interface:
@@ -95,7 +134,9 @@ def create_interface():
         process_btn.click(
             fn=process_audio,
             inputs=[audio_input, source_lang, target_lang],
-            outputs=[text_output, audio_output]
+            outputs=[text_output, audio_output],
+            # Stable endpoint name for API clients (see loadtest.py)
+            api_name="process_audio"
         )
         
         gr.Markdown("""
@@ -107,6 +148,14 @@ def create_interface():
     return interface
 
 if __name__ == "__main__":
+    readiness = Readiness(pipeline.warm_up_checks()).start() if warmup_enabled() else None
+    # Sweeps outputs/, uploads/ and DELIVERY_DIR when a budget is configured
+    retention = retention_from_env()
+    if os.getenv('VANGMAYA_METRICS_PORT'):
+        start_metrics_server(int(os.getenv('VANGMAYA_METRICS_PORT')), readiness=readiness)
+    if job_queue is not None and os.getenv('VANGMAYA_QUEUE_WORKERS'):
+        # Otherwise run workers separately: python vangmaya.py worker
+        WorkerPool(job_queue.path, PIPELINE_HANDLER, int(os.getenv('VANGMAYA_QUEUE_WORKERS'))).start()
     interface = create_interface()
     interface.queue().launch(
         share=True,
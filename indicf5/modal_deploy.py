@@ -1,40 +1,41 @@
-import modal
-from modal import Image, fastapi_endpoint
-
-# Define the Modal app
-app = modal.App("indicf5-tts")
-
-# Create a container image with the required dependencies
-image = (
-    Image.debian_slim()
-    .apt_install("git")
-    .pip_install(
-        "torch",
-        "transformers",
-        "soundfile",
-        "numpy",
-        "fastapi[standard]",  # Added FastAPI with recommended extensions
-        "git+https://github.com/ai4bharat/IndicF5.git"
-    )
-)
-
-@app.function(
-    image=image,
-    gpu="T4",  # Use T4 GPU for inference
-    timeout=600  # 10 minute timeout
-)
-@fastapi_endpoint()
-def generate_speech(text: str, ref_audio_path: str, ref_text: str):
+import argparse
+import base64
+import binascii
+import io
+import os
+import tempfile
+import threading
+from typing import Callable, Optional, Tuple
+
+try:
+    import modal
+except ImportError:  # Local serving mode does not need Modal
+    modal = None
+
+MODEL_ID = "ai4bharat/IndicF5"
+SAMPLE_RATE = 24000
+
+AUDIO_FORMATS = {
+    # format: (soundfile format, subtype, content type)
+    "wav": ("WAV", "PCM_16", "audio/wav"),
+    "flac": ("FLAC", "PCM_16", "audio/flac"),
+}
+
+
+def load_model(device: Optional[str] = None):
+    """Load IndicF5 once; falls back to CPU when no GPU is available."""
+    import torch
     from transformers import AutoModel
+
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    model = AutoModel.from_pretrained(MODEL_ID, trust_remote_code=True)
+    return model.to(device)
+
+
+def synthesize(model, text: str, ref_audio_path: str, ref_text: str):
+    """Run the model and return a float32 waveform in [-1, 1]."""
     import numpy as np
-    
-    # Load model
-    model = AutoModel.from_pretrained(
-        "ai4bharat/IndicF5",
-        trust_remote_code=True
-    )
-    
-    # Generate speech
+
     audio = model(
         text,
         ref_audio_path=ref_audio_path,
@@ -44,8 +45,147 @@ def generate_speech(text: str, ref_audio_path: str, ref_text: str):
     # Normalize audio if needed
     if audio.dtype == np.int16:
         audio = audio.astype(np.float32) / 32768.0
+    return np.asarray(audio, dtype=np.float32)
+
+
+def encode_audio(audio, audio_format: str = "wav") -> Tuple[bytes, str]:
+    """Encode a waveform as WAV or FLAC bytes; returns (data, content type)."""
+    import soundfile as sf
+
+    if audio_format not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported format {audio_format}. Choose from: {', '.join(AUDIO_FORMATS)}")
+    sf_format, subtype, content_type = AUDIO_FORMATS[audio_format]
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, samplerate=SAMPLE_RATE, format=sf_format, subtype=subtype)
+    return buffer.getvalue(), content_type
+
+
+def create_app(model_loader: Callable[[], object] = load_model):
+    """
+    Build the FastAPI app serving /generate_speech and /synthesize_speech.
+
+    The model is loaded once, on startup, by calling model_loader. Modal
+    passes the model its container already loaded; local mode loads it here.
+    """
+    from contextlib import asynccontextmanager
+    from fastapi import FastAPI, HTTPException
+    from fastapi.responses import Response
+    from pydantic import BaseModel
+
+    state = {}
+    # The model is not safe for concurrent calls; requests take turns
+    model_lock = threading.Lock()
+
+    @asynccontextmanager
+    async def lifespan(_app):
+        state["model"] = model_loader()
+        yield
+        state.clear()
+
+    web_app = FastAPI(title="IndicF5 TTS", lifespan=lifespan)
+
+    class SpeechRequest(BaseModel):
+        text: str
+        ref_audio_path: str
+        ref_text: str
+        format: str = "wav"
+
+    class UploadSpeechRequest(BaseModel):
+        text: str
+        ref_audio_base64: str
+        ref_text: str
+        format: str = "wav"
+
+    def speech_response(audio, audio_format: str):
+        data, content_type = encode_audio(audio, audio_format)
+        return Response(
+            content=data,
+            media_type=content_type,
+            headers={"Content-Disposition": f"attachment; filename=speech.{audio_format}"}
+        )
+
+    @web_app.get("/health")
+    def health():
+        return {"status": "ok" if "model" in state else "loading"}
+
+    @web_app.post("/generate_speech")
+    def generate_speech(request: SpeechRequest):
+        if request.format not in AUDIO_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format {request.format}")
+        if not os.path.exists(request.ref_audio_path):
+            raise HTTPException(status_code=400, detail=f"Reference audio not found: {request.ref_audio_path}")
+
+        with model_lock:
+            audio = synthesize(state["model"], request.text, request.ref_audio_path, request.ref_text)
+        return speech_response(audio, request.format)
+
+    @web_app.post("/synthesize_speech")
+    def synthesize_speech(request: UploadSpeechRequest):
+        # Same as /generate_speech, but the client uploads its reference clip
+        # (the contract EndpointBackend speaks)
+        if request.format not in AUDIO_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format {request.format}")
+        try:
+            ref_audio = base64.b64decode(request.ref_audio_base64, validate=True)
+        except (binascii.Error, ValueError):
+            raise HTTPException(status_code=400, detail="ref_audio_base64 is not valid base64")
+
+        with tempfile.NamedTemporaryFile(suffix=".wav") as ref_file:
+            ref_file.write(ref_audio)
+            ref_file.flush()
+            with model_lock:
+                audio = synthesize(state["model"], request.text, ref_file.name, request.ref_text)
+        return speech_response(audio, request.format)
+
+    return web_app
+
+
+if modal is not None:
+    # Define the Modal app
+    app = modal.App("indicf5-tts")
+
+    # Create a container image with the required dependencies
+    image = (
+        modal.Image.debian_slim()
+        .apt_install("git")
+        .pip_install(
+            "torch",
+            "transformers",
+            "soundfile",
+            "numpy",
+            "fastapi[standard]",  # Added FastAPI with recommended extensions
+            "git+https://github.com/ai4bharat/IndicF5.git"
+        )
+    )
+
+    @app.cls(
+        image=image,
+        gpu="T4",  # Use T4 GPU for inference
+        timeout=600,  # 10 minute timeout
+        min_containers=1,  # Keep one container warm so requests skip the model load
+        scaledown_window=300
+    )
+    class IndicF5Service:
+        @modal.enter()
+        def load(self):
+            # Runs once per container, before the first request
+            self.model = load_model()
+
+        @modal.asgi_app()
+        def web(self):
+            return create_app(lambda: self.model)
 
-    return audio.tolist()  # Convert to list for JSON serialization
 
 if __name__ == "__main__":
-    app.serve()
+    parser = argparse.ArgumentParser(description="IndicF5 TTS service")
+    parser.add_argument("--local", action="store_true", help="Serve locally with uvicorn instead of Modal")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--device", default=None, help="Torch device, e.g. cpu or cuda (default: auto)")
+    args = parser.parse_args()
+
+    if args.local:
+        import uvicorn
+        uvicorn.run(create_app(lambda: load_model(args.device)), host=args.host, port=args.port)
+    else:
+        print("Deploy with: modal deploy indicf5/modal_deploy.py (or use --local to serve on this machine)")
@@ -1,13 +1,18 @@
+import io
 import requests
+import soundfile as sf
 
 response = requests.post(
-    "https://deviprasadshetty400--indicf5-tts-generate-speech.modal.run",
+    "https://deviprasadshetty400--indicf5-tts-indicf5service-web.modal.run/generate_speech",
     json={
         "text": "नमस्ते! संगीत की तरह जीवन भी खूबसूरत होता है।",
         "ref_audio_path": "path/to/reference.wav",
-        "ref_text": "Reference audio transcript"
+        "ref_text": "Reference audio transcript",
+        "format": "flac"  # or "wav"
     }
 )
+response.raise_for_status()
 
-# The response will contain the generated audio as a list of float values
-audio_data = response.json()
+# The response body is the encoded audio file
+audio_data, sample_rate = sf.read(io.BytesIO(response.content), dtype="float32")
+sf.write("output.wav", audio_data, sample_rate)
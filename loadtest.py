@@ -0,0 +1,402 @@
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from benchmark import configure_for_upstream
+from mock_upstream import MockUpstream, make_wav_bytes, parse_latency_args
+from src.languages import label_for
+from src.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+# One request's outcome: (latency seconds, queue wait seconds or None, error or None)
+Sample = Tuple[float, Optional[float], Optional[str]]
+
+
+class Workload:
+    """
+    A mix of clip lengths and language pairs to draw requests from.
+
+    Clips are synthetic tones written once per length; each request picks a
+    clip and a pair at random (seeded, so runs are repeatable).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        clip_seconds: Sequence[float] = (1.0, 3.0),
+        pairs: Sequence[Tuple[str, str]] = (('hi', 'ta'),),
+        clips_per_length: int = 4,
+        seed: int = 0
+    ):
+        self.clips = []
+        for length in clip_seconds:
+            for i in range(clips_per_length):
+                path = os.path.join(directory, f"load_{length:g}s_{i}.wav")
+                with open(path, 'wb') as f:
+                    f.write(make_wav_bytes(length, sample_rate=16000, frequency=200.0 + 7 * i + length))
+                self.clips.append(path)
+        self.pairs = list(pairs)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next(self) -> Tuple[str, str, str]:
+        """(clip path, source, target) for the next request."""
+        with self._lock:
+            source, target = self._random.choice(self.pairs)
+            return self._random.choice(self.clips), source, target
+
+
+class RestTarget:
+    """Sends jobs to POST /pipeline of the REST API (api_server.py)."""
+
+    name = "rest"
+
+    def __init__(self, base_url: str, timeout: float = 300.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        # One keep-alive connection per simulated user
+        if getattr(self._local, 'session', None) is None:
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def __call__(self, clip: str, source: str, target: str) -> Optional[float]:
+        """Run one job; returns the server-reported queue wait in seconds, if any."""
+        with open(clip, 'rb') as f:
+            audio = f.read()
+        response = self._session().post(
+            f"{self.base_url}/pipeline", params={'source': source, 'target': target},
+            data=audio, headers={'Content-Type': 'audio/wav'}, timeout=self.timeout)
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}: {response.text[:200]}")
+        return server_timing(response.headers.get('Server-Timing', '')).get('queue')
+
+
+class GradioTarget:
+    """
+    Sends jobs to a running Gradio interface through gradio_client.
+
+    Queue wait is the time until the job leaves Gradio's queue (or, with
+    VANGMAYA_QUEUE_PATH, the worker queue behind it) and starts processing.
+    """
+
+    name = "gradio"
+    WAITING = ('STARTING', 'JOINING_QUEUE', 'QUEUE', 'SENDING_DATA')
+
+    def __init__(self, url: str, api_name: str = "/process_audio", poll_interval: float = 0.05):
+        try:
+            from gradio_client import Client, handle_file
+        except ImportError:
+            raise ImportError("gradio_client is required for the gradio target: pip install gradio_client")
+        self.url = url
+        self.api_name = api_name
+        self.poll_interval = poll_interval
+        self._handle_file = handle_file
+        self._client_class = Client
+        self._local = threading.local()
+
+    def _client(self):
+        if getattr(self._local, 'client', None) is None:
+            self._local.client = self._client_class(self.url, verbose=False)
+        return self._local.client
+
+    def __call__(self, clip: str, source: str, target: str) -> Optional[float]:
+        start = time.perf_counter()
+        job = self._client().submit(self._handle_file(clip), label_for(source), label_for(target),
+                                    api_name=self.api_name)
+        queue_wait = None
+        while not job.done():
+            if queue_wait is None and job.status().code.name not in self.WAITING:
+                queue_wait = time.perf_counter() - start
+            time.sleep(self.poll_interval)
+        text, _ = job.result()
+        # The interface reports failures as text rather than raising
+        if text.startswith(("Error:", "Service is busy")):
+            raise Exception(text)
+        # None if the job finished between polls
+        return queue_wait
+
+
+def server_timing(header: str) -> Dict[str, float]:
+    """Parse a Server-Timing header into seconds per metric name."""
+    timings = {}
+    for entry in header.split(','):
+        name, _, params = entry.strip().partition(';')
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'dur' and value:
+                timings[name] = float(value) / 1000.0
+    return timings
+
+
+class ProcessSampler:
+    """
+    Samples a process's CPU use and resident memory from /proc while a load
+    level runs. CPU is reported as a percentage of one core.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self._tick = os.sysconf('SC_CLK_TCK')
+        self._page = os.sysconf('SC_PAGE_SIZE')
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cpu: List[float] = []
+        self._rss: List[int] = []
+
+    def _read(self) -> Tuple[float, int]:
+        with open(f"/proc/{self.pid}/stat") as f:
+            # The command name may contain spaces; fields resume after its ")"
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f"/proc/{self.pid}/statm") as f:
+            resident = int(f.read().split()[1])
+        return (int(fields[11]) + int(fields[12])) / self._tick, resident * self._page
+
+    def _run(self) -> None:
+        last_cpu, _ = self._read()
+        last = time.perf_counter()
+        while True:
+            # Always sample once more on stop, so short levels get a reading
+            stopped = self._stop.wait(self.interval)
+            try:
+                cpu, rss = self._read()
+            except OSError:
+                return
+            now = time.perf_counter()
+            self._cpu.append(100.0 * (cpu - last_cpu) / (now - last))
+            self._rss.append(rss)
+            last_cpu, last = cpu, now
+            if stopped:
+                return
+
+    def start(self) -> "ProcessSampler":
+        self._thread = threading.Thread(target=self._run, name='process-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Dict[str, float]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return {
+            'cpu_pct_mean': round(sum(self._cpu) / len(self._cpu), 1) if self._cpu else 0.0,
+            'cpu_pct_max': round(max(self._cpu), 1) if self._cpu else 0.0,
+            'rss_mb_max': round(max(self._rss) / 2 ** 20, 1) if self._rss else 0.0,
+        }
+
+
+def run_level(
+    target: Callable[[str, str, str], Optional[float]],
+    workload: Workload,
+    concurrency: int,
+    requests_per_level: int,
+    pid: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Run requests_per_level jobs with `concurrency` simulated users, each
+    sending its next job as soon as the previous one answers.
+    """
+    samples: List[Sample] = []
+    lock = threading.Lock()
+    remaining = [requests_per_level]
+
+    def user() -> None:
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            clip, source, target_lang = workload.next()
+            start = time.perf_counter()
+            try:
+                queue_wait, error = target(clip, source, target_lang), None
+            except Exception as e:
+                queue_wait, error = None, str(e)
+            with lock:
+                samples.append((time.perf_counter() - start, queue_wait, error))
+
+    sampler = ProcessSampler(pid).start() if pid else None
+    started = time.perf_counter()
+    users = [threading.Thread(target=user, name=f'load-user-{i}', daemon=True) for i in range(concurrency)]
+    for thread in users:
+        thread.start()
+    for thread in users:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    resources = sampler.stop() if sampler is not None else {}
+
+    latencies = [latency for latency, _, error in samples if error is None]
+    waits = [wait for _, wait, error in samples if error is None and wait is not None]
+    errors = [error for _, _, error in samples if error is not None]
+    return {
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'succeeded': len(latencies),
+        'failed': len(errors),
+        'error_rate': round(len(errors) / len(samples), 4) if samples else 0.0,
+        'throughput_jobs_per_s': round(len(latencies) / elapsed, 4) if elapsed else 0.0,
+        'latency_s': {
+            'p50': round(percentile(latencies, 50), 4),
+            'p95': round(percentile(latencies, 95), 4),
+            'p99': round(percentile(latencies, 99), 4),
+            'max': round(max(latencies), 4) if latencies else 0.0,
+        },
+        'queue_wait_s': {
+            'p50': round(percentile(waits, 50), 4),
+            'p95': round(percentile(waits, 95), 4),
+        } if waits else None,
+        **resources,
+        'sample_errors': errors[:3],
+    }
+
+
+def run_ramp(
+    target: Callable[[str, str, str], Optional[float]],
+    workload: Workload,
+    levels: Sequence[int] = (1, 2, 4, 8),
+    requests_per_user: int = 5,
+    pid: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Run each concurrency level in turn and find where queueing takes over.
+
+    saturation_concurrency is the first level whose median queue wait
+    exceeds half its median latency, i.e. requests spend more time waiting
+    than being worked on; None if no level got there.
+    """
+    results = []
+    saturation = None
+    for concurrency in levels:
+        level = run_level(target, workload, concurrency, concurrency * requests_per_user, pid)
+        logger.info(f"{concurrency} users: p50 {level['latency_s']['p50']}s, "
+                    f"{level['throughput_jobs_per_s']} jobs/s, {level['failed']} failed")
+        results.append(level)
+        waits = level['queue_wait_s']
+        if saturation is None and waits and waits['p50'] > level['latency_s']['p50'] / 2:
+            saturation = concurrency
+    return {'target': getattr(target, 'name', 'custom'), 'levels': results, 'saturation_concurrency': saturation}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# gradio_interface.py's own launch() shares publicly on a fixed port, so the
+# child builds the same interface and serves it locally on the given one
+_GRADIO_LAUNCHER = ("import sys, gradio_interface; gradio_interface.create_interface().queue()"
+                    ".launch(server_name='127.0.0.1', server_port=int(sys.argv[1]))")
+
+
+def _start_server(command: List[str], name: str, ready: Callable[[str], bool],
+                  startup_timeout: float) -> Tuple[subprocess.Popen, str]:
+    """Run a server in a child process (so its CPU and RSS are its own) and wait until ready(base_url)."""
+    port = _free_port()
+    process = subprocess.Popen(command + [str(port)], cwd=_HERE,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with status {process.returncode}")
+        try:
+            if ready(base_url):
+                return process, base_url
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{name} did not come up within {startup_timeout:.0f}s")
+
+
+def start_rest_server(startup_timeout: float = 60.0) -> Tuple[subprocess.Popen, str]:
+    """Run api_server.py in a child process and wait for /health."""
+    return _start_server(
+        [sys.executable, os.path.join(_HERE, 'api_server.py'), '--port'], 'api_server.py',
+        lambda url: requests.get(f"{url}/health", timeout=1).json().get('status') == 'ok',
+        startup_timeout)
+
+
+def start_gradio_server(startup_timeout: float = 120.0) -> Tuple[subprocess.Popen, str]:
+    """Run the Gradio interface in a child process and wait until it serves its page."""
+    return _start_server(
+        [sys.executable, '-c', _GRADIO_LAUNCHER], 'gradio_interface.py',
+        lambda url: requests.get(url, timeout=1).status_code == 200,
+        startup_timeout)
+
+
+def parse_pairs(value: str) -> List[Tuple[str, str]]:
+    """Parse "hi:ta,en:hi" into language pairs."""
+    pairs = []
+    for pair in value.split(','):
+        source, _, target = pair.strip().partition(':')
+        if not target:
+            raise ValueError(f"Language pair {pair} should look like hi:ta")
+        pairs.append((source, target))
+    return pairs
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Ramp concurrent load against the REST API or the Gradio interface")
+    parser.add_argument('--target', choices=('rest', 'gradio'), default='rest')
+    parser.add_argument('--url', help='Running server to test; omit it to start api_server.py (rest) or '
+                                      'gradio_interface.py (gradio) against the mock upstream')
+    parser.add_argument('--pid', type=int, help='Server process to sample CPU and RSS from')
+    parser.add_argument('--levels', default='1,2,4,8', help='Concurrency levels to ramp through')
+    parser.add_argument('--requests-per-user', type=int, default=5)
+    parser.add_argument('--clip-seconds', default='1,3', help='Clip lengths in the mix')
+    parser.add_argument('--pairs', default='hi:ta,ta:hi', help='Language pairs in the mix')
+    parser.add_argument('--latency', action='append',
+                        help='ROUTE=SPEC for the mock upstream, e.g. synthesize=lognormal:0,0.4 (repeatable)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--json', help='Also write the report to this file')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='vangmaya-load-')
+    workload = Workload(workdir, [float(s) for s in args.clip_seconds.split(',')], parse_pairs(args.pairs))
+    upstream = server = None
+    try:
+        base_url, pid = args.url, args.pid
+        if not base_url:
+            upstream = MockUpstream(latency=parse_latency_args(args.latency), error_rate=args.error_rate).start()
+            # The server process inherits the upstream settings
+            configure_for_upstream(upstream.base_url)
+            server, base_url = start_rest_server() if args.target == 'rest' else start_gradio_server()
+            pid = server.pid
+        target = RestTarget(base_url) if args.target == 'rest' else GradioTarget(base_url)
+        report = run_ramp(target, workload, [int(level) for level in args.levels.split(',')],
+                          args.requests_per_user, pid)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if upstream is not None:
+            upstream.stop()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    main()
@@ -0,0 +1,335 @@
+import argparse
+import base64
+import io
+import json
+import logging
+import math
+import random
+import struct
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ROUTES = {
+    '/inference/transcribe': 'transcribe',
+    '/inference/translate': 'translate',
+    '/synthesize_speech': 'synthesize',
+}
+
+class LatencyModel:
+    """
+    Samples artificial upstream latency in seconds.
+
+    Specs look like "fixed:0.2", "uniform:0.1,0.5", "normal:0.3,0.05"
+    or "lognormal:-1.5,0.5" (mu and sigma of the underlying normal).
+    """
+
+    def __init__(self, spec: str = "fixed:0"):
+        self.spec = spec
+        kind, _, params = spec.partition(':')
+        self.kind = kind
+        self.params = [float(p) for p in params.split(',') if p]
+        if kind not in ('fixed', 'uniform', 'normal', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self) -> float:
+        """Draw one latency value."""
+        if self.kind == 'fixed':
+            value = self.params[0] if self.params else 0.0
+        elif self.kind == 'uniform':
+            value = random.uniform(*self.params)
+        elif self.kind == 'normal':
+            value = random.gauss(*self.params)
+        else:
+            value = random.lognormvariate(*self.params)
+        return max(0.0, value)
+
+
+def make_wav_bytes(duration: float, sample_rate: int = 24000, frequency: float = 220.0) -> bytes:
+    """Build a mono 16-bit WAV file containing a quiet sine tone."""
+    n_samples = int(duration * sample_rate)
+    samples = (int(8000 * math.sin(2 * math.pi * frequency * i / sample_rate)) for i in range(n_samples))
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(struct.pack(f'<{n_samples}h', *samples))
+    return buffer.getvalue()
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        route = ROUTES.get(self.path.split('?')[0])
+        if route is None:
+            self._send_json(404, {"error": "not found"})
+            return
+
+        upstream = self.server.upstream
+        upstream.record_request(route)
+        time.sleep(upstream.latency_for(route).sample())
+        if random.random() < upstream.error_rate:
+            self._send_json(503, {"error": "upstream overloaded"})
+            return
+
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+        getattr(self, f'_handle_{route}')(payload)
+
+    def _handle_transcribe(self, payload):
+        if 'audioContent' not in payload or 'sourceLanguage' not in payload:
+            self._send_json(400, {"error": "audioContent and sourceLanguage are required"})
+            return
+        audio = base64.b64decode(payload['audioContent'])
+        words = max(1, len(audio) // 16000)
+        text = ' '.join(f"word{i}" for i in range(words))
+        self._send_json(200, {"output": [{"source": text}], "status": "SUCCESS"})
+
+    def _handle_translate(self, payload):
+        if 'input' not in payload or 'targetLanguage' not in payload:
+            self._send_json(400, {"error": "input and targetLanguage are required"})
+            return
+        target = f"[{payload['targetLanguage']}] {payload['input']}"
+        self._send_json(200, {"output": [{"source": payload['input'], "target": target}]})
+
+    def _handle_synthesize(self, payload):
+        if 'text' not in payload:
+            self._send_json(400, {"error": "text is required"})
+            return
+        # Roughly 15 characters of speech per second, like a real speaker
+        duration = min(30.0, 0.5 + len(payload['text']) / 15.0)
+        self._send(200, make_wav_bytes(duration), 'audio/wav')
+
+    def _send_json(self, status: int, payload: Dict):
+        self._send(status, json.dumps(payload).encode('utf-8'), 'application/json')
+
+    def _send(self, status: int, data: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class MockUpstream:
+    """
+    Local stand-in for the ASR, translation and IndicF5 upstreams.
+
+    Serves /inference/transcribe, /inference/translate and /synthesize_speech
+    with configurable latency distributions and error rates, so the whole
+    pipeline can run offline.
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: Optional[Dict[str, str]] = None,
+        error_rate: float = 0.0
+    ):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Latency spec per route ("transcribe", "translate",
+                "synthesize"); "default" applies to unlisted routes
+            error_rate: Probability of answering any request with HTTP 503
+        """
+        self.host = host
+        self.port = port
+        self.error_rate = error_rate
+        self.latency = {name: LatencyModel(spec) for name, spec in (latency or {}).items()}
+        self.request_counts = {name: 0 for name in ROUTES.values()}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def latency_for(self, route: str) -> LatencyModel:
+        """Get the latency model for a route."""
+        return self.latency.get(route) or self.latency.get('default') or LatencyModel()
+
+    def record_request(self, route: str) -> None:
+        with self._lock:
+            self.request_counts[route] += 1
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> 'MockUpstream':
+        """Start serving in a background thread."""
+        self._server = ThreadingHTTPServer((self.host, self.port), _MockHandler)
+        self._server.daemon_threads = True
+        self._server.upstream = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Mock upstream listening on {self.base_url}")
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _ReusableTCPServer(ThreadingTCPServer):
+    # Set on a subclass so other servers in the process keep the stdlib default
+    allow_reuse_address = True
+
+
+class _RedisHandler(StreamRequestHandler):
+    """Answers the RESP commands RedisCache uses, one connection per client."""
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line.startswith(b'*'):
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        store = self.server.redis
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            command = args[0].decode('utf-8').upper()
+            if store.down:
+                self.wfile.write(b'-ERR unavailable\r\n')
+                continue
+            with store._lock:
+                store.commands[command] = store.commands.get(command, 0) + 1
+                if command == 'PING':
+                    self.wfile.write(b'+PONG\r\n')
+                elif command == 'GET':
+                    value = store.get(args[1])
+                    self.wfile.write(b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value))
+                elif command == 'SET':
+                    ttl = int(args[4]) if len(args) > 4 and args[3].upper() == b'EX' else None
+                    store.data[args[1]] = (args[2], time.time() + ttl if ttl else None)
+                    self.wfile.write(b'+OK\r\n')
+                elif command == 'DEL':
+                    removed = sum(store.data.pop(key, None) is not None for key in args[1:])
+                    self.wfile.write(b':%d\r\n' % removed)
+                elif command in ('SELECT', 'AUTH'):
+                    self.wfile.write(b'+OK\r\n')
+                else:
+                    self.wfile.write(b"-ERR unknown command '%s'\r\n" % args[0])
+
+
+class MockRedis:
+    """
+    Local stand-in for a Redis server, speaking just enough RESP for
+    RedisCache (PING, GET, SET with EX, DEL, SELECT, AUTH).
+
+    Counts commands by name and can be switched to answer every command
+    with an error to simulate an outage.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self.data: Dict[bytes, tuple] = {}
+        self.commands: Dict[str, int] = {}
+        self.down = False
+        self._lock = threading.Lock()
+        self._server = None
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and time.time() >= expires:
+            del self.data[key]
+            return None
+        return value
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    def start(self) -> 'MockRedis':
+        """Start serving in a background thread."""
+        self._server = _ReusableTCPServer((self.host, self.port), _RedisHandler)
+        self._server.daemon_threads = True
+        self._server.redis = self
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def parse_latency_args(values) -> Dict[str, str]:
+    """Parse ROUTE=SPEC command line values into a latency mapping."""
+    latency = {}
+    for value in values or []:
+        route, _, spec = value.partition('=')
+        if not spec:
+            route, spec = 'default', route
+        latency[route] = spec
+    return latency
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the local mock upstream server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', action='append',
+                        help='ROUTE=SPEC, e.g. synthesize=lognormal:0,0.4 (repeatable)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    upstream = MockUpstream(args.host, args.port, parse_latency_args(args.latency), args.error_rate)
+    upstream.start()
+    print(f"Mock upstream running at {upstream.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        upstream.stop()
@@ -5,8 +5,14 @@ import numpy as np
 import soundfile as sf
 import os
 from pathlib import Path
+import asyncio
 import base64
+import hashlib
 import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.batching import MicroBatcher, run_each
+from src.prompt_cache import PromptStore
 
 # Define Modal stub and container image
 stub = modal.Stub("indic-tts")
@@ -23,22 +29,57 @@ image = modal.Image.debian_slim().pip_install(
     "safetensors>=0.3.1",
     "soundfile>=0.11.0",
     "numpy>=1.20.0",
+    "scipy>=1.10.0",
+    "fastapi>=0.100.0",
     "git+https://github.com/ai4bharat/IndicF5.git"
 )
 
-# Define Modal class with GPU support
+# Batching window: a batch runs once it is full or the oldest request has waited this long
+MAX_BATCH_SIZE = int(os.getenv("TTS_MAX_BATCH_SIZE", "8"))
+MAX_BATCH_WAIT_MS = float(os.getenv("TTS_MAX_BATCH_WAIT_MS", "25"))
+# Groups (one per reference prompt) prepare their prompts side by side; the model
+# itself is not safe for concurrent calls, so texts take turns on it
+BATCH_WORKERS = int(os.getenv("TTS_BATCH_WORKERS", "2"))
+INFERENCE_WORKERS = int(os.getenv("TTS_INFERENCE_WORKERS", "1"))
+
+DEFAULT_PROMPT_PATH = "/prompts/PAN_F_HAPPY_00001.wav"
+DEFAULT_PROMPT_TEXT = "ਭਹੰਪੀ ਵਿੱਚ ਸਮਾਰਕਾਂ ਦੇ ਭਵਨ ਨਿਰਮਾਣ ਕਲਾ ਦੇ ਵੇਰਵੇ ਗੁੰਝਲਦਾਰ ਅਤੇ ਹੈਰਾਨ ਕਰਨ ਵਾਲੇ ਹਨ, ਜੋ ਮੈਨੂੰ ਖੁਸ਼ ਕਰਦੇ  ਹਨ।"
+# Uploaded prompts live under their content hash, so concurrent callers never share a file.
+# Each container keeps at most PROMPT_CACHE_SIZE of its own on the volume, and files no
+# container has used for TTS_PROMPT_MAX_AGE_HOURS are pruned when a container starts
+PROMPT_DIR = "/prompts/by-hash"
+PROMPT_CACHE_SIZE = int(os.getenv("TTS_PROMPT_CACHE_SIZE", "64"))
+PROMPT_MAX_AGE = float(os.getenv("TTS_PROMPT_MAX_AGE_HOURS", "168")) * 3600
+
+
+def prompt_key(ref_audio_base64: str = None, ref_text: str = None) -> str:
+    """Key requests by their reference prompt so batches can share it."""
+    if not (ref_audio_base64 and ref_text):
+        return "default"
+    digest = hashlib.sha256()
+    digest.update(ref_audio_base64.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(ref_text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Define Modal class with GPU support; concurrent inputs land in the same
+# container so the batcher has something to group
 @stub.cls(
     image=image,
     gpu=modal.gpu.T4(),
     secret=modal.Secret.from_name("huggingface-token"),
-    volumes={"/prompts": volume}
+    volumes={"/prompts": volume},
+    mounts=[modal.Mount.from_local_python_packages("src")],
+    allow_concurrent_inputs=MAX_BATCH_SIZE * 2,
+    container_idle_timeout=300
 )
 class IndicTTS:
-    def __init__(self):
+    def __enter__(self):
         # Load model using HF token for authentication
         self.hf_token = os.environ["HUGGINGFACE_TOKEN"]
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        
+
         # Initialize model
         self.model = AutoModel.from_pretrained(
             "ai4bharat/IndicF5",
@@ -46,6 +87,78 @@ class IndicTTS:
             trust_remote_code=True
         ).to(self.device)
 
+        # The model is not safe for concurrent calls; requests take turns
+        self.model_lock = threading.Lock()
+        # Commit after writing and reload before looking, so prompts cross containers
+        self.prompts = PromptStore(PROMPT_DIR, sample_rate=24000, max_entries=PROMPT_CACHE_SIZE,
+                                   max_age=PROMPT_MAX_AGE, commit=volume.commit, reload=volume.reload)
+        self.inference = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="indic-tts")
+        self.batcher = MicroBatcher(
+            self._synthesize_group,
+            max_batch_size=MAX_BATCH_SIZE,
+            max_wait_ms=MAX_BATCH_WAIT_MS,
+            name="indic-tts",
+            workers=BATCH_WORKERS
+        )
+
+    def __exit__(self, *exc):
+        self.batcher.close()
+        self.inference.shutdown(wait=True)
+
+    def _prepare_prompt(self, ref_audio_base64: str = None, ref_text: str = None):
+        """
+        Get (ref_audio_path, ref_text) for a request.
+
+        Uploaded audio is decoded and resampled to 24 kHz once per distinct
+        clip; repeat speakers get the cached, content-addressed prompt file.
+        """
+        if ref_audio_base64 and ref_text:
+            prompt = self.prompts.prepare(base64.b64decode(ref_audio_base64))
+            return prompt.path, ref_text
+        # Use default reference prompt
+        return DEFAULT_PROMPT_PATH, DEFAULT_PROMPT_TEXT
+
+    def _synthesize_group(self, key: str, requests: list) -> list:
+        """
+        Synthesize a group of requests that share one reference prompt.
+
+        The IndicF5 wrapper takes a single text per call, so there is no
+        tensor batch to build. The prompt is prepared once for the group and
+        its texts then take turns on the model.
+        """
+        first = requests[0]
+        ref_audio_path, ref_text = self._prepare_prompt(first["ref_audio_base64"], first["ref_text"])
+
+        def synthesize(request: dict) -> bytes:
+            try:
+                with self.model_lock, torch.inference_mode():
+                    # Generate speech
+                    audio = self.model(
+                        request["text"],
+                        ref_audio_path=ref_audio_path,
+                        ref_text=ref_text
+                    )
+
+                # Normalize audio
+                if audio.dtype == np.int16:
+                    audio = audio.astype(np.float32) / 32768.0
+
+                # Save to bytes buffer
+                buffer = io.BytesIO()
+                sf.write(buffer, np.array(audio, dtype=np.float32), samplerate=24000, format='WAV')
+                return buffer.getvalue()
+            except Exception as e:
+                # One bad text should not fail the rest of its batch
+                return modal.Error(f"Speech generation failed: {str(e)}")
+
+        return run_each(self.inference, synthesize, requests)
+
+    def _submit(self, text: str, ref_audio_base64: str = None, ref_text: str = None):
+        return self.batcher.submit(
+            {"text": text, "ref_audio_base64": ref_audio_base64, "ref_text": ref_text},
+            key=prompt_key(ref_audio_base64, ref_text)
+        )
+
     @modal.method()
     def generate_speech(
         self,
@@ -62,66 +175,44 @@ class IndicTTS:
         Returns:
             bytes: Audio data in WAV format
         """
-        try:
-            # If reference audio is provided, save it temporarily
-            if ref_audio_base64 and ref_text:
-                ref_audio_data = base64.b64decode(ref_audio_base64)
-                ref_audio_path = "/prompts/ref_audio.wav"
-                with open(ref_audio_path, "wb") as f:
-                    f.write(ref_audio_data)
-            else:
-                # Use default reference prompt
-                ref_audio_path = "/prompts/PAN_F_HAPPY_00001.wav"
-                ref_text = "ਭਹੰਪੀ ਵਿੱਚ ਸਮਾਰਕਾਂ ਦੇ ਭਵਨ ਨਿਰਮਾਣ ਕਲਾ ਦੇ ਵੇਰਵੇ ਗੁੰਝਲਦਾਰ ਅਤੇ ਹੈਰਾਨ ਕਰਨ ਵਾਲੇ ਹਨ, ਜੋ ਮੈਨੂੰ ਖੁਸ਼ ਕਰਦੇ  ਹਨ।"
-
-            # Generate speech
-            audio = self.model(
-                text,
-                ref_audio_path=ref_audio_path,
-                ref_text=ref_text
-            )
-
-            # Normalize audio
-            if audio.dtype == np.int16:
-                audio = audio.astype(np.float32) / 32768.0
-
-            # Save to bytes buffer
-            buffer = io.BytesIO()
-            sf.write(buffer, np.array(audio, dtype=np.float32), samplerate=24000, format='WAV')
-            buffer.seek(0)
-            
-            return buffer.read()
-            
-        except Exception as e:
-            raise modal.Error(f"Speech generation failed: {str(e)}")
-
-# Create FastAPI endpoint
-@stub.function()
-@modal.web_endpoint(method="POST")
-async def tts_endpoint(
-    text: str,
-    ref_audio_base64: str = None,
-    ref_text: str = None
-):
-    """
-    Web endpoint for text-to-speech conversion
-    Args:
-        text: Input text to convert to speech
-        ref_audio_base64: Base64 encoded reference audio file (optional)
-        ref_text: Text corresponding to reference audio (optional)
-    Returns:
-        Audio file in WAV format
-    """
-    tts = IndicTTS()
-    audio_data = tts.generate_speech.call(text, ref_audio_base64, ref_text)
-    
-    return modal.Response(
-        audio_data,
-        headers={
-            "Content-Type": "audio/wav",
-            "Content-Disposition": "attachment; filename=speech.wav"
-        }
-    )
+        result = self._submit(text, ref_audio_base64, ref_text).result()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    @modal.web_endpoint(method="POST")
+    async def tts_endpoint(
+        self,
+        text: str,
+        ref_audio_base64: str = None,
+        ref_text: str = None
+    ):
+        """
+        Web endpoint for text-to-speech conversion
+        Args:
+            text: Input text to convert to speech
+            ref_audio_base64: Base64 encoded reference audio file (optional)
+            ref_text: Text corresponding to reference audio (optional)
+        Returns:
+            Audio file in WAV format, with the batch size and queue time in headers
+        """
+        from fastapi import HTTPException
+        from fastapi.responses import Response
+
+        future = self._submit(text, ref_audio_base64, ref_text)
+        audio_data = await asyncio.wrap_future(future)
+        if isinstance(audio_data, Exception):
+            raise HTTPException(status_code=500, detail=str(audio_data))
+
+        return Response(
+            audio_data,
+            headers={
+                "Content-Type": "audio/wav",
+                "Content-Disposition": "attachment; filename=speech.wav",
+                "X-Batch-Size": str(future.batch_size),
+                "X-Queue-Time-Ms": f"{future.queue_seconds * 1000:.1f}"
+            }
+        )
 
 # For local testing
 if __name__ == "__main__":
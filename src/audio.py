@@ -0,0 +1,256 @@
+import contextvars
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from math import gcd
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+from .audio_reader import AudioReader
+from .metrics import REGISTRY
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+AUDIO_FORMATS = {
+    # format: (soundfile format, subtype, content type)
+    "wav": ("WAV", "PCM_16", "audio/wav"),
+    "flac": ("FLAC", "PCM_16", "audio/flac"),
+    "opus": ("OGG", "OPUS", "audio/ogg"),
+    "mp3": ("MP3", "MPEG_LAYER_III", "audio/mpeg"),
+}
+LOSSY_FORMATS = ("opus", "mp3")
+# Opus only runs at these rates; other audio is resampled to 48 kHz first
+_OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+_CONTENT_TYPES = {content_type: name for name, (_, _, content_type) in AUDIO_FORMATS.items()}
+_EXTENSIONS = {"wav": "wav", "flac": "flac", "opus": "opus", "ogg": "opus", "mp3": "mp3"}
+
+ENCODE_DURATION = REGISTRY.histogram(
+    'vangmaya_audio_encode_seconds', 'Time spent encoding audio', ('format',))
+ENCODED_BYTES = REGISTRY.counter(
+    'vangmaya_audio_encoded_bytes', 'Bytes of encoded audio produced', ('format',))
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder() -> ThreadPoolExecutor:
+    """The shared audio encoding pool, sized by VANGMAYA_ENCODE_WORKERS (default 2)."""
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            _encoder = ThreadPoolExecutor(
+                max_workers=int(os.getenv('VANGMAYA_ENCODE_WORKERS', '2')),
+                thread_name_prefix='audio-encode'
+            )
+        return _encoder
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Resample a waveform with a polyphase filter."""
+    if source_rate == target_rate:
+        return samples
+    divisor = gcd(source_rate, target_rate)
+    return resample_poly(samples, target_rate // divisor, source_rate // divisor).astype(np.float32)
+
+
+def extension_for_format(format: str) -> str:
+    return "ogg" if format == "opus" else format
+
+
+def format_for_path(path: str, default: str = "wav") -> str:
+    """Guess an audio format from a file extension."""
+    extension = os.path.splitext(str(path))[1].lstrip('.').lower()
+    return _EXTENSIONS.get(extension, default)
+
+
+def format_for_content_type(content_type: Optional[str], default: str = "wav") -> str:
+    """Guess an audio format from a Content-Type header."""
+    if not content_type:
+        return default
+    return _CONTENT_TYPES.get(content_type.split(';')[0].strip().lower(), default)
+
+
+class AudioBuffer:
+    """
+    Audio handed between pipeline stages without going through disk.
+
+    Holds a float32 waveform and its sample rate, encoded bytes with a
+    format tag, or both. Each side is produced lazily from the other the
+    first time it is asked for and then kept, so passing a buffer along
+    costs nothing and bytes are never re-encoded in the format they came in.
+    encode_async() starts an encoding on the shared worker pool so it can
+    overlap with other work on the request thread. The lazy caches are
+    guarded by a per-buffer lock, so concurrent callers share one decode
+    and one encode per format.
+    """
+
+    __slots__ = ('_samples', '_sample_rate', '_format', '_encoded', '_pending', '_lock')
+
+    def __init__(
+        self,
+        samples: Optional[np.ndarray] = None,
+        sample_rate: Optional[int] = None,
+        data: Optional[bytes] = None,
+        format: str = "wav"
+    ):
+        if samples is None and data is None:
+            raise ValueError("AudioBuffer needs samples or encoded data")
+        if samples is not None and sample_rate is None:
+            raise ValueError("sample_rate is required with samples")
+        if format not in AUDIO_FORMATS:
+            raise ValueError(f"Unsupported format {format}. Choose from: {', '.join(AUDIO_FORMATS)}")
+        self._samples = None if samples is None else np.asarray(samples, dtype=np.float32)
+        self._sample_rate = sample_rate
+        self._format = format
+        self._encoded = {} if data is None else {format: data}
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, format: str = "wav") -> "AudioBuffer":
+        return cls(data=data, format=format)
+
+    @classmethod
+    def from_file(cls, path: str) -> "AudioBuffer":
+        """Read an audio file's bytes; decoding is deferred until samples are needed."""
+        with open(path, 'rb') as f:
+            return cls(data=f.read(), format=format_for_path(path))
+
+    @property
+    def format(self) -> str:
+        """The format the audio arrived in (wav when built from samples)."""
+        return self._format
+
+    @property
+    def samples(self) -> np.ndarray:
+        with self._lock:
+            if self._samples is None:
+                data = self._encoded[self.format]
+                with span('audio.decode', **{'audio.format': self.format, 'audio.bytes': len(data)}):
+                    samples, self._sample_rate = sf.read(io.BytesIO(data), dtype='float32')
+                self._samples = samples
+            return self._samples
+
+    @property
+    def sample_rate(self) -> int:
+        with self._lock:
+            if self._sample_rate is None:
+                self._sample_rate = sf.info(io.BytesIO(self._encoded[self.format])).samplerate
+            return self._sample_rate
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    def to_bytes(self, format: str = "wav") -> bytes:
+        """Encode the audio, reusing the original bytes when the format matches."""
+        future, owner = self._claim(format)
+        if owner:
+            self._fulfil(format, future)
+        return future.result()
+
+    def encode_async(self, format: str) -> Future:
+        """Encode on the worker pool; to_bytes(format) then waits for this instead of encoding again."""
+        future, owner = self._claim(format)
+        if owner:
+            context = contextvars.copy_context()
+            get_encoder().submit(context.run, self._fulfil, format, future)
+        return future
+
+    def _claim(self, format: str) -> Tuple[Future, bool]:
+        """The future for an encoding, and whether the caller must run it."""
+        with self._lock:
+            if format in self._encoded:
+                future = Future()
+                future.set_result(self._encoded[format])
+                return future, False
+            if format in self._pending:
+                return self._pending[format], False
+            future = self._pending[format] = Future()
+            return future, True
+
+    def _fulfil(self, format: str, future: Future) -> None:
+        try:
+            data = self._encode(format)
+        except Exception as e:
+            with self._lock:
+                self._pending.pop(format, None)
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._encoded[format] = data
+            self._pending.pop(format, None)
+        future.set_result(data)
+
+    def _encode(self, format: str) -> bytes:
+        if format not in AUDIO_FORMATS:
+            raise ValueError(f"Unsupported format {format}. Choose from: {', '.join(AUDIO_FORMATS)}")
+        sf_format, subtype, _ = AUDIO_FORMATS[format]
+        samples, sample_rate = self.samples, self.sample_rate
+        if format == "opus" and sample_rate not in _OPUS_RATES:
+            samples, sample_rate = resample(samples, sample_rate, 48000), 48000
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        with span('audio.encode', **{'audio.format': format, 'audio.samples': len(samples)}):
+            sf.write(buffer, samples, samplerate=sample_rate, format=sf_format, subtype=subtype)
+        ENCODE_DURATION.observe(time.perf_counter() - start, format=format)
+        data = buffer.getvalue()
+        ENCODED_BYTES.inc(len(data), format=format)
+        return data
+
+    def content_type(self, format: str = "wav") -> str:
+        return AUDIO_FORMATS[format][2]
+
+    def save(self, path: str, format: Optional[str] = None) -> str:
+        """Write the audio to path (format from the extension unless given); returns the path."""
+        data = self.to_bytes(format or format_for_path(path))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with span('file.write', **{'file.path': str(path), 'file.bytes': len(data)}):
+            with open(path, 'wb') as f:
+                f.write(data)
+        return str(path)
+
+    def to_gradio(self) -> Tuple[int, np.ndarray]:
+        """(sample_rate, samples), the value gr.Audio accepts directly."""
+        return self.sample_rate, self.samples
+
+
+def encode_for_upload(path: str, format: str = "flac", sample_rate: int = 16000) -> bytes:
+    """
+    Read an audio file and re-encode it compactly for upload.
+
+    The audio is downmixed to mono and resampled to sample_rate (what the
+    ASR model expects anyway) before encoding. This runs on the calling
+    thread, which needs the bytes before it can send the request anyway.
+    The input is streamed through an AudioReader, so only the encoded
+    output grows with the length of the recording.
+    """
+    if format not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported format {format}. Choose from: {', '.join(AUDIO_FORMATS)}")
+    if format == "opus" and sample_rate not in _OPUS_RATES:
+        sample_rate = 48000
+
+    sf_format, subtype, _ = AUDIO_FORMATS[format]
+    buffer = io.BytesIO()
+    start = time.perf_counter()
+    with span('audio.encode', **{'audio.format': format, 'file.path': str(path)}) as encode_span:
+        with AudioReader(path) as reader, sf.SoundFile(
+            buffer, 'w', samplerate=sample_rate, channels=1, format=sf_format, subtype=subtype
+        ) as output:
+            written = 0
+            for block in reader.blocks(sample_rate=sample_rate):
+                output.write(block)
+                written += len(block)
+        encode_span.set_attribute('audio.samples', written)
+    ENCODE_DURATION.observe(time.perf_counter() - start, format=format)
+    data = buffer.getvalue()
+    ENCODED_BYTES.inc(len(data), format=format)
+    return data
@@ -0,0 +1,252 @@
+import logging
+import os
+import struct
+from math import ceil, gcd
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SECONDS = 10.0
+RAW_EXTENSIONS = ('.pcm', '.raw')
+
+# soundfile subtype: (little-endian dtype, scale to [-1, 1))
+_MAPPABLE = {
+    "PCM_16": ('<i2', 1.0 / 32768),
+    "PCM_32": ('<i4', 1.0 / 2147483648),
+    "FLOAT": ('<f4', 1.0),
+    "DOUBLE": ('<f8', 1.0),
+}
+_RAW_SUBTYPES = {np.dtype('<i2'): "PCM_16", np.dtype('<i4'): "PCM_32", np.dtype('<f4'): "FLOAT"}
+
+
+def _wav_data_offset(path: str) -> Optional[Tuple[int, int]]:
+    """Byte offset and length of a RIFF/WAVE file's data chunk, or None if it has none."""
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            return None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+            if chunk_id == b'data':
+                return f.tell(), size
+            # Chunks are padded to an even length
+            f.seek(size + (size & 1), os.SEEK_CUR)
+
+
+class StreamResampler:
+    """
+    Polyphase resampling over a stream of blocks.
+
+    Each block is filtered together with enough input on either side to
+    cover the filter, so the concatenated output matches resample_poly()
+    over the whole signal while only holding one block plus a few hundred
+    samples of context. Call flush() after the last block.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int):
+        divisor = gcd(source_rate, target_rate)
+        self.up = target_rate // divisor
+        self.down = source_rate // divisor
+        # resample_poly's default filter reaches 10 * max(up, down) upsampled
+        # samples either side; context is kept a whole number of `down`
+        # steps so block edges land exactly on output samples
+        reach = ceil(10 * max(self.up, self.down) / self.up) + 1
+        self.context = ceil(reach / self.down) * self.down
+        self._buffer = None
+        self._start = -self.context  # input index of _buffer[0]
+        self._emitted = 0            # input samples whose output has been produced
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        block = np.asarray(block, dtype=np.float32)
+        if self._buffer is None:
+            # Zeros before the start, as resample_poly pads the whole signal
+            self._buffer = np.zeros((self.context,) + block.shape[1:], dtype=np.float32)
+        self._buffer = np.concatenate([self._buffer, block])
+        end = self._start + len(self._buffer)
+        ready = (end - self.context) // self.down * self.down
+        if ready <= self._emitted:
+            return self._buffer[:0]
+        return self._emit(ready)
+
+    def flush(self) -> np.ndarray:
+        if self._buffer is None:
+            return np.zeros(0, dtype=np.float32)
+        end = self._start + len(self._buffer)
+        if end <= self._emitted:
+            return self._buffer[:0]
+        return self._emit(end, final=True)
+
+    def _emit(self, ready: int, final: bool = False) -> np.ndarray:
+        if self.up == self.down:
+            out = self._buffer[self._emitted - self._start:ready - self._start]
+        else:
+            filtered = resample_poly(self._buffer, self.up, self.down, axis=0)
+            first = (self._emitted - self._start) * self.up // self.down
+            if final:
+                out = filtered[first:]
+            else:
+                out = filtered[first:first + (ready - self._emitted) * self.up // self.down]
+        self._emitted = ready
+        keep = ready - self.context - self._start
+        if keep > 0:
+            self._buffer = self._buffer[keep:]
+            self._start += keep
+        return np.asarray(out, dtype=np.float32)
+
+
+class AudioReader:
+    """
+    Bounded-memory access to an audio file of any length.
+
+    PCM and float WAV files, and headerless .pcm/.raw files, are memory-mapped
+    and converted to float32 one block at a time; anything else soundfile can
+    decode (FLAC, Ogg, MP3...) is decoded block by block. blocks() yields
+    fixed-size float32 frames, optionally downmixed and resampled on the fly,
+    so silence detection, resampling and chunking can run as a single pass
+    whose memory does not grow with the recording.
+
+    Headerless files need sample_rate and channels (and dtype if they are not
+    16-bit little-endian PCM).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: Optional[int] = None,
+        channels: Optional[int] = None,
+        dtype: str = '<i2'
+    ):
+        self.path = str(path)
+        self._map = None
+        self._file = None
+        self._scale = 1.0
+        if os.path.splitext(self.path)[1].lower() in RAW_EXTENSIONS:
+            if not sample_rate or not channels:
+                raise ValueError("Headerless PCM needs sample_rate and channels")
+            dtype = np.dtype(dtype)
+            subtype = _RAW_SUBTYPES.get(dtype)
+            if subtype is None:
+                raise ValueError(f"Unsupported PCM dtype {dtype}")
+            self.sample_rate, self.channels = sample_rate, channels
+            self._mmap(0, os.path.getsize(self.path), *_MAPPABLE[subtype])
+            return
+
+        info = sf.info(self.path)
+        self.sample_rate, self.channels = info.samplerate, info.channels
+        data = _wav_data_offset(self.path) if info.format == 'WAV' and info.subtype in _MAPPABLE else None
+        if data is not None:
+            self._mmap(*data, *_MAPPABLE[info.subtype])
+        else:
+            self._file = sf.SoundFile(self.path)
+            self.frames = self._file.frames
+
+    def _mmap(self, offset: int, size: int, dtype: str, scale: float) -> None:
+        itemsize = np.dtype(dtype).itemsize * self.channels
+        # A data chunk size of 0 or past the end of the file means "until EOF"
+        available = os.path.getsize(self.path) - offset
+        if size == 0 or size > available:
+            size = available
+        self.frames = size // itemsize
+        self._scale = scale
+        if self.frames:
+            self._map = np.memmap(self.path, dtype=dtype, mode='r', offset=offset,
+                                  shape=(self.frames, self.channels))
+
+    @property
+    def memory_mapped(self) -> bool:
+        return self._file is None
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate
+
+    def _convert(self, frames: np.ndarray, mono: bool) -> np.ndarray:
+        samples = np.array(frames, dtype=np.float32)
+        if self._scale != 1.0:
+            samples *= self._scale
+        if mono:
+            return samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+        return samples
+
+    def _read_frames(self, start: int, stop: int) -> np.ndarray:
+        if self._file is not None:
+            self._file.seek(start)
+            return self._file.read(stop - start, dtype='float32', always_2d=True)
+        if self._map is None:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        return self._map[start:stop]
+
+    def read(self, start: float = 0.0, end: Optional[float] = None, mono: bool = True) -> np.ndarray:
+        """Decode only the samples between start and end seconds."""
+        first = max(0, min(self.frames, int(start * self.sample_rate)))
+        last = self.frames if end is None else max(first, min(self.frames, int(end * self.sample_rate)))
+        return self._convert(self._read_frames(first, last), mono)
+
+    def _raw_blocks(self, size: int, mono: bool) -> Iterator[np.ndarray]:
+        for start in range(0, self.frames, size):
+            yield self._convert(self._read_frames(start, min(start + size, self.frames)), mono)
+
+    def blocks(
+        self,
+        block_frames: Optional[int] = None,
+        sample_rate: Optional[int] = None,
+        mono: bool = True
+    ) -> Iterator[np.ndarray]:
+        """
+        Yield float32 blocks of block_frames samples (the last may be shorter).
+
+        Args:
+            block_frames: Samples per block at the output rate; defaults to
+                BLOCK_SECONDS worth
+            sample_rate: Resample to this rate on the fly
+            mono: Downmix to 1-D blocks; otherwise blocks are (frames, channels)
+        """
+        rate = sample_rate or self.sample_rate
+        size = block_frames or int(BLOCK_SECONDS * rate)
+        if size < 1:
+            raise ValueError("block_frames must be at least 1")
+        if rate == self.sample_rate:
+            yield from self._raw_blocks(size, mono)
+            return
+
+        resampler = StreamResampler(self.sample_rate, rate)
+        source_size = max(1, size * self.sample_rate // rate)
+        pending, pending_frames = [], 0
+        pieces = (resampler.process(block) for block in self._raw_blocks(source_size, mono))
+        for piece in _chain_flush(pieces, resampler):
+            if not len(piece):
+                continue
+            pending.append(piece)
+            pending_frames += len(piece)
+            if pending_frames < size:
+                continue
+            joined = np.concatenate(pending)
+            cut = len(joined) // size * size
+            yield from (joined[i:i + size] for i in range(0, cut, size))
+            pending = [joined[cut:]]
+            pending_frames = len(joined) - cut
+        if pending_frames:
+            yield np.concatenate(pending)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._map = None
+
+    def __enter__(self) -> "AudioReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _chain_flush(pieces: Iterator[np.ndarray], resampler: StreamResampler) -> Iterator[np.ndarray]:
+    yield from pieces
+    yield resampler.flush()
@@ -0,0 +1,157 @@
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = REGISTRY.histogram(
+    'vangmaya_batch_size', 'Number of items run together in one model batch', ('batcher',),
+    buckets=(1, 2, 4, 8, 16, 32, 64))
+BATCH_ITEM_LATENCY = REGISTRY.histogram(
+    'vangmaya_batch_item_seconds', 'Per-item time spent queued and in total', ('batcher', 'phase'))
+
+_STOP = object()
+
+
+class _BatchItem:
+    __slots__ = ('payload', 'key', 'future', 'enqueued_at')
+
+    def __init__(self, payload: Any, key: Hashable):
+        self.payload = payload
+        self.key = key
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests into small batches for one model replica.
+
+    A batch closes when it reaches max_batch_size or max_wait_ms after its
+    first item arrived. Items are grouped by key (e.g. the reference prompt)
+    and each group is passed to process_batch(key, payloads), which must
+    return one result per payload in order.
+
+    With workers > 1, groups run on a pool of that many threads so a slow
+    group does not hold up the batches behind it; with the default of 1 they
+    run one after another on the batching thread.
+
+    Resolved futures carry batch_size and queue_seconds attributes.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[Hashable, List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 20.0,
+        name: str = 'default',
+        workers: int = 1
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._closed = False
+        self._pool = (ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"batcher-{name}")
+                      if workers > 1 else None)
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, payload: Any, key: Hashable = None) -> Future:
+        """Queue one item; the returned future resolves to its result."""
+        if self._closed:
+            raise RuntimeError("Batcher is closed")
+        item = _BatchItem(payload, key)
+        self._queue.put(item)
+        return item.future
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Finish queued work and stop the batching thread."""
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def _collect(self, first: _BatchItem) -> Tuple[List[_BatchItem], bool]:
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+
+            groups = OrderedDict()
+            for item in batch:
+                groups.setdefault(item.key, []).append(item)
+            for key, items in groups.items():
+                if self._pool is not None:
+                    self._pool.submit(self._run_group, key, items)
+                else:
+                    self._run_group(key, items)
+
+    def _run_group(self, key: Hashable, items: List[_BatchItem]) -> None:
+        started = time.perf_counter()
+        BATCH_SIZE.observe(len(items), batcher=self.name)
+        try:
+            results = self.process_batch(key, [item.payload for item in items])
+            if len(results) != len(items):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            logger.error(f"Batch of {len(items)} failed: {str(e)}")
+            for item in items:
+                item.future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        for item, result in zip(items, results):
+            item.future.batch_size = len(items)
+            item.future.queue_seconds = started - item.enqueued_at
+            BATCH_ITEM_LATENCY.observe(started - item.enqueued_at, batcher=self.name, phase='queue')
+            BATCH_ITEM_LATENCY.observe(finished - item.enqueued_at, batcher=self.name, phase='total')
+            item.future.set_result(result)
+
+
+def run_each(pool: ThreadPoolExecutor, process: Callable[[Any], Any], payloads: List[Any]) -> List[Any]:
+    """
+    Run process() on every payload of a group on pool.
+
+    For models that take one input per call: the group shares its setup
+    and its items run as far apart as the pool allows (one at a time on a
+    single-worker pool). A failing item returns its exception in place of
+    a result, so it does not fail the rest of the group.
+    """
+    futures = [pool.submit(process, payload) for payload in payloads]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
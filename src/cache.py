@@ -0,0 +1,369 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from .http_cache import get_cache_mode
+from .metrics import CACHE_REQUESTS
+from .retention import shard_path
+
+logger = logging.getLogger(__name__)
+
+# Records larger than this are stored once under their content hash and
+# referenced, so the same audio cached under many keys is held once
+BLOB_THRESHOLD = 64 * 1024
+CACHE_VERSION = 'v1'
+
+
+class CacheBackend:
+    """Byte-string key/value store behind StageCache."""
+
+    name = "base"
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU, bounded by total bytes."""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and time.time() >= expires:
+                self._pop(key)
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._pop(key)
+            self._items[key] = (value, time.time() + ttl if ttl else None)
+            self._size += len(value)
+            while self._size > self.max_bytes and self._items:
+                self._pop(next(iter(self._items)))
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key: str) -> None:
+        item = self._items.pop(key, None)
+        if item is not None:
+            self._size -= len(item[0])
+
+
+class DiskCache(CacheBackend):
+    """
+    One file per key under a sharded directory.
+
+    Files end in .cache so a RetentionManager covering the directory
+    (see src/retention.py) bounds it under the shared data budget; reads
+    touch the file so eviction follows use. TTLs are not stored; age is
+    left to the retention sweeper.
+    """
+
+    name = "disk"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return shard_path(self.directory, f"{key.replace(':', '_')}.cache")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = f.read()
+            os.utime(path)
+            return value
+        except OSError:
+            return None
+
+    def set(self, key, value, ttl=None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write under a temporary name so readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+class RedisError(Exception):
+    """An error reply from the Redis server."""
+
+
+class RedisCache(CacheBackend):
+    """
+    Minimal Redis client speaking RESP over plain sockets.
+
+    Only GET, SET (with EX), DEL and PING are needed, so this avoids a
+    client dependency. Each thread keeps its own connection; a broken
+    connection is reopened once before the error is raised.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', timeout: float = 2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = parsed.password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = (sock, sock.makefile('rb'))
+            if self.password:
+                self._roundtrip(connection, ('AUTH', self.password))
+            if self.db:
+                self._roundtrip(connection, ('SELECT', str(self.db)))
+        except BaseException:
+            # Never keep a connection that is unauthenticated or on the wrong database
+            sock.close()
+            raise
+        self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        return b''.join(parts)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Redis closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode('utf-8')
+        if kind == b'-':
+            raise RedisError(rest.decode('utf-8'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            count = int(rest)
+            return None if count < 0 else [self._read_reply(reader) for _ in range(count)]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+    def _roundtrip(self, connection, args):
+        sock, reader = connection
+        sock.sendall(self._encode(args))
+        return self._read_reply(reader)
+
+    def execute(self, *args):
+        connection = getattr(self._local, 'connection', None)
+        for attempt in range(2):
+            try:
+                if connection is None:
+                    connection = self._connect()
+                return self._roundtrip(connection, args)
+            except (ConnectionError, socket.timeout, OSError) as e:
+                self._drop()
+                connection = None
+                if attempt == 1:
+                    raise ConnectionError(f"Redis {self.host}:{self.port} unavailable: {str(e)}")
+
+    def _drop(self) -> None:
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None:
+            try:
+                connection[0].close()
+            except OSError:
+                pass
+
+    def ping(self) -> bool:
+        return self.execute('PING') == 'PONG'
+
+    def get(self, key):
+        return self.execute('GET', key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self.execute('SET', key, value, 'EX', max(1, int(ttl)))
+        else:
+            self.execute('SET', key, value)
+
+    def delete(self, key):
+        self.execute('DEL', key)
+
+    def close(self):
+        self._drop()
+
+
+class StageCache:
+    """
+    Content-addressed cache of stage results on top of a CacheBackend.
+
+    Keys are a hash of the stage name and its inputs (callers pass content
+    digests rather than file paths), so the same clip or text hits no
+    matter which node or path it arrives under. Values are zlib-compressed
+    JSON; byte payloads over BLOB_THRESHOLD are stored once under their own
+    hash and referenced from the record. Backend errors count as misses so
+    a cache outage never fails a request.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: Optional[float] = None,
+                 blob_threshold: int = BLOB_THRESHOLD):
+        self.backend = backend
+        self.ttl = ttl
+        self.blob_threshold = blob_threshold
+
+    @staticmethod
+    def key(stage: str, *parts: Any) -> str:
+        digest = hashlib.sha256(json.dumps([CACHE_VERSION, stage, *parts], ensure_ascii=False,
+                                           sort_keys=True).encode('utf-8')).hexdigest()
+        return f"vangmaya:{stage}:{digest}"
+
+    def _backend_get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Cache read failed ({self.backend.name}): {str(e)}")
+            return None
+
+    def _backend_set(self, key: str, value: bytes) -> None:
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning(f"Cache write failed ({self.backend.name}): {str(e)}")
+
+    def get(self, stage: str, *parts: Any) -> Tuple[Optional[Any], Optional[bytes]]:
+        """
+        Look up a stage result; returns (value, payload), (None, None) on a miss.
+
+        payload is the bytes stored alongside the value, if any.
+        """
+        raw = self._backend_get(self.key(stage, *parts))
+        if raw is None:
+            CACHE_REQUESTS.inc(cache=stage, result='miss')
+            return None, None
+        try:
+            record = json.loads(zlib.decompress(raw))
+        except (zlib.error, ValueError):
+            CACHE_REQUESTS.inc(cache=stage, result='miss')
+            return None, None
+        payload = None
+        if 'blob' in record:
+            payload = self._backend_get(f"vangmaya:blob:{record['blob']}")
+            if payload is None:
+                # The blob was evicted from under its record
+                CACHE_REQUESTS.inc(cache=stage, result='miss')
+                return None, None
+        elif 'inline' in record:
+            payload = bytes.fromhex(record['inline'])
+        CACHE_REQUESTS.inc(cache=stage, result='hit')
+        return record['value'], payload
+
+    def set(self, stage: str, value: Any, *parts: Any, payload: Optional[bytes] = None) -> None:
+        """Store a JSON-serializable value (and optional bytes payload) for a stage's inputs."""
+        record: Dict[str, Any] = {'value': value}
+        if payload is not None:
+            if len(payload) > self.blob_threshold:
+                digest = hashlib.sha256(payload).hexdigest()
+                self._backend_set(f"vangmaya:blob:{digest}", payload)
+                record['blob'] = digest
+            else:
+                record['inline'] = payload.hex()
+        self._backend_set(self.key(stage, *parts), zlib.compress(json.dumps(record).encode('utf-8'), 6))
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file's content, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+CACHE_BACKENDS = ('memory', 'disk', 'redis', 'off')
+_shared: Dict[Tuple[str, ...], StageCache] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> Optional[StageCache]:
+    """
+    The process-wide StageCache configured by VANGMAYA_CACHE, or None if unset.
+
+    VANGMAYA_CACHE is memory, disk (VANGMAYA_CACHE_DIR, default .vangmaya_cache)
+    or redis (VANGMAYA_CACHE_URL); VANGMAYA_CACHE_TTL sets an expiry in
+    seconds. Every stage client shares the one instance, and with it the
+    backend's connections.
+
+    Recording runs (VANGMAYA_HTTP_CACHE_MODE=record) get None too: a hit
+    would skip the upstream call and leave a hole in the recording.
+    """
+    name = os.getenv('VANGMAYA_CACHE', '').lower()
+    if not name or name == 'off' or get_cache_mode() == 'record':
+        return None
+    if name not in CACHE_BACKENDS:
+        raise ValueError(f"Unknown cache backend {name}. Choose from: {', '.join(CACHE_BACKENDS)}")
+    url = os.getenv('VANGMAYA_CACHE_URL', 'redis://localhost:6379/0')
+    directory = os.getenv('VANGMAYA_CACHE_DIR', '.vangmaya_cache')
+    ttl = float(os.getenv('VANGMAYA_CACHE_TTL', '0')) or None
+    config = (name, url, directory, str(ttl))
+    with _shared_lock:
+        if config not in _shared:
+            if name == 'memory':
+                backend = MemoryCache()
+            elif name == 'disk':
+                backend = DiskCache(directory)
+            else:
+                backend = RedisCache(url)
+            _shared[config] = StageCache(backend, ttl)
+        return _shared[config]
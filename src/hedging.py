@@ -0,0 +1,181 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+import requests
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+HEDGED_REQUESTS = REGISTRY.counter(
+    'vangmaya_hedged_requests', 'Duplicate requests sent, won or held back by the hedging budget',
+    ('service', 'outcome'))
+
+
+class Hedger:
+    """
+    Sends a duplicate of a slow request and takes whichever answers first.
+
+    The duplicate goes out when the original has not answered after the
+    percentile (p95 by default) of recent successful (2xx/3xx) latencies,
+    or initial_delay until min_samples have been seen; fast error responses
+    during an outage do not make hedging more aggressive. A token bucket
+    caps the duplicates: every request adds budget tokens (0.05 = 5 % extra
+    load) up to max_tokens, and a duplicate spends one. Without a token the
+    caller simply keeps waiting on the original.
+
+    Both copies run on a pool of at most `workers` reused threads. When the
+    pool is busy the request runs inline on the caller's thread, unhedged,
+    rather than queueing. A blocking requests call cannot be interrupted, so
+    the loser is abandoned and its response closed as soon as it arrives,
+    returning the connection to the pool.
+    """
+
+    def __init__(
+        self,
+        budget: float = 0.05,
+        percentile: float = 95.0,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.05,
+        min_samples: int = 20,
+        window: int = 200,
+        max_tokens: float = 10.0,
+        workers: int = 16,
+        service: str = 'default'
+    ):
+        if not 0 < budget <= 1:
+            raise ValueError("budget must be a fraction in (0, 1]")
+        self.budget = budget
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_tokens = max_tokens
+        self.service = service
+        self._latencies = deque(maxlen=window)
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'hedge-{service}')
+        self._slots = threading.BoundedSemaphore(workers)
+
+    @property
+    def delay(self) -> float:
+        """How long to wait on the original before hedging."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+    def _observe(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.budget)
+
+    def _withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _refund(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + 1)
+
+    def _timed(self, request: Callable[[], requests.Response]) -> requests.Response:
+        start = time.perf_counter()
+        response = request()
+        if response.status_code < 400:
+            self._observe(time.perf_counter() - start)
+        return response
+
+    def _start(self, request: Callable[[], requests.Response]) -> Optional[Future]:
+        """Run request on the pool, or return None when every worker is busy."""
+        if not self._slots.acquire(blocking=False):
+            return None
+        context = contextvars.copy_context()
+
+        def run():
+            try:
+                return context.run(self._timed, request)
+            finally:
+                self._slots.release()
+
+        return self._pool.submit(run)
+
+    @staticmethod
+    def _discard(future: Future) -> None:
+        if future.exception() is None:
+            future.result().close()
+
+    @staticmethod
+    def _succeeded(future: Future) -> bool:
+        # A 5xx is as much a failure as a dropped connection
+        return future.exception() is None and future.result().status_code < 500
+
+    def send(self, request: Callable[[], requests.Response]) -> requests.Response:
+        """
+        Run request(), hedging it once if it is slow.
+
+        A copy that raises or answers 5xx only decides the call once every
+        copy sent has failed; the original's outcome wins when both do.
+        """
+        self._deposit()
+        delay = self.delay
+        primary = self._start(request)
+        if primary is None:
+            return self._timed(request)
+        wait([primary], timeout=delay)
+        if primary.done():
+            return primary.result()
+        if not self._withdraw():
+            HEDGED_REQUESTS.inc(service=self.service, outcome='suppressed')
+            return primary.result()
+        hedge = self._start(request)
+        if hedge is None:
+            self._refund()
+            HEDGED_REQUESTS.inc(service=self.service, outcome='suppressed')
+            return primary.result()
+
+        HEDGED_REQUESTS.inc(service=self.service, outcome='sent')
+        logger.info(f"Hedging {self.service} request after {delay:.3f}s")
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in (primary, hedge):
+                if future in done and self._succeeded(future):
+                    loser = hedge if future is primary else primary
+                    loser.add_done_callback(self._discard)
+                    if future is hedge:
+                        HEDGED_REQUESTS.inc(service=self.service, outcome='won')
+                    return future.result()
+        self._discard(hedge)
+        return primary.result()
+
+    def close(self) -> None:
+        """Stop the worker threads once in-flight requests finish."""
+        self._pool.shutdown(wait=False)
+
+
+def hedger_from_env(service: str) -> Optional[Hedger]:
+    """
+    A Hedger for a service when VANGMAYA_<SERVICE>_HEDGE_PERCENT is set.
+
+    The value is the most extra upstream load hedging may add, in percent
+    (e.g. 5); unset or 0 turns hedging off.
+    """
+    percent = float(os.getenv(f'VANGMAYA_{service.upper()}_HEDGE_PERCENT', '0') or 0)
+    if percent <= 0:
+        return None
+    return Hedger(budget=percent / 100, service=service)
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import zlib
+from typing import Any, Dict, Optional, Tuple
+import requests
+from requests.structures import CaseInsensitiveDict
+from .transport import Transport, create_transport
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'record', 'replay')
+
+# Response headers worth keeping; the rest is per-connection noise. Bodies are
+# stored decoded, so content-encoding and content-length would no longer be true
+_KEPT_HEADERS = ('content-type', 'content-disposition')
+
+
+class ReplayMissError(Exception):
+    """Raised in replay mode when no recording exists for a request."""
+
+
+def get_cache_mode() -> str:
+    """Get the record/replay mode from VANGMAYA_HTTP_CACHE_MODE (default: off)."""
+    mode = os.getenv('VANGMAYA_HTTP_CACHE_MODE', 'off').lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown HTTP cache mode {mode}. Choose from: {', '.join(MODES)}")
+    return mode
+
+
+def get_cache_dir() -> str:
+    """Get the recording directory from VANGMAYA_HTTP_CACHE_DIR."""
+    return os.getenv('VANGMAYA_HTTP_CACHE_DIR', '.http_cache')
+
+
+def fingerprint(*parts: Any) -> str:
+    """Hash request parts (strings, bytes or JSON-able values) into a stable key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        elif not isinstance(part, bytes):
+            part = json.dumps(part, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def request_fingerprint(method: str, url: str, **kwargs) -> str:
+    """
+    Fingerprint a request by method, URL and body.
+
+    Headers are left out on purpose: RequestManager rotates user agents,
+    origins and languages on every call.
+    """
+    if kwargs.get('json') is not None:
+        body = kwargs['json']
+    else:
+        body = kwargs.get('data') or b''
+    return fingerprint(method.upper(), url, kwargs.get('params') or {}, body)
+
+
+class RecordReplayStore:
+    """
+    On-disk store of recorded responses.
+
+    Each entry is a small JSON metadata file plus a zlib-compressed body,
+    sharded by the first two characters of the fingerprint.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or get_cache_dir()
+        self._lock = threading.Lock()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        shard = os.path.join(self.directory, key[:2])
+        return os.path.join(shard, f"{key}.json"), os.path.join(shard, f"{key}.bin")
+
+    def put(self, key: str, meta: Dict[str, Any], body: bytes) -> None:
+        """Save an entry, replacing any previous recording."""
+        meta_path, body_path = self._paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        with self._lock:
+            # Write the body first so a visible metadata file always has its body
+            with open(body_path + '.tmp', 'wb') as f:
+                f.write(zlib.compress(body, 6))
+            os.replace(body_path + '.tmp', body_path)
+            with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(meta_path + '.tmp', meta_path)
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """Load an entry, or None if nothing was recorded."""
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+        return meta, body
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._paths(key)[0])
+
+
+def _build_response(method: str, url: str, meta: Dict[str, Any], body: bytes, kwargs) -> requests.Response:
+    response = requests.Response()
+    response.status_code = meta['status_code']
+    # Older recordings may still carry content-encoding
+    response.headers = CaseInsensitiveDict(
+        {k: v for k, v in meta.get('headers', {}).items() if k.lower() in _KEPT_HEADERS})
+    response.url = meta.get('url', url)
+    response.encoding = meta.get('encoding')
+    response.reason = meta.get('reason', '')
+    response._content = body
+    response.request = requests.Request(
+        method=method, url=url, json=kwargs.get('json'), data=kwargs.get('data')
+    ).prepare()
+    return response
+
+
+class RecordReplayTransport(Transport):
+    """
+    Wraps another transport to record responses or serve recorded ones.
+
+    In record mode every successful response is saved; in replay mode
+    responses come only from the store and the network is never touched.
+    """
+
+    name = "record-replay"
+
+    def __init__(self, inner: Optional[Transport], store: RecordReplayStore, mode: str):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"RecordReplayTransport needs record or replay mode, got {mode}")
+        if mode == 'record' and inner is None:
+            raise ValueError("Record mode needs a transport to record from")
+        self.inner = inner
+        self.store = store
+        self.mode = mode
+
+    def send(self, method, url, headers, timeout, **kwargs):
+        key = request_fingerprint(method, url, **kwargs)
+
+        if self.mode == 'replay':
+            entry = self.store.get(key)
+            if entry is None:
+                raise ReplayMissError(f"No recording for {method.upper()} {url} ({key[:12]})")
+            return _build_response(method, url, entry[0], entry[1], kwargs)
+
+        response = self.inner.send(method, url, headers, timeout, **kwargs)
+        if response.ok:
+            meta = {
+                'status_code': response.status_code,
+                'reason': response.reason,
+                'url': response.url,
+                'encoding': response.encoding,
+                'headers': {k: v for k, v in response.headers.items() if k.lower() in _KEPT_HEADERS},
+            }
+            self.store.put(key, meta, response.content)
+        return response
+
+    def close(self) -> None:
+        if self.inner is not None:
+            self.inner.close()
+
+
+def wrap_transport(transport: Optional[Transport], service: Optional[str] = None) -> Transport:
+    """
+    Create the transport for a RequestManager, honouring the record/replay mode.
+
+    Replay mode does not build a network transport at all, so it works
+    without SCRAPER_API_KEY or network access.
+    """
+    mode = get_cache_mode()
+    if mode == 'off':
+        return transport or create_transport(service=service)
+    if transport is None and mode == 'record':
+        transport = create_transport(service=service)
+    return RecordReplayTransport(transport, RecordReplayStore(), mode)
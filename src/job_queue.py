@@ -0,0 +1,322 @@
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VISIBILITY_TIMEOUT = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+QUEUE_JOBS = REGISTRY.counter(
+    'vangmaya_queue_jobs', 'Queued jobs by how they ended', ('outcome',))
+QUEUE_WAIT = REGISTRY.histogram(
+    'vangmaya_queue_wait_seconds', 'Time jobs spent queued before a worker claimed them')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    priority INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority DESC, created_at);
+"""
+
+
+class Job:
+    """A claimed job as seen by a worker."""
+
+    __slots__ = ('id', 'payload', 'priority', 'attempts')
+
+    def __init__(self, id: str, payload: Dict[str, Any], priority: int, attempts: int):
+        self.id = id
+        self.payload = payload
+        self.priority = priority
+        self.attempts = attempts
+
+
+class JobQueue:
+    """
+    Durable job queue in a local sqlite database, shared by processes on one host.
+
+    Jobs are claimed highest priority first, then oldest first. A claim is
+    a lease: the worker must finish or heartbeat the job within the
+    visibility timeout, otherwise the job becomes claimable again, so work
+    held by a crashed worker is picked up by another one. A job whose lease
+    runs out max_attempts times is failed rather than retried forever.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections cannot be shared across threads; keep one per thread
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def enqueue(
+        self,
+        payload: Dict[str, Any],
+        priority: int = 0,
+        job_id: Optional[str] = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    ) -> str:
+        """Add a job; higher priority jobs are claimed first. Returns the job ID."""
+        job_id = job_id or uuid.uuid4().hex
+        self._connection().execute(
+            'INSERT INTO jobs (id, priority, payload, max_attempts, created_at) VALUES (?, ?, ?, ?, ?)',
+            (job_id, priority, json.dumps(payload), max_attempts, time.time())
+        )
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Lease the next job to worker, or return None when nothing is claimable."""
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            # Leases that ran out too often fail instead of going round again
+            expired = connection.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Worker lost the job too many times', "
+                "finished_at = ? WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts",
+                (now, now)
+            ).rowcount
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                "ORDER BY priority DESC, created_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                    "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (worker, now + self.visibility_timeout, now, row['id'])
+                )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        if expired:
+            QUEUE_JOBS.inc(expired, outcome='lost')
+        if row is None:
+            return None
+        if row['status'] == 'queued':
+            QUEUE_WAIT.observe(now - row['created_at'])
+        else:
+            logger.warning(f"Reclaimed job {row['id']} from {row['worker']} after its lease ran out")
+        return Job(row['id'], json.loads(row['payload']), row['priority'], row['attempts'] + 1)
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """Extend a lease; False means the job was lost to another worker."""
+        updated = self._connection().execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time() + self.visibility_timeout, job_id, worker)
+        ).rowcount
+        return updated == 1
+
+    def complete(self, job_id: str, worker: str, result: Dict[str, Any]) -> bool:
+        return self._finish(job_id, worker, 'done', result=json.dumps(result))
+
+    def fail(self, job_id: str, worker: str, error: str) -> bool:
+        return self._finish(job_id, worker, 'failed', error=error)
+
+    def _finish(self, job_id: str, worker: str, status: str,
+                result: Optional[str] = None, error: Optional[str] = None) -> bool:
+        updated = self._connection().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL "
+            "WHERE id = ? AND worker = ? AND status = 'running'",
+            (status, result, error, time.time(), job_id, worker)
+        ).rowcount
+        if updated:
+            QUEUE_JOBS.inc(outcome=status)
+        else:
+            logger.warning(f"Job {job_id} was no longer leased to {worker}; dropping its {status} result")
+        return updated == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A job's status, result or error, and its position in the queue while queued."""
+        connection = self._connection()
+        row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {
+            'id': row['id'],
+            'status': row['status'],
+            'priority': row['priority'],
+            'attempts': row['attempts'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+        }
+        if row['status'] == 'queued':
+            job['position'] = connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND "
+                "(priority > ? OR (priority = ? AND created_at < ?))",
+                (row['priority'], row['priority'], row['created_at'])
+            ).fetchone()[0]
+        return job
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll_interval: float = 0.2) -> Dict[str, Any]:
+        """Poll until a job is done or failed; raises TimeoutError after timeout seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if job['status'] in ('done', 'failed'):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {job_id} still {job['status']} after {timeout}s")
+            time.sleep(poll_interval)
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def load_handler(spec: str) -> Callable[[], Callable[[Job], Dict[str, Any]]]:
+    """Resolve a 'module:function' handler factory."""
+    module, _, name = spec.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+
+def run_worker(
+    queue_path: str,
+    handler: str,
+    worker: Optional[str] = None,
+    visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+    poll_interval: float = 0.5,
+    stop: Optional[Any] = None,
+    max_jobs: Optional[int] = None
+) -> int:
+    """
+    Claim and run jobs until stop is set (or max_jobs have run); returns the number run.
+
+    handler names a factory ('module:function') called once per worker to
+    build the job function, so expensive setup such as the pipeline's
+    clients happens once per process. While a job runs, a heartbeat keeps
+    its lease alive at a third of the visibility timeout.
+    """
+    queue = JobQueue(queue_path, visibility_timeout)
+    worker = worker or f"{os.uname().nodename}:{os.getpid()}"
+    handle = load_handler(handler)()
+    ran = 0
+    while not (stop is not None and stop.is_set()) and (max_jobs is None or ran < max_jobs):
+        job = queue.claim(worker)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        finished = threading.Event()
+
+        def keep_leased(job_id=job.id):
+            beats = JobQueue(queue_path, visibility_timeout)
+            while not finished.wait(visibility_timeout / 3):
+                if not beats.heartbeat(job_id, worker):
+                    break
+            beats.close()
+
+        beater = threading.Thread(target=keep_leased, name=f'heartbeat-{job.id}', daemon=True)
+        beater.start()
+        try:
+            queue.complete(job.id, worker, handle(job))
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            queue.fail(job.id, worker, str(e))
+        finally:
+            finished.set()
+            beater.join()
+        ran += 1
+    queue.close()
+    return ran
+
+
+class WorkerPool:
+    """
+    Worker processes pulling from one queue, one per core by default.
+
+    Processes are spawned rather than forked so each builds its own
+    clients and connection pools.
+    """
+
+    def __init__(
+        self,
+        queue_path: str,
+        handler: str,
+        processes: Optional[int] = None,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT
+    ):
+        self.queue_path = queue_path
+        self.handler = handler
+        self.processes = processes or os.cpu_count() or 1
+        self.visibility_timeout = visibility_timeout
+        self._context = multiprocessing.get_context('spawn')
+        self._stop = self._context.Event()
+        self._workers: List[multiprocessing.Process] = []
+
+    def start(self) -> "WorkerPool":
+        # Create the schema once before the workers race to do it
+        JobQueue(self.queue_path, self.visibility_timeout).close()
+        for i in range(self.processes):
+            process = self._context.Process(
+                target=run_worker,
+                args=(self.queue_path, self.handler),
+                kwargs={'visibility_timeout': self.visibility_timeout, 'stop': self._stop},
+                name=f'vangmaya-worker-{i}',
+                daemon=True
+            )
+            process.start()
+            self._workers.append(process)
+        logger.info(f"Started {self.processes} queue workers on {self.queue_path}")
+        return self
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Let workers finish their current job, then terminate any that do not exit."""
+        self._stop.set()
+        for process in self._workers:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._workers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
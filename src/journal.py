@@ -0,0 +1,75 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('running', 'done', 'failed')
+
+
+class JobJournal:
+    """
+    Append-only JSONL journal of per-job status, for resumable batch runs.
+
+    Every status change is one line, flushed and fsynced before record()
+    returns, so an interrupted run loses at most the jobs that were in
+    flight. On open the journal is replayed and the last line per job wins;
+    a torn final line from a crash is skipped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = {}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable journal line {line_number} in {self.path}")
+                    continue
+                self._state[entry['job_id']] = entry
+        logger.info(f"Loaded {len(self._state)} jobs from {self.path}")
+
+    def record(self, job_id: str, status: str, **fields) -> None:
+        if status not in STATUSES:
+            raise ValueError(f"Unknown job status {status}. Choose from: {', '.join(STATUSES)}")
+        entry = {'job_id': job_id, 'status': status, 'at': time.time(), **fields}
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._state[job_id] = entry
+
+    def status(self, job_id: str) -> Optional[str]:
+        entry = self._state.get(job_id)
+        return entry['status'] if entry else None
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            return iter(list(self._state.values()))
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,23 @@
+# Dropdown labels of the Gradio interface and the language codes they stand for.
+# Kept apart from gradio_interface.py so clients (the load tester) can use
+# them without importing Gradio.
+LANGUAGES = {
+    "Hindi (हिन्दी)": "hi",
+    "English": "en",
+    "Bengali (বাংলা)": "bn",
+    "Telugu (తెలుగు)": "te",
+    "Tamil (தமிழ்)": "ta",
+    "Marathi (मराठी)": "mr",
+    "Kannada (ಕನ್ನಡ)": "kn",
+    "Gujarati (ગુજરાતી)": "gu",
+    "Malayalam (മലയാളം)": "ml",
+    "Punjabi (ਪੰਜਾਬੀ)": "pa"
+}
+
+
+def label_for(code: str) -> str:
+    """The interface label for a language code."""
+    for label, label_code in LANGUAGES.items():
+        if label_code == code:
+            return label
+    raise ValueError(f"Language {code} is not offered by the interface")
@@ -0,0 +1,333 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, str]) -> Tuple[str, ...]:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames, values, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = [(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _header(self) -> List[str]:
+        return [f"# TYPE {self.name} {self.type_name}", f"# HELP {self.name} {self.documentation}"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {','.join(key) or '': value for key, value in self._values.items()}
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type_name = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """Increment while the block runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {','.join(key) or '': value for key, value in self._values.items()}
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'count': 0, 'sum': 0.0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+            state['count'] += 1
+            state['sum'] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels) -> int:
+        state = self._values.get(_label_key(self.labelnames, labels))
+        return state['count'] if state else 0
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, state['buckets']):
+                    labels = _format_labels(self.labelnames, key, ('le', _format_value(float(bound))))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_count{labels} {state['count']}")
+                lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+        return lines
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                ','.join(key) or '': {
+                    'count': state['count'],
+                    'sum': state['sum'],
+                    'mean': state['sum'] / state['count'] if state['count'] else 0.0,
+                }
+                for key, state in self._values.items()
+            }
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all metrics in the OpenMetrics text format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self) -> Dict:
+        """Get a JSON-serializable snapshot of all metrics."""
+        snapshot = {name: metric.to_dict() for name, metric in list(self._metrics.items())}
+        snapshot['cache_hit_ratio'] = cache_hit_ratios(self)
+        return snapshot
+
+    def dump_json(self, path: str) -> None:
+        """Write a JSON snapshot of all metrics to a file."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def reset(self) -> None:
+        """Clear all recorded values (keeps metric definitions)."""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+# RequestManager
+REQUEST_DURATION = REGISTRY.histogram(
+    'vangmaya_request_duration_seconds', 'Duration of single upstream HTTP attempts',
+    ('service', 'outcome'))
+REQUEST_RETRIES = REGISTRY.counter(
+    'vangmaya_request_retries', 'Upstream HTTP attempts beyond the first', ('service',))
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    'vangmaya_requests_in_flight', 'Upstream requests currently in progress', ('service',))
+PAYLOAD_BYTES = REGISTRY.histogram(
+    'vangmaya_payload_bytes', 'Size of upstream request and response bodies',
+    ('service', 'direction'), buckets=SIZE_BUCKETS)
+
+# Stage clients and pipeline
+STAGE_DURATION = REGISTRY.histogram(
+    'vangmaya_stage_duration_seconds', 'Duration of pipeline stages', ('stage', 'outcome'))
+CACHE_REQUESTS = REGISTRY.counter(
+    'vangmaya_cache_requests', 'Stage cache lookups', ('cache', 'result'))
+STAGE_SKIPS = REGISTRY.counter(
+    'vangmaya_stage_skips', 'Pipeline stages skipped because their result was already known',
+    ('stage', 'reason'))
+PIPELINE_DURATION = REGISTRY.histogram(
+    'vangmaya_pipeline_duration_seconds', 'End-to-end duration of pipeline jobs', ('outcome',))
+PIPELINE_IN_FLIGHT = REGISTRY.gauge(
+    'vangmaya_pipeline_jobs_in_flight', 'Pipeline jobs currently in progress')
+
+
+def cache_hit_ratios(registry: MetricsRegistry = REGISTRY) -> Dict[str, float]:
+    """Compute the hit ratio of every cache seen so far."""
+    counter = registry.get('vangmaya_cache_requests')
+    if counter is None:
+        return {}
+    totals = {}
+    for (cache, result), value in list(counter._values.items()):
+        hits, lookups = totals.get(cache, (0, 0))
+        totals[cache] = (hits + (value if result == 'hit' else 0), lookups + value)
+    return {cache: hits / lookups for cache, (hits, lookups) in totals.items() if lookups}
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Time a pipeline stage, labelling it with its outcome."""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'success'
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=stage, outcome=outcome)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        registry = self.server.registry
+        path = self.path.split('?')[0]
+        if path == '/metrics':
+            body, content_type = registry.render().encode('utf-8'), OPENMETRICS_CONTENT_TYPE
+        elif path == '/metrics.json':
+            body, content_type = json.dumps(registry.to_dict()).encode('utf-8'), 'application/json'
+        elif path == '/ready':
+            # 503 until startup warm-up finishes; always ready without one
+            readiness = self.server.readiness
+            status = readiness.status() if readiness is not None else {'ready': True}
+            body = json.dumps(status).encode('utf-8')
+            self.send_response(200 if status['ready'] else 503)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = '0.0.0.0',
+                         registry: MetricsRegistry = REGISTRY, readiness=None) -> ThreadingHTTPServer:
+    """
+    Serve /metrics (OpenMetrics), /metrics.json and /ready from a background thread.
+
+    readiness is an optional src.warmup.Readiness backing /ready. Returns
+    the server so callers can shut it down.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    server.readiness = readiness
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Metrics available on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,203 @@
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from .metrics import REGISTRY
+from .tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+PROFILED_JOBS = REGISTRY.counter('vangmaya_profiled_jobs', 'Pipeline jobs run under the sampling profiler')
+PROFILE_SAMPLES = REGISTRY.counter('vangmaya_profile_samples', 'Stack samples taken by the profiler')
+
+DEFAULT_INTERVAL = 0.005
+MAX_DEPTH = 128
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profile:
+    """Stack samples collected from one thread while a job runs."""
+
+    __slots__ = ('thread_id', 'stacks', 'samples', 'started', 'duration')
+
+    def __init__(self, thread_id: int):
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def add(self, frame) -> None:
+        names = []
+        while frame is not None and len(names) < MAX_DEPTH:
+            names.append(_frame_name(frame))
+            frame = frame.f_back
+        self.stacks[';'.join(reversed(names))] += 1
+        self.samples += 1
+
+    def collapsed(self) -> str:
+        """Folded stacks, one "root;...;leaf count" line each (flamegraph.pl, speedscope)."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Hottest functions by samples spent in them (self) and under them (total)."""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        samples = self.samples or 1
+        return [
+            {'function': name, 'self': own[name], 'total': total[name],
+             'self_pct': round(100.0 * own[name] / samples, 1),
+             'total_pct': round(100.0 * total[name] / samples, 1)}
+            for name, _ in sorted(total.items(), key=lambda item: (-own[item[0]], -item[1]))[:limit]
+        ]
+
+
+class _Sampler:
+    """
+    One daemon thread that samples every profiled thread at a fixed interval.
+
+    Sampling reads sys._current_frames(), so profiled code runs unmodified
+    and pays nothing between samples; the thread only runs while at least
+    one profile is active.
+    """
+
+    def __init__(self):
+        self.interval = DEFAULT_INTERVAL
+        self._profiles: Dict[int, Profile] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles[id(profile)] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def remove(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.pop(id(profile), None)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._profiles:
+                    self._wake.wait()
+                profiles = list(self._profiles.values())
+            frames = sys._current_frames()
+            for profile in profiles:
+                frame = frames.get(profile.thread_id)
+                if frame is not None:
+                    profile.add(frame)
+            PROFILE_SAMPLES.inc(len(profiles))
+            del frames
+            time.sleep(self.interval)
+
+
+_SAMPLER = _Sampler()
+
+
+class JobProfiler:
+    """
+    Decides which pipeline jobs to profile and writes their profiles.
+
+    Every Nth job is profiled (none if every is 0), plus any job the
+    caller forces, e.g. from a request header or a batch flag. A profiled
+    job's thread is sampled while it runs; afterwards the folded stacks
+    go to <directory>/<job_id>.collapsed and the hottest functions to
+    <directory>/<job_id>.json, which also records the job's trace ID.
+    Work a job hands to other threads (the audio encoding pool) is not
+    sampled.
+    """
+
+    def __init__(
+        self,
+        directory: str = 'profiles',
+        every: int = 0,
+        interval: float = DEFAULT_INTERVAL,
+        top: int = 20
+    ):
+        self.directory = directory
+        self.every = every
+        self.interval = interval
+        self.top = top
+        self._jobs = itertools.count(1)
+
+    def wants(self, force: bool = False) -> bool:
+        """Whether the next job should be profiled."""
+        number = next(self._jobs)
+        return force or (self.every > 0 and number % self.every == 0)
+
+    @contextmanager
+    def profile(self, job_id: str, force: bool = False):
+        """Sample the calling thread for the block if this job is selected; yields the Profile or None."""
+        if not self.wants(force):
+            yield None
+            return
+        job_span = current_span()
+        profile = Profile(threading.get_ident())
+        _SAMPLER.interval = self.interval
+        _SAMPLER.add(profile)
+        try:
+            yield profile
+        finally:
+            _SAMPLER.remove(profile)
+            profile.duration = time.perf_counter() - profile.started
+            PROFILED_JOBS.inc()
+            try:
+                path = self.write(profile, job_id, job_span.trace_id if job_span is not None else None)
+                if job_span is not None:
+                    job_span.set_attribute('profile.path', path)
+            except OSError as e:
+                logger.warning(f"Could not write profile for job {job_id}: {str(e)}")
+
+    def write(self, profile: Profile, job_id: str, trace_id: Optional[str] = None) -> str:
+        """Write the folded stacks and the hot function summary; returns the summary path."""
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, job_id)
+        with open(f"{base}.collapsed", 'w', encoding='utf-8') as f:
+            f.write(profile.collapsed())
+        summary = {
+            'job_id': job_id,
+            'trace_id': trace_id,
+            'samples': profile.samples,
+            'interval_s': self.interval,
+            'duration_s': round(profile.duration, 4),
+            'collapsed': f"{base}.collapsed",
+            'top': profile.top(self.top),
+        }
+        with open(f"{base}.json", 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Profiled job {job_id}: {profile.samples} samples written to {base}.json")
+        return f"{base}.json"
+
+
+def profiler_from_env() -> JobProfiler:
+    """
+    A JobProfiler configured by VANGMAYA_PROFILE_EVERY (profile every Nth
+    job, default 0: only forced jobs), VANGMAYA_PROFILE_DIR (default
+    profiles) and VANGMAYA_PROFILE_INTERVAL (seconds between samples).
+    """
+    return JobProfiler(
+        directory=os.getenv('VANGMAYA_PROFILE_DIR', 'profiles'),
+        every=int(os.getenv('VANGMAYA_PROFILE_EVERY', '0')),
+        interval=float(os.getenv('VANGMAYA_PROFILE_INTERVAL', str(DEFAULT_INTERVAL)))
+    )
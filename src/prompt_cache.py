@@ -0,0 +1,197 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from math import gcd
+from typing import Callable, Dict, Optional, Set
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+logger = logging.getLogger(__name__)
+
+
+class PreparedPrompt:
+    """A resampled reference prompt stored on disk under its content hash."""
+
+    __slots__ = ('key', 'path', 'sample_rate', 'duration')
+
+    def __init__(self, key: str, path: str, sample_rate: int, duration: float):
+        self.key = key
+        self.path = path
+        self.sample_rate = sample_rate
+        self.duration = duration
+
+
+class PromptStore:
+    """
+    Content-addressed store for TTS reference prompts with an LRU bound.
+
+    Each distinct reference clip is decoded, downmixed and resampled once
+    and written to <directory>/<sha256>.wav, so concurrent callers never
+    share a file and repeat speakers skip preprocessing. The directory may
+    be shared by several processes (e.g. containers on one volume), so
+    each store only deletes what it can be sure nobody uses: files it
+    wrote itself, when their entry leaves its max_entries LRU, and on
+    startup files nobody has touched for max_age seconds. Decoded audio is
+    not kept in memory; only the path is.
+
+    commit and reload hook the store up to a distributed volume: reload
+    runs before looking for a file another process may have written, and
+    commit after writing one. Their failures are logged, never raised.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: int = 24000,
+        max_entries: int = 64,
+        max_age: Optional[float] = 7 * 24 * 3600,
+        commit: Optional[Callable[[], None]] = None,
+        reload: Optional[Callable[[], None]] = None
+    ):
+        """
+        Args:
+            directory: Where prompt files are written
+            sample_rate: Sample rate the model expects
+            max_entries: Number of prompts kept in memory, and of files this
+                store keeps on disk
+            max_age: Seconds since last use after which a prompt file is
+                pruned on startup; None keeps them
+            commit: Called after a prompt file is written (e.g. volume.commit)
+            reload: Called before checking for a prompt file (e.g. volume.reload)
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.commit = commit
+        self.reload = reload
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, PreparedPrompt]" = OrderedDict()
+        self._written: Set[str] = set()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._sync(self.reload, 'reload')
+        self._prune_directory()
+
+    @staticmethod
+    def content_key(audio_bytes: bytes) -> str:
+        return hashlib.sha256(audio_bytes).hexdigest()
+
+    def _prune_directory(self) -> None:
+        # Other processes may still point at recent files (hits touch them),
+        # so only files unused for max_age go
+        if self.max_age is None:
+            return
+        cutoff = time.time() - self.max_age
+        removed = False
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith('.wav') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed = True
+            except OSError:
+                pass
+        if removed:
+            self._sync(self.commit, 'commit')
+
+    @staticmethod
+    def _sync(hook: Optional[Callable[[], None]], name: str) -> None:
+        if hook is None:
+            return
+        try:
+            hook()
+        except Exception as e:
+            logger.warning(f"Prompt directory {name} failed: {str(e)}")
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _lookup(self, key: str) -> Optional[PreparedPrompt]:
+        # Caller holds self._lock. Another container sharing the directory
+        # may have evicted the file, in which case the entry is stale.
+        prompt = self._entries.get(key)
+        if prompt is None:
+            return None
+        if not os.path.exists(prompt.path):
+            del self._entries[key]
+            self._written.discard(key)
+            return None
+        self._entries.move_to_end(key)
+        # Mark the file as used for a RetentionManager sharing the directory
+        try:
+            os.utime(prompt.path)
+        except OSError:
+            pass
+        self.hits += 1
+        return prompt
+
+    def prepare(self, audio_bytes: bytes) -> PreparedPrompt:
+        """Get the prepared prompt for raw reference audio bytes (any format soundfile reads)."""
+        key = self.content_key(audio_bytes)
+        with self._lock:
+            prompt = self._lookup(key)
+            if prompt is not None:
+                return prompt
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only one caller prepares a given prompt; others wait and reuse it
+        try:
+            with key_lock:
+                with self._lock:
+                    prompt = self._lookup(key)
+                    if prompt is not None:
+                        return prompt
+                    self.misses += 1
+
+                prompt = self._build(key, audio_bytes)
+                with self._lock:
+                    self._entries[key] = prompt
+                    while len(self._entries) > self.max_entries:
+                        evicted_key, evicted = self._entries.popitem(last=False)
+                        # Files another process wrote may still be in use there
+                        if evicted_key in self._written:
+                            self._written.discard(evicted_key)
+                            self._remove_file(evicted.path)
+            return prompt
+        finally:
+            with self._lock:
+                self._key_locks.pop(key, None)
+
+    def _build(self, key: str, audio_bytes: bytes) -> PreparedPrompt:
+        path = os.path.join(self.directory, f"{key}.wav")
+        if not os.path.exists(path):
+            self._sync(self.reload, 'reload')
+        if os.path.exists(path):
+            # Written by an earlier run or another container; skip the resample
+            duration = sf.info(path).duration
+        else:
+            waveform, source_rate = sf.read(io.BytesIO(audio_bytes), dtype='float32', always_2d=True)
+            waveform = waveform.mean(axis=1)
+            if source_rate != self.sample_rate:
+                divisor = gcd(source_rate, self.sample_rate)
+                waveform = resample_poly(waveform, self.sample_rate // divisor, source_rate // divisor)
+                waveform = waveform.astype(np.float32)
+            # Write under a temporary name so readers never see a partial file
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            sf.write(tmp_path, waveform, self.sample_rate, format='WAV', subtype='PCM_16')
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._written.add(key)
+            self._sync(self.commit, 'commit')
+            duration = len(waveform) / self.sample_rate
+
+        logger.info(f"Prepared reference prompt {key[:12]} ({duration:.1f}s)")
+        return PreparedPrompt(key, path, self.sample_rate, duration)
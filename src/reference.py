@@ -0,0 +1,251 @@
+import logging
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from .audio import AudioBuffer, resample
+from .audio_reader import AudioReader
+
+logger = logging.getLogger(__name__)
+
+MIN_REF_SECONDS = 5.0
+MAX_REF_SECONDS = 12.0
+REF_SAMPLE_RATE = 24000
+
+FRAME_SECONDS = 0.03
+# A frame counts as speech when it is this far above the noise floor
+SPEECH_MARGIN_DB = 10.0
+SILENCE_DBFS = -50.0
+CLIP_LEVEL = 0.99
+# Frames decoded per block when levels are measured over a stream (~10 s)
+FRAMES_PER_BLOCK = 333
+
+
+class ReferenceClip:
+    """A trimmed reference window and the part of the transcript spoken in it."""
+
+    __slots__ = ('audio', 'text', 'start', 'end', 'source_duration')
+
+    def __init__(self, audio: AudioBuffer, text: str, start: float, end: float, source_duration: float):
+        self.audio = audio
+        self.text = text
+        self.start = start
+        self.end = end
+        self.source_duration = source_duration
+
+    @property
+    def trimmed(self) -> bool:
+        return self.end - self.start < self.source_duration
+
+
+def frame_levels(samples: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-frame RMS level in dBFS and whether the frame clips."""
+    frame = max(1, int(sample_rate * FRAME_SECONDS))
+    if len(samples) < frame:
+        samples = np.pad(samples, (0, frame - len(samples)))
+    n_frames = len(samples) // frame
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    levels = 20 * np.log10(np.maximum(rms, 1e-10))
+    clipped = np.max(np.abs(frames), axis=1) >= CLIP_LEVEL
+    return levels, clipped
+
+
+def stream_frame_levels(reader: AudioReader) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    frame_levels() over a whole file, one block at a time.
+
+    Blocks are a whole number of frames, so concatenating what this yields
+    gives the same frames as frame_levels() on the fully decoded audio.
+    """
+    frame = max(1, int(reader.sample_rate * FRAME_SECONDS))
+    produced = False
+    for block in reader.blocks(frame * FRAMES_PER_BLOCK):
+        if produced and len(block) < frame:
+            break
+        produced = True
+        yield frame_levels(block, reader.sample_rate)
+
+
+def speech_frames(levels: np.ndarray, noise_floor: Optional[float] = None) -> np.ndarray:
+    """Energy VAD: frames well above the noise floor and above absolute silence."""
+    if noise_floor is None:
+        noise_floor = np.percentile(levels, 10)
+    return (levels > noise_floor + SPEECH_MARGIN_DB) & (levels > SILENCE_DBFS)
+
+
+def is_silent(audio_file_path: str, threshold_dbfs: float = SILENCE_DBFS, min_seconds: float = 0.1) -> bool:
+    """
+    True when a recording is too short to hold speech or never gets louder
+    than threshold_dbfs (RMS per frame). Files soundfile cannot decode are
+    never called silent; the ASR stage gets to decide on those.
+
+    The file is streamed and reading stops at the first loud frame.
+    """
+    try:
+        with AudioReader(audio_file_path) as reader:
+            if reader.frames < min_seconds * reader.sample_rate:
+                return True
+            for levels, _ in stream_frame_levels(reader):
+                if levels.max() >= threshold_dbfs:
+                    return False
+    except Exception:
+        return False
+    return True
+
+
+def _window_score(levels: np.ndarray, clipped: np.ndarray) -> float:
+    # Speech loud against this window's own noise floor scores high; steady
+    # background noise raises the floor and clipping costs heavily
+    noise_floor = np.percentile(levels, 10)
+    speech = speech_frames(levels, noise_floor)
+    if not speech.any():
+        return 0.0
+    snr = levels[speech] - noise_floor
+    return speech.mean() * snr.mean() * (1.0 - 2.0 * clipped.mean())
+
+
+def select_window(
+    samples: np.ndarray,
+    sample_rate: int,
+    min_seconds: float = MIN_REF_SECONDS,
+    max_seconds: float = MAX_REF_SECONDS
+) -> Tuple[float, float]:
+    """
+    Pick the cleanest window of at most max_seconds, in seconds (start, end).
+
+    Candidate windows are scored by how much of them is speech and how far
+    that speech stands above the window's own noise floor, with clipped
+    frames counting against them. The best one is then shrunk to start and
+    end on pauses so words are not cut, as long as it stays at least
+    min_seconds long.
+    """
+    levels, clipped = frame_levels(samples, sample_rate)
+    return select_frames(levels, clipped, len(samples) / sample_rate, min_seconds, max_seconds)
+
+
+def select_frames(
+    levels: np.ndarray,
+    clipped: np.ndarray,
+    duration: float,
+    min_seconds: float = MIN_REF_SECONDS,
+    max_seconds: float = MAX_REF_SECONDS
+) -> Tuple[float, float]:
+    """select_window() on precomputed frame levels, so the audio itself need not be in memory."""
+    n_frames = len(levels)
+    window = min(n_frames, max(1, int(round(max_seconds / FRAME_SECONDS))))
+    if window == n_frames and duration <= max_seconds:
+        return 0.0, duration
+
+    stride = max(1, int(round(0.25 / FRAME_SECONDS)))
+    starts = list(range(0, n_frames - window + 1, stride))
+    if starts[-1] != n_frames - window:
+        starts.append(n_frames - window)
+    scores = [_window_score(levels[s:s + window], clipped[s:s + window]) for s in starts]
+    start = starts[int(np.argmax(scores))]
+    end = start + window
+    speech = speech_frames(levels, np.percentile(levels[start:end], 10))
+
+    # Snap the edges inwards onto pauses, without going below min_seconds
+    min_frames = int(round(min_seconds / FRAME_SECONDS))
+    while end - start > min_frames and speech[start]:
+        start += 1
+    while end - start > min_frames and speech[end - 1]:
+        end -= 1
+    # Then drop leading and trailing silence
+    while end - start > min_frames and not speech[start]:
+        start += 1
+    while end - start > min_frames and not speech[end - 1]:
+        end -= 1
+
+    start_s = start * FRAME_SECONDS
+    end_s = duration if end >= n_frames else end * FRAME_SECONDS
+    return start_s, min(end_s, duration)
+
+
+def align_text(
+    transcription: Dict[str, Any],
+    start: float,
+    end: float,
+    speech_times: Optional[np.ndarray] = None
+) -> str:
+    """
+    Get the words of an ASR transcription spoken between start and end seconds.
+
+    Uses chunk timestamps when the ASR response has them (chunks with a
+    (start, end) "timestamp", or words with start/end). Otherwise words are
+    spread over the speech frames in order, which is close enough for a
+    few seconds of conditioning text.
+
+    Returns '' when no words can be placed in the window, so the caller
+    falls back to the untrimmed audio and the full transcript rather than
+    pairing the clip with text it does not contain.
+    """
+    chunks = transcription.get('chunks') or transcription.get('words')
+    if chunks:
+        picked, timed = [], False
+        for chunk in chunks:
+            chunk_start, chunk_end = _chunk_times(chunk)
+            if chunk_start is None:
+                continue
+            timed = True
+            midpoint = (chunk_start + chunk_end) / 2
+            if start <= midpoint <= end:
+                picked.append((chunk.get('text') or chunk.get('word') or '').strip())
+        if timed:
+            # Timestamps are authoritative, even when they put no word in the window
+            return ' '.join(p for p in picked if p)
+
+    words = (transcription.get('source') or '').split()
+    if not words:
+        return ''
+    if speech_times is None or len(speech_times) == 0:
+        return ''
+    # Word i is assumed to sit at the i-th quantile of the speech frames
+    positions = np.quantile(speech_times, (np.arange(len(words)) + 0.5) / len(words))
+    picked = [word for word, at in zip(words, positions) if start <= at <= end]
+    return ' '.join(picked)
+
+
+def _chunk_times(chunk: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    if 'timestamp' in chunk and chunk['timestamp']:
+        chunk_start, chunk_end = chunk['timestamp']
+        return float(chunk_start), float(chunk_end if chunk_end is not None else chunk_start)
+    if 'start' in chunk and 'end' in chunk:
+        return float(chunk['start']), float(chunk['end'])
+    return None, None
+
+
+def select_reference(
+    audio_file_path: str,
+    transcription: Dict[str, Any],
+    min_seconds: float = MIN_REF_SECONDS,
+    max_seconds: float = MAX_REF_SECONDS
+) -> ReferenceClip:
+    """
+    Trim the input audio to a clean reference window for voice cloning.
+
+    Args:
+        audio_file_path: The job's input audio
+        transcription: One entry of the ASR "output" list ({"source": ..., optional chunks})
+        min_seconds, max_seconds: Bounds on the reference length
+
+    Returns:
+        ReferenceClip with 24 kHz mono audio and its aligned transcript
+    """
+    # Only per-frame levels and the chosen window are ever held in memory,
+    # however long the input is
+    with AudioReader(audio_file_path) as reader:
+        sample_rate, duration = reader.sample_rate, reader.duration
+        measured = list(stream_frame_levels(reader)) or [frame_levels(np.zeros(0, dtype=np.float32), sample_rate)]
+        levels = np.concatenate([frame[0] for frame in measured])
+        clipped = np.concatenate([frame[1] for frame in measured])
+
+        start, end = select_frames(levels, clipped, duration, min_seconds, max_seconds)
+        window = reader.read(start, end)
+
+    speech_times = np.flatnonzero(speech_frames(levels)) * FRAME_SECONDS + FRAME_SECONDS / 2
+    text = align_text(transcription, start, end, speech_times)
+    clip = AudioBuffer(samples=resample(window, sample_rate, REF_SAMPLE_RATE), sample_rate=REF_SAMPLE_RATE)
+    logger.info(f"Reference window {start:.1f}-{end:.1f}s of {duration:.1f}s")
+    return ReferenceClip(clip, text, start, end, duration)
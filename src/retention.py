@@ -0,0 +1,214 @@
+import fnmatch
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Compressed deliveries served by the web front ends
+DELIVERY_DIR = os.path.join(tempfile.gettempdir(), 'vangmaya-delivery')
+DEFAULT_DIRECTORIES = ('outputs', 'uploads', DELIVERY_DIR)
+# Only these (audio and DiskCache entries) are ever evicted; queue databases,
+# journals and summaries are left alone
+EVICTABLE_PATTERNS = ('*.wav', '*.flac', '*.ogg', '*.opus', '*.mp3', '*.m4a', '*.webm', '*.cache')
+
+RETENTION_EVICTIONS = REGISTRY.counter(
+    'vangmaya_retention_evictions', 'Files deleted by the retention sweeper', ('reason',))
+RETENTION_EVICTED_BYTES = REGISTRY.counter(
+    'vangmaya_retention_evicted_bytes', 'Bytes freed by the retention sweeper', ('reason',))
+RETENTION_BYTES = REGISTRY.gauge(
+    'vangmaya_retention_bytes', 'Bytes held in managed directories after the last sweep')
+
+_SIZE_UNITS = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+_AGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_size(value: str) -> int:
+    """Parse a byte count like "500M" or "2g"."""
+    value = value.strip().lower().rstrip('b')
+    if value and value[-1] in _SIZE_UNITS:
+        return int(float(value[:-1]) * _SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+def parse_age(value: str) -> float:
+    """Parse a duration like "90s", "30m", "12h" or "7d" (plain numbers are seconds)."""
+    value = value.strip().lower()
+    if value and value[-1] in _AGE_UNITS:
+        return float(value[:-1]) * _AGE_UNITS[value[-1]]
+    return float(value)
+
+
+def shard_path(directory: str, filename: str) -> str:
+    """
+    Path for filename in one of 256 subdirectories of directory.
+
+    The shard comes from a hash of the name, so files spread evenly and no
+    single directory grows large enough for listings to slow down.
+    """
+    shard = hashlib.md5(filename.encode('utf-8')).hexdigest()[:2]
+    return os.path.join(directory, shard, filename)
+
+
+class RetentionManager:
+    """
+    Keeps the data directories within a byte budget and an age limit.
+
+    One manager covers every directory that accumulates files (pipeline
+    outputs, uploads, deliveries and on-disk caches), so a single budget
+    governs the whole data directory. A sweep first deletes files older
+    than max_age, then the least recently used files until the total is
+    under max_bytes. Last use is the later of access and modification
+    time, so readers that touch files on a hit keep them alive. Files
+    younger than min_age are never deleted, so a result is not swept away
+    between being written and being served.
+    """
+
+    def __init__(
+        self,
+        directories: Sequence[str] = DEFAULT_DIRECTORIES,
+        max_bytes: Optional[int] = None,
+        max_age: Optional[float] = None,
+        min_age: float = 60.0,
+        patterns: Sequence[str] = EVICTABLE_PATTERNS
+    ):
+        self.directories = list(directories)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.min_age = min_age
+        self.patterns = tuple(patterns)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_directory(self, directory: str) -> None:
+        """Bring another directory (e.g. a cache) under the same budget."""
+        with self._lock:
+            if directory not in self.directories:
+                self.directories.append(directory)
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        files = []
+        for directory in self.directories:
+            for root, _, names in os.walk(directory):
+                for name in names:
+                    if not any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue  # Deleted while we looked
+                    files.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+        return files
+
+    def sweep(self) -> Dict[str, int]:
+        """Evict expired files, then the least recently used ones until under budget."""
+        with self._lock:
+            now = time.time()
+            files = sorted(self._scan())
+            evicted = {'age': [0, 0], 'size': [0, 0]}
+
+            def evict(path: str, size: int, reason: str) -> bool:
+                try:
+                    os.remove(path)
+                except OSError:
+                    return False
+                evicted[reason][0] += 1
+                evicted[reason][1] += size
+                return True
+
+            kept = []
+            for last_used, size, path in files:
+                if self.max_age is not None and now - last_used > max(self.max_age, self.min_age):
+                    if evict(path, size, 'age'):
+                        continue
+                kept.append((last_used, size, path))
+
+            total = sum(size for _, size, _ in kept)
+            if self.max_bytes is not None:
+                for last_used, size, path in kept:
+                    if total <= self.max_bytes or now - last_used < self.min_age:
+                        break
+                    if evict(path, size, 'size'):
+                        total -= size
+
+            for directory in self.directories:
+                self._remove_empty_dirs(directory)
+
+            for reason, (count, size) in evicted.items():
+                if count:
+                    RETENTION_EVICTIONS.inc(count, reason=reason)
+                    RETENTION_EVICTED_BYTES.inc(size, reason=reason)
+            RETENTION_BYTES.set(total)
+            count = sum(count for count, _ in evicted.values())
+            if count:
+                logger.info(f"Retention sweep evicted {count} files; {total} bytes remain")
+            return {
+                'files': len(files) - count,
+                'bytes': total,
+                'evicted': count,
+                'evicted_bytes': sum(size for _, size in evicted.values()),
+            }
+
+    @staticmethod
+    def _remove_empty_dirs(directory: str) -> None:
+        # Shard directories emptied by the sweep; the managed root itself stays
+        for root, dirs, files in os.walk(directory, topdown=False):
+            if root != directory and not dirs and not files:
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    pass
+
+    def start(self, interval: float = 300.0) -> "RetentionManager":
+        """Sweep now and then every interval seconds on a daemon thread."""
+        def run():
+            while True:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.warning(f"Retention sweep failed: {str(e)}")
+                if self._stop.wait(interval):
+                    return
+
+        self._thread = threading.Thread(target=run, name='retention-sweeper', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def retention_from_env() -> Optional[RetentionManager]:
+    """
+    Build and start the sweeper from VANGMAYA_RETENTION_* settings.
+
+    Returns None unless VANGMAYA_RETENTION_MAX_BYTES or
+    VANGMAYA_RETENTION_MAX_AGE is set.
+    """
+    max_bytes = os.getenv('VANGMAYA_RETENTION_MAX_BYTES')
+    max_age = os.getenv('VANGMAYA_RETENTION_MAX_AGE')
+    if not (max_bytes or max_age):
+        return None
+    directories = os.getenv('VANGMAYA_RETENTION_DIRS')
+    directories = directories.split(os.pathsep) if directories else list(DEFAULT_DIRECTORIES)
+    if os.getenv('VANGMAYA_CACHE', '').lower() == 'disk':
+        # The on-disk stage cache shares the budget (see src/cache.py)
+        directories.append(os.getenv('VANGMAYA_CACHE_DIR', '.vangmaya_cache'))
+    manager = RetentionManager(
+        directories=directories,
+        max_bytes=parse_size(max_bytes) if max_bytes else None,
+        max_age=parse_age(max_age) if max_age else None,
+        min_age=parse_age(os.getenv('VANGMAYA_RETENTION_MIN_AGE', '60'))
+    )
+    return manager.start(parse_age(os.getenv('VANGMAYA_RETENTION_INTERVAL', '300')))
@@ -0,0 +1,12 @@
+from typing import List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Get the pct-th percentile of values using linear interpolation."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
@@ -0,0 +1,193 @@
+import contextvars
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('vangmaya_current_span', default=None)
+
+
+class Span:
+    """A timed operation, shaped after the OpenTelemetry span data model."""
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.attributes = dict(attributes or {})
+        self.status = 'UNSET'
+        self.status_message = ''
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano = None
+
+    @property
+    def job_id(self) -> Optional[str]:
+        return self.attributes.get('job.id')
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_time_unix_nano or time.time_ns()
+        return (end - self.start_time_unix_nano) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = 'ERROR'
+        self.status_message = str(error)
+
+    def end(self) -> None:
+        if self.end_time_unix_nano is None:
+            self.end_time_unix_nano = time.time_ns()
+            if self.status == 'UNSET':
+                self.status = 'OK'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize using OTLP/JSON field names."""
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_span_id or '',
+            'name': self.name,
+            'startTimeUnixNano': str(self.start_time_unix_nano),
+            'endTimeUnixNano': str(self.end_time_unix_nano or 0),
+            'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in self.attributes.items()],
+            'status': {'code': f'STATUS_CODE_{self.status}', 'message': self.status_message},
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class InMemoryExporter:
+    """Keeps the most recent finished spans in memory."""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def get_spans(self, job_id: Optional[str] = None) -> List[Span]:
+        with self._lock:
+            spans = list(self.spans)
+        if job_id is not None:
+            spans = [s for s in spans if s.job_id == job_id]
+        return spans
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+
+class JsonFileExporter:
+    """Appends finished spans to a JSON lines file in OTLP/JSON span format."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+class Tracer:
+    """Creates spans and hands finished ones to the configured exporters."""
+
+    def __init__(self, exporters: Optional[List[Any]] = None):
+        self.exporters = list(exporters or [])
+
+    def add_exporter(self, exporter) -> None:
+        self.exporters.append(exporter)
+
+    @contextmanager
+    def start_span(self, name: str, job_id: Optional[str] = None, **attributes):
+        """
+        Time the block as a child of the current span.
+
+        The job ID is inherited from the parent span unless given explicitly,
+        so every span of a pipeline job carries the same job.id attribute.
+        """
+        parent = _current_span.get()
+        if job_id is None and parent is not None:
+            job_id = parent.job_id
+        if job_id is not None:
+            attributes['job.id'] = job_id
+
+        trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        span = Span(name, trace_id, parent.span_id if parent is not None else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            self._export(span)
+
+    def _export(self, span: Span) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.warning(f"Span export failed: {str(e)}")
+
+
+def current_span() -> Optional[Span]:
+    """Get the span active in the current context."""
+    return _current_span.get()
+
+
+def format_waterfall(spans: List[Span]) -> str:
+    """Render the spans of one job as an indented latency waterfall."""
+    if not spans:
+        return ''
+    spans = sorted(spans, key=lambda s: s.start_time_unix_nano)
+    origin = spans[0].start_time_unix_nano
+    depth = {}
+    lines = []
+    for span in spans:
+        depth[span.span_id] = depth.get(span.parent_span_id, -1) + 1
+        offset_ms = (span.start_time_unix_nano - origin) / 1e6
+        status = '' if span.status == 'OK' else f' [{span.status}]'
+        lines.append(f"{offset_ms:9.1f}ms {span.duration_ms:9.1f}ms  "
+                     f"{'  ' * depth[span.span_id]}{span.name}{status}")
+    return '\n'.join(lines)
+
+
+MEMORY_EXPORTER = InMemoryExporter()
+TRACER = Tracer([MEMORY_EXPORTER])
+
+if os.getenv('VANGMAYA_TRACE_FILE'):
+    TRACER.add_exporter(JsonFileExporter(os.getenv('VANGMAYA_TRACE_FILE')))
+
+
+def span(name: str, job_id: Optional[str] = None, **attributes):
+    """Start a span on the default tracer."""
+    return TRACER.start_span(name, job_id=job_id, **attributes)
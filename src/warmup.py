@@ -0,0 +1,106 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+WARMUP_DURATION = REGISTRY.histogram(
+    'vangmaya_warmup_seconds', 'Time until each component finished warming up', ('component',))
+WARMUP_FAILURES = REGISTRY.counter(
+    'vangmaya_warmup_failures', 'Warm-up attempts that failed and will be retried', ('component',))
+READY = REGISTRY.gauge('vangmaya_ready', '1 once every component is warm, else 0')
+
+
+def warmup_enabled() -> bool:
+    """Whether to warm up at startup (VANGMAYA_WARMUP=1)."""
+    return os.getenv('VANGMAYA_WARMUP', '0').lower() in ('1', 'true', 'yes')
+
+
+class Readiness:
+    """
+    Warms components up concurrently in the background and reports readiness.
+
+    Each check is a callable that opens connections, builds clients or
+    probes an upstream, and raises if it cannot. Checks run on their own
+    threads; a failing check is retried with backoff (up to max_interval
+    seconds apart) until it succeeds, and the service only reports ready
+    once every check has.
+    """
+
+    def __init__(
+        self,
+        checks: Dict[str, Callable[[], Any]],
+        retry_interval: float = 1.0,
+        max_interval: float = 30.0
+    ):
+        self.checks = checks
+        self.retry_interval = retry_interval
+        self.max_interval = max_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._all_ready = threading.Event()
+        self._components = {
+            name: {'ready': False, 'attempts': 0, 'seconds': None, 'error': None} for name in checks
+        }
+        self._started_at = None
+        READY.set(0)
+
+    def start(self) -> "Readiness":
+        self._started_at = time.perf_counter()
+        if not self.checks:
+            self._mark_ready()
+        for name, check in self.checks.items():
+            threading.Thread(target=self._run, args=(name, check), name=f'warmup-{name}', daemon=True).start()
+        return self
+
+    def _run(self, name: str, check: Callable[[], Any]) -> None:
+        interval = self.retry_interval
+        while not self._stop.is_set():
+            with self._lock:
+                self._components[name]['attempts'] += 1
+            try:
+                check()
+            except Exception as e:
+                WARMUP_FAILURES.inc(component=name)
+                logger.warning(f"Warm-up of {name} failed, retrying in {interval:.0f}s: {str(e)}")
+                with self._lock:
+                    self._components[name]['error'] = str(e)
+                self._stop.wait(interval)
+                interval = min(interval * 2, self.max_interval)
+                continue
+
+            elapsed = time.perf_counter() - self._started_at
+            WARMUP_DURATION.observe(elapsed, component=name)
+            logger.info(f"{name} warm after {elapsed:.2f}s")
+            with self._lock:
+                self._components[name].update(ready=True, seconds=round(elapsed, 4), error=None)
+                all_ready = all(component['ready'] for component in self._components.values())
+            if all_ready:
+                self._mark_ready()
+            return
+
+    def _mark_ready(self) -> None:
+        READY.set(1)
+        self._all_ready.set()
+        logger.info("All components warm; ready")
+
+    @property
+    def ready(self) -> bool:
+        return self._all_ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until ready; returns False if timeout passes first."""
+        return self._all_ready.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            components = {name: dict(component) for name, component in self._components.items()}
+        return {'ready': self.ready, 'components': components}
+
+    def stop(self) -> None:
+        """Stop retrying checks that have not succeeded yet."""
+        self._stop.set()
@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from api_server import AudioStore, create_app
+from benchmark import configure_for_upstream, make_clips
+from mock_upstream import MockUpstream
+from src.audio import AudioBuffer
+
+
+class TestApiServer(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ)
+        self.env.start()
+        self.upstream = MockUpstream().__enter__()
+        configure_for_upstream(self.upstream.base_url)
+        self.client = TestClient(create_app(), raise_server_exceptions=False).__enter__()
+        self.clip = make_clips(self.workdir, 1, duration=0.5)[0]
+        with open(self.clip, 'rb') as f:
+            self.clip_bytes = f.read()
+
+    def tearDown(self):
+        self.client.__exit__(None, None, None)
+        self.upstream.__exit__(None, None, None)
+        self.env.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_transcribe_multipart_and_binary(self):
+        """Audio can be sent as a multipart file or as the raw body."""
+        multipart = self.client.post("/transcribe", params={'source': 'hi'},
+                                     files={'file': ('clip.wav', self.clip_bytes, 'audio/wav')})
+        binary = self.client.post("/transcribe", params={'source': 'hi'}, content=self.clip_bytes,
+                                  headers={'Content-Type': 'audio/wav'})
+        self.assertEqual(multipart.status_code, 200, multipart.text)
+        self.assertEqual(binary.status_code, 200, binary.text)
+        self.assertTrue(multipart.json()['text'])
+
+        wrong_type = self.client.post("/transcribe", params={'source': 'hi'}, content=b'{}',
+                                      headers={'Content-Type': 'application/json'})
+        self.assertEqual(wrong_type.status_code, 415)
+
+    def test_translate_and_batch(self):
+        """Texts translate one at a time or many per call; bad languages are client errors."""
+        single = self.client.post("/translate", json={'text': 'hello', 'source': 'en', 'target': 'hi'})
+        self.assertEqual(single.status_code, 200, single.text)
+
+        batch = self.client.post("/translate/batch", json={'texts': ['a', 'b', 'c'], 'target': 'hi'})
+        self.assertEqual(len(batch.json()['translations']), 3)
+        self.assertEqual(self.upstream.request_counts['translate'], 4)
+
+        unsupported = self.client.post("/translate", json={'text': 'hello', 'target': 'xx'})
+        self.assertEqual(unsupported.status_code, 400)
+
+    def test_synthesize_returns_audio(self):
+        """/synthesize returns audio bytes in the requested format."""
+        response = self.client.post("/synthesize", params={'format': 'flac'},
+                                    data={'text': 'namaste', 'ref_text': 'hello'},
+                                    files={'file': ('ref.wav', self.clip_bytes, 'audio/wav')})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(response.headers['content-type'], 'audio/flac')
+        self.assertGreater(AudioBuffer.from_bytes(response.content, 'flac').duration, 0)
+
+    def test_profile_header(self):
+        """X-Vangmaya-Profile: 1 writes a profile for just that job."""
+        profiles = os.path.join(self.workdir, "profiles")
+        os.environ['VANGMAYA_PROFILE_DIR'] = profiles
+        with TestClient(create_app()) as client:
+            plain = client.post("/pipeline", params={'source': 'hi', 'target': 'ta'}, content=self.clip_bytes,
+                                headers={'Content-Type': 'audio/wav'})
+            self.assertFalse(os.path.exists(profiles))
+            profiled = client.post("/pipeline", params={'source': 'hi', 'target': 'ta'}, content=self.clip_bytes,
+                                   headers={'Content-Type': 'audio/wav', 'X-Vangmaya-Profile': '1'})
+        self.assertEqual(plain.status_code, 200, plain.text)
+        job_id = profiled.json()['job_id']
+        self.assertEqual(sorted(os.listdir(profiles)), [f"{job_id}.collapsed", f"{job_id}.json"])
+
+    def test_pipeline_links_audio(self):
+        """/pipeline returns texts and a link to the audio, or the audio itself."""
+        response = self.client.post("/pipeline", params={'source': 'hi', 'target': 'ta'},
+                                    content=self.clip_bytes, headers={'Content-Type': 'audio/wav'})
+        self.assertEqual(response.status_code, 200, response.text)
+        body = response.json()
+        self.assertTrue(body['translated_text'])
+
+        audio = self.client.get(body['audio_url'])
+        self.assertEqual(audio.headers['content-type'], 'audio/wav')
+        self.assertEqual(self.client.get("/audio/missing").status_code, 404)
+
+        direct = self.client.post("/pipeline", params={'source': 'hi', 'target': 'ta', 'response': 'audio'},
+                                  files={'file': ('clip.wav', self.clip_bytes, 'audio/wav')})
+        self.assertEqual(direct.headers['content-type'], 'audio/wav')
+
+    def test_pipeline_batch(self):
+        """Each clip in a batch gets its own result."""
+        files = [('files', (f'clip{i}.wav', self.clip_bytes, 'audio/wav')) for i in range(3)]
+        response = self.client.post("/pipeline/batch", params={'source': 'hi', 'target': 'ta'}, files=files)
+        results = response.json()['results']
+        self.assertEqual([r['filename'] for r in results], ['clip0.wav', 'clip1.wav', 'clip2.wav'])
+        self.assertTrue(all('audio_url' in r for r in results))
+
+    def test_stream_emits_each_stage(self):
+        """The SSE stream reports transcription, translation and audio as they finish."""
+        with self.client.stream("POST", "/pipeline/stream", params={'source': 'hi', 'target': 'ta'},
+                                content=self.clip_bytes, headers={'Content-Type': 'audio/wav'}) as response:
+            self.assertEqual(response.headers['content-type'].split(';')[0], 'text/event-stream')
+            events = [line[len('event: '):] for line in response.iter_lines() if line.startswith('event: ')]
+        self.assertEqual(events, ['transcribe', 'translate', 'audio', 'done'])
+
+    def test_upstream_failure_is_bad_gateway(self):
+        """Upstream errors surface as 502 rather than crashing the request."""
+        self.upstream.error_rate = 1.0
+        response = self.client.post("/translate", json={'text': 'hello', 'target': 'hi'})
+        self.assertEqual(response.status_code, 502)
+
+    def test_space_failure_is_bad_gateway(self):
+        """An error raised by the hosted TTS space is an upstream failure."""
+        from gradio_client.exceptions import AppError
+        from tts_backends import HostedSpaceBackend
+
+        job = mock.Mock(**{'result.side_effect': AppError("The upstream Gradio app has raised an exception")})
+        client = mock.Mock(**{'submit.return_value': job})
+        space = HostedSpaceBackend(client_factory=lambda name: client)
+        with mock.patch('text_to_speech.create_backend', return_value=space), \
+                TestClient(create_app(), raise_server_exceptions=False) as api:
+            response = api.post("/synthesize", data={'text': 'namaste', 'ref_text': 'hello'},
+                                files={'file': ('ref.wav', self.clip_bytes, 'audio/wav')})
+        self.assertEqual(response.status_code, 502, response.text)
+
+    def test_internal_errors_are_500_without_details(self):
+        """Our own bugs are a logged 500 that does not leak the exception message."""
+        from unittest import mock
+        with mock.patch('translator.TextTranslator.translate', side_effect=KeyError('secret internals')), \
+                self.assertLogs('api_server', level='ERROR'):
+            response = self.client.post("/translate", json={'text': 'hello', 'target': 'hi'})
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn('secret', response.text)
+
+
+class TestAudioStore(unittest.TestCase):
+    def test_bounded(self):
+        """The oldest clip is dropped once the store is full."""
+        store = AudioStore(capacity=2)
+        for job_id in ('a', 'b', 'c'):
+            store.put(job_id, AudioBuffer.from_bytes(b'x'))
+        self.assertIsNone(store.get('a'))
+        self.assertIsNotNone(store.get('c'))
+
+
+if __name__ == "__main__":
+    unittest.main()
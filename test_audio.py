@@ -0,0 +1,93 @@
+import base64
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import soundfile as sf
+
+from mock_upstream import make_wav_bytes
+from src.audio import AudioBuffer, format_for_content_type
+
+
+class TestAudioBuffer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_bytes_pass_through_unchanged(self):
+        """Encoded audio is not decoded or re-encoded unless asked for."""
+        data = make_wav_bytes(0.5)
+        audio = AudioBuffer.from_bytes(data)
+        self.assertIs(audio.to_bytes('wav'), data)
+        self.assertEqual(audio.sample_rate, 24000)
+        self.assertAlmostEqual(audio.duration, 0.5)
+
+    def test_samples_encode_lazily(self):
+        """A waveform is encoded once per format, then reused."""
+        audio = AudioBuffer(samples=np.zeros(12000), sample_rate=24000)
+        wav = audio.to_bytes('wav')
+        self.assertIs(audio.to_bytes('wav'), wav)
+        info = sf.info(io.BytesIO(audio.to_bytes('flac')))
+        self.assertEqual((info.format, info.samplerate), ('FLAC', 24000))
+
+        path = audio.save(os.path.join(self.directory, 'nested', 'out.flac'))
+        self.assertEqual(sf.info(path).format, 'FLAC')
+        self.assertEqual(AudioBuffer.from_file(path).format, 'flac')
+
+    def test_compressed_formats_on_the_pool(self):
+        """Opus and MP3 encode on the worker pool and are much smaller than WAV."""
+        t = np.arange(24000 * 2) / 24000
+        audio = AudioBuffer(samples=0.3 * np.sin(2 * np.pi * 220 * t), sample_rate=24000)
+        futures = {fmt: audio.encode_async(fmt) for fmt in ('opus', 'mp3')}
+        wav = audio.to_bytes('wav')
+        for fmt, future in futures.items():
+            data = future.result(timeout=30)
+            self.assertIs(audio.to_bytes(fmt), data)
+            self.assertLess(len(data), len(wav) / 4)
+        decoded = AudioBuffer.from_bytes(futures['opus'].result(), 'opus')
+        self.assertAlmostEqual(decoded.duration, 2.0, places=1)
+
+    def test_concurrent_callers_share_one_encode(self):
+        """Racing to_bytes/encode_async calls encode each format once."""
+        from concurrent.futures import ThreadPoolExecutor
+        from src.audio import ENCODE_DURATION
+        audio = AudioBuffer(samples=np.zeros(24000, dtype=np.float32), sample_rate=24000)
+        before = ENCODE_DURATION.get_count(format='flac')
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            calls = [pool.submit(audio.to_bytes, 'flac') for _ in range(8)]
+            calls += [pool.submit(lambda: audio.encode_async('flac').result()) for _ in range(8)]
+            results = [call.result(timeout=30) for call in calls]
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(ENCODE_DURATION.get_count(format='flac'), before + 1)
+
+    def test_flac_upload(self):
+        """ASR uploads re-encoded as 16 kHz FLAC are smaller than the raw file."""
+        from voice_to_text import VoiceToTextConverter
+        path = os.path.join(self.directory, 'clip.wav')
+        with open(path, 'wb') as f:
+            f.write(make_wav_bytes(2.0))
+        with mock.patch.dict(os.environ, {'VANGMAYA_TRANSPORT': 'direct'}):
+            raw = VoiceToTextConverter().convert_audio_to_base64(path)
+            flac = VoiceToTextConverter(upload_format='flac').convert_audio_to_base64(path)
+        data = base64.b64decode(flac)
+        info = sf.info(io.BytesIO(data))
+        self.assertEqual((info.format, info.samplerate, info.channels), ('FLAC', 16000, 1))
+        self.assertLess(len(flac), len(raw) / 2)
+
+    def test_validation(self):
+        """Buffers need content, and samples need a sample rate."""
+        with self.assertRaises(ValueError):
+            AudioBuffer()
+        with self.assertRaises(ValueError):
+            AudioBuffer(samples=np.zeros(10))
+        self.assertEqual(format_for_content_type('audio/flac; charset=binary'), 'flac')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+from src.audio_reader import AudioReader, StreamResampler
+from src.reference import frame_levels, stream_frame_levels
+
+
+class TestAudioReader(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.stereo = (0.3 * rng.standard_normal((44100 * 3 + 17, 2))).astype(np.float32)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, name: str, subtype: str = None) -> str:
+        path = os.path.join(self.directory, name)
+        sf.write(path, self.stereo, 44100, subtype=subtype)
+        return path
+
+    def test_wav_is_memory_mapped(self):
+        """PCM WAV blocks come from a memory map and match a full decode."""
+        path = self.write('long.wav')
+        expected, _ = sf.read(path, dtype='float32')
+        with AudioReader(path) as reader:
+            self.assertTrue(reader.memory_mapped)
+            self.assertEqual((reader.frames, reader.channels), (len(self.stereo), 2))
+            blocks = list(reader.blocks(4096, mono=False))
+            self.assertTrue(all(len(b) == 4096 for b in blocks[:-1]))
+            np.testing.assert_allclose(np.concatenate(blocks), expected, atol=1e-7)
+            np.testing.assert_allclose(reader.read(1.0, 1.5), expected[44100:66150].mean(axis=1), atol=1e-6)
+
+    def test_compressed_formats_decode_in_blocks(self):
+        """FLAC is decoded block by block into the same samples."""
+        path = self.write('long.flac')
+        expected, _ = sf.read(path, dtype='float32')
+        with AudioReader(path) as reader:
+            self.assertFalse(reader.memory_mapped)
+            mono = np.concatenate(list(reader.blocks(10000)))
+        np.testing.assert_allclose(mono, expected.mean(axis=1), atol=1e-6)
+
+    def test_headerless_pcm(self):
+        """.pcm files are mapped with the given rate and channel count."""
+        path = os.path.join(self.directory, 'take.pcm')
+        (np.clip(self.stereo, -1, 1) * 32767).astype('<i2').tofile(path)
+        with self.assertRaises(ValueError):
+            AudioReader(path)
+        with AudioReader(path, sample_rate=44100, channels=2) as reader:
+            self.assertAlmostEqual(reader.duration, len(self.stereo) / 44100)
+            np.testing.assert_allclose(reader.read(mono=False), np.clip(self.stereo, -1, 1), atol=1e-4)
+
+    def test_streaming_resample_matches_one_shot(self):
+        """Resampling block by block gives resample_poly's output in fixed-size blocks."""
+        path = self.write('long.wav', subtype='FLOAT')
+        mono = self.stereo.mean(axis=1)
+        with AudioReader(path) as reader:
+            blocks = list(reader.blocks(8000, sample_rate=16000))
+        self.assertTrue(all(len(b) == 8000 for b in blocks[:-1]))
+        np.testing.assert_allclose(np.concatenate(blocks), resample_poly(mono, 160, 441), atol=1e-5)
+
+        resampler = StreamResampler(48000, 16000)
+        signal = np.sin(np.arange(48000) / 10.0).astype(np.float32)
+        pieces = [resampler.process(signal[i:i + 1000]) for i in range(0, len(signal), 1000)]
+        pieces.append(resampler.flush())
+        np.testing.assert_allclose(np.concatenate(pieces), resample_poly(signal, 1, 3), atol=1e-5)
+
+    def test_stream_levels_match_full_decode(self):
+        """Frame levels measured over blocks are the frames of the whole file."""
+        path = self.write('long.wav')
+        samples, rate = sf.read(path, dtype='float32')
+        expected, _ = frame_levels(samples.mean(axis=1), rate)
+        with AudioReader(path) as reader:
+            levels = np.concatenate([lv for lv, _ in stream_frame_levels(reader)])
+        np.testing.assert_allclose(levels, expected, atol=1e-3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from batch import jobs_from_directory, jobs_from_manifest, run_batch
+from benchmark import configure_for_upstream, make_clips
+from mock_upstream import MockUpstream
+from src.journal import JobJournal
+import vangmaya
+
+
+class TestJobJournal(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, "journal.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_last_status_wins_on_reload(self):
+        """Reopening a journal restores each job's latest status and skips torn lines."""
+        with JobJournal(self.path) as journal:
+            journal.record("a", "running")
+            journal.record("a", "done")
+            journal.record("b", "running")
+        with open(self.path, "a") as f:
+            f.write('{"job_id": "c", "sta')
+
+        with JobJournal(self.path) as journal:
+            self.assertEqual(journal.status("a"), "done")
+            self.assertEqual(journal.status("b"), "running")
+            self.assertIsNone(journal.status("c"))
+            with self.assertRaises(ValueError):
+                journal.record("a", "queued")
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_manifest_paths_and_defaults(self):
+        """Manifest audio paths are relative to the manifest; languages fall back to the defaults."""
+        manifest = os.path.join(self.workdir, "jobs.jsonl")
+        with open(manifest, "w") as f:
+            f.write(json.dumps({"audio": "a.wav", "source": "hi", "target": "ta", "id": "first"}) + "\n")
+            f.write("\n# comment\n")
+            f.write(json.dumps({"audio": "b.wav"}) + "\n")
+
+        jobs = list(jobs_from_manifest(manifest, source_lang="en", target_lang="hi"))
+        self.assertEqual(jobs[0], ("first", os.path.join(self.workdir, "a.wav"), "hi", "ta"))
+        self.assertEqual(jobs[1][1:], (os.path.join(self.workdir, "b.wav"), "en", "hi"))
+        with self.assertRaises(ValueError):
+            list(jobs_from_manifest(manifest))
+
+    def test_resumes_from_journal(self):
+        """A second run skips jobs the journal has as done and only runs the new ones."""
+        output_dir = os.path.join(self.workdir, "out")
+        journal_path = os.path.join(self.workdir, "journal.jsonl")
+        with MockUpstream() as upstream:
+            configure_for_upstream(upstream.base_url)
+            from audio_translation_pipeline import AudioTranslationPipeline
+            pipeline = AudioTranslationPipeline()
+
+            clips = os.path.join(self.workdir, "clips")
+            os.makedirs(os.path.join(clips, "more"))
+            make_clips(clips, 3, duration=0.5)
+            with JobJournal(journal_path) as journal:
+                first = run_batch(pipeline, jobs_from_directory(clips, "hi", "ta"),
+                                  journal, output_dir, concurrency=2)
+
+            make_clips(os.path.join(clips, "more"), 1, duration=0.5)
+            with JobJournal(journal_path) as journal:
+                second = run_batch(pipeline, jobs_from_directory(clips, "hi", "ta"),
+                                   journal, output_dir, concurrency=2)
+
+        self.assertEqual((first['total'], first['succeeded'], first['failed']), (3, 3, 0))
+        self.assertEqual((second['total'], second['skipped'], second['succeeded']), (4, 3, 1))
+        self.assertEqual(upstream.request_counts['synthesize'], 4)
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(output_dir)), 4)
+
+    def test_cli_writes_summary_of_failures(self):
+        """`vangmaya batch` records failures and only retries them when asked."""
+        output_dir = os.path.join(self.workdir, "out")
+        with MockUpstream(error_rate=1.0) as upstream:
+            configure_for_upstream(upstream.base_url)
+            os.makedirs(os.path.join(self.workdir, "clips"))
+            make_clips(os.path.join(self.workdir, "clips"), 2, duration=0.5)
+            argv = ["batch", os.path.join(self.workdir, "clips"), "--source", "hi", "--target", "ta",
+                    "--output-dir", output_dir, "--concurrency", "2"]
+            with mock.patch("builtins.print"):
+                summary = vangmaya.main(argv)
+                rerun = vangmaya.main(argv)
+                retried = vangmaya.main(argv + ["--retry-failed"])
+
+        self.assertEqual(summary['failed'], 2)
+        self.assertEqual(len(summary['top_errors']), 1)
+        with open(os.path.join(output_dir, "summary.json")) as f:
+            self.assertEqual(json.load(f)['failed'], 2)
+        self.assertEqual(rerun['skipped'], 2)
+        self.assertEqual(retried['failed'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.batching import BATCH_SIZE, MicroBatcher, run_each
+
+
+class TestMicroBatcher(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def process(self, key, payloads):
+        with self.lock:
+            self.calls.append((key, list(payloads)))
+        return [f"{key}:{p}" for p in payloads]
+
+    def test_groups_by_key_within_window(self):
+        """Concurrent items sharing a key run together, in submission order."""
+        batcher = MicroBatcher(self.process, max_batch_size=8, max_wait_ms=200, name='test-group')
+        try:
+            futures = [batcher.submit(text, key=speaker)
+                       for text, speaker in [("a", "s1"), ("b", "s2"), ("c", "s1"), ("d", "s1")]]
+            results = [f.result(timeout=5) for f in futures]
+        finally:
+            batcher.close()
+
+        self.assertEqual(results, ["s1:a", "s2:b", "s1:c", "s1:d"])
+        self.assertEqual(self.calls, [("s1", ["a", "c", "d"]), ("s2", ["b"])])
+        self.assertEqual(futures[0].batch_size, 3)
+        self.assertGreaterEqual(futures[0].queue_seconds, 0)
+        self.assertEqual(BATCH_SIZE.get_count(batcher='test-group'), 2)
+
+    def test_max_batch_size(self):
+        """A full batch runs without waiting for the window to close."""
+        batcher = MicroBatcher(self.process, max_batch_size=2, max_wait_ms=10000)
+        try:
+            start = time.perf_counter()
+            futures = [batcher.submit(i, key="k") for i in range(4)]
+            for f in futures:
+                f.result(timeout=5)
+            self.assertLess(time.perf_counter() - start, 5)
+        finally:
+            batcher.close()
+        self.assertEqual([len(payloads) for _, payloads in self.calls], [2, 2])
+
+    def test_errors_fail_the_group(self):
+        """An exception in process_batch fails every item of that group."""
+        def failing(key, payloads):
+            raise ValueError("model crashed")
+
+        batcher = MicroBatcher(failing, max_wait_ms=5)
+        try:
+            future = batcher.submit("x")
+            with self.assertRaises(ValueError):
+                future.result(timeout=5)
+        finally:
+            batcher.close()
+
+    def test_wrong_result_count(self):
+        """process_batch must return one result per item."""
+        batcher = MicroBatcher(lambda key, payloads: [], max_wait_ms=5)
+        try:
+            with self.assertRaises(RuntimeError):
+                batcher.submit("x").result(timeout=5)
+        finally:
+            batcher.close()
+
+    def test_closed_batcher_rejects_work(self):
+        """Submitting after close is an error."""
+        batcher = MicroBatcher(self.process)
+        batcher.close()
+        with self.assertRaises(RuntimeError):
+            batcher.submit("x")
+
+    def test_groups_share_prompt_preparation(self):
+        """A group prepares its prompt once while model calls still take turns."""
+        model_lock = threading.Lock()
+        active, peak = [0], [0]
+        prepared = []
+
+        def infer(text):
+            if not model_lock.acquire(blocking=False):
+                raise AssertionError("concurrent model call")
+            try:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+                time.sleep(0.005)
+                if text == "bad":
+                    raise ValueError("bad text")
+                return text.upper()
+            finally:
+                active[0] -= 1
+                model_lock.release()
+
+        def process(key, payloads):
+            time.sleep(0.05)  # decoding and resampling the reference prompt
+            prepared.append(key)
+            return run_each(inference, infer, payloads)
+
+        texts = [f"t{i}" for i in range(16)]
+        keys = ["s1", "s2"] * 8
+        inference = ThreadPoolExecutor(max_workers=1)
+        batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=10, workers=2)
+        try:
+            start = time.perf_counter()
+            futures = [batcher.submit(text, key=key) for text, key in zip(texts, keys)]
+            results = [f.result(timeout=5) for f in futures]
+            batched = time.perf_counter() - start
+            failed = batcher.submit("bad").result(timeout=5)
+        finally:
+            batcher.close()
+            inference.shutdown()
+
+        self.assertEqual(results, [t.upper() for t in texts])
+        self.assertIsInstance(failed, ValueError)
+        self.assertEqual(peak[0], 1)
+        # Preparing the prompt per request would take 16 x 50 ms on its own
+        self.assertLess(len(prepared), len(texts))
+        self.assertLess(batched, 16 * 0.05 / 2)
+
+    def test_workers_run_groups_concurrently(self):
+        """With workers > 1 a slow group does not block the next one."""
+        release = threading.Event()
+
+        def process(key, payloads):
+            if key == "slow":
+                release.wait(5)
+            return list(payloads)
+
+        batcher = MicroBatcher(process, max_wait_ms=5, workers=2)
+        try:
+            slow = batcher.submit("a", key="slow")
+            fast = batcher.submit("b", key="fast")
+            self.assertEqual(fast.result(timeout=2), "b")
+            self.assertFalse(slow.done())
+            release.set()
+            self.assertEqual(slow.result(timeout=5), "a")
+        finally:
+            batcher.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmark import configure_for_upstream, make_clips, run_benchmark
+from src.stats import percentile
+from mock_upstream import LatencyModel, MockUpstream
+
+
+class TestPercentile(unittest.TestCase):
+    def test_percentiles(self):
+        """Percentiles interpolate between samples."""
+        values = [float(v) for v in range(1, 101)]
+        self.assertAlmostEqual(percentile(values, 50), 50.5)
+        self.assertAlmostEqual(percentile(values, 99), 99.01)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_latency_model(self):
+        """Latency specs are parsed and never go negative."""
+        self.assertEqual(LatencyModel("fixed:0.25").sample(), 0.25)
+        self.assertGreaterEqual(LatencyModel("normal:0,1").sample(), 0.0)
+        with self.assertRaises(ValueError):
+            LatencyModel("zipf:1")
+
+
+class TestOfflineBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        self.env = mock.patch.dict(os.environ)
+        self.env.start()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.env.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_pipeline_against_mock_upstream(self):
+        """The full pipeline runs offline against the mock upstream."""
+        with MockUpstream() as upstream:
+            configure_for_upstream(upstream.base_url)
+            from audio_translation_pipeline import AudioTranslationPipeline
+            pipeline = AudioTranslationPipeline()
+
+            clips = make_clips(self.workdir, 4, duration=1.0)
+            os.chdir(self.workdir)
+            report = run_benchmark(pipeline, [(clip, "hi", "ta") for clip in clips], concurrency=2)
+
+        self.assertEqual(report['succeeded'], 4)
+        self.assertEqual(report['failed'], 0)
+        self.assertEqual(upstream.request_counts,
+                         {'transcribe': 4, 'translate': 4, 'synthesize': 4})
+        self.assertGreater(report['throughput_jobs_per_s'], 0)
+        self.assertLessEqual(report['latency_s']['p50'], report['latency_s']['p99'])
+        # Audio stays in memory; benchmark runs write no output files
+        self.assertFalse(os.path.exists(os.path.join(self.workdir, "outputs")))
+
+    def test_error_rate(self):
+        """Injected upstream errors surface as failed jobs."""
+        with MockUpstream(error_rate=1.0) as upstream:
+            configure_for_upstream(upstream.base_url)
+            from audio_translation_pipeline import AudioTranslationPipeline
+            pipeline = AudioTranslationPipeline()
+
+            clips = make_clips(self.workdir, 2, duration=0.5)
+            report = run_benchmark(pipeline, [(clip, "hi", "ta") for clip in clips], concurrency=2)
+
+        self.assertEqual(report['failed'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmark import configure_for_upstream, make_clips
+from mock_upstream import MockRedis, MockUpstream
+from src import cache as cache_module
+from src.cache import DiskCache, MemoryCache, RedisCache, RedisError, StageCache, shared_cache
+
+
+class TestStageCache(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.redis = MockRedis().start()
+
+    def tearDown(self):
+        self.redis.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def backends(self):
+        return [MemoryCache(), DiskCache(os.path.join(self.workdir, "cache")), RedisCache(self.redis.url)]
+
+    def test_round_trip(self):
+        """Every backend returns what was stored, and misses on other inputs."""
+        for backend in self.backends():
+            with self.subTest(backend=backend.name):
+                cache = StageCache(backend)
+                cache.set('translation', 'नमस्ते', 'hello', 'en', 'hi')
+                self.assertEqual(cache.get('translation', 'hello', 'en', 'hi'), ('नमस्ते', None))
+                self.assertEqual(cache.get('translation', 'hello', 'en', 'ta'), (None, None))
+                cache.set('synthesis', {'format': 'flac'}, 'x', payload=b'small')
+                self.assertEqual(cache.get('synthesis', 'x'), ({'format': 'flac'}, b'small'))
+
+    def test_large_payloads_are_stored_once(self):
+        """Big payloads live under their content hash, shared by every record that uses them."""
+        backend = MemoryCache()
+        cache = StageCache(backend, blob_threshold=1024)
+        audio = os.urandom(10000)
+        cache.set('synthesis', {'format': 'flac'}, 'a', payload=audio)
+        cache.set('synthesis', {'format': 'flac'}, 'b', payload=audio)
+        self.assertEqual(cache.get('synthesis', 'b'), ({'format': 'flac'}, audio))
+        blobs = [key for key in backend._items if key.startswith('vangmaya:blob:')]
+        self.assertEqual(len(blobs), 1)
+        # Records themselves stay small
+        self.assertLess(len(backend._items[cache.key('synthesis', 'a')]), 200)
+
+    def test_memory_ttl_and_budget(self):
+        backend = MemoryCache(max_bytes=10)
+        backend.set('a', b'12345')
+        backend.set('b', b'12345')
+        backend.get('a')
+        backend.set('c', b'12345')
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('a'), b'12345')
+        backend.set('d', b'1', ttl=-1)
+        self.assertIsNone(backend.get('d'))
+
+    def test_redis_ttl_is_sent(self):
+        cache = StageCache(RedisCache(self.redis.url), ttl=3600)
+        cache.set('translation', 'x', 'y')
+        self.assertEqual(len(self.redis.data), 1)
+        self.assertIsNotNone(next(iter(self.redis.data.values()))[1])
+
+    def test_outage_is_a_miss(self):
+        """A failing or unreachable backend never fails the caller."""
+        cache = StageCache(RedisCache(self.redis.url))
+        cache.set('translation', 'x', 'y')
+        self.redis.down = True
+        self.assertEqual(cache.get('translation', 'y'), (None, None))
+        cache.set('translation', 'x', 'z')
+        self.redis.stop()
+        # Nothing listens there any more
+        unreachable = StageCache(RedisCache(self.redis.url, timeout=1))
+        self.assertEqual(unreachable.get('translation', 'y'), (None, None))
+        unreachable.set('translation', 'x', 'y')
+
+    def test_failed_auth_does_not_keep_the_connection(self):
+        """A connection whose AUTH fails is closed rather than reused unauthenticated."""
+        cache = RedisCache(self.redis.url.replace('redis://', 'redis://:wrong@'))
+        with mock.patch.object(RedisCache, '_roundtrip', side_effect=RedisError('WRONGPASS')):
+            with self.assertRaises(RedisError):
+                cache.execute('PING')
+        self.assertIsNone(getattr(cache._local, 'connection', None))
+
+    def test_shared_cache_from_env(self):
+        with mock.patch.dict(os.environ, {'VANGMAYA_CACHE': 'off'}):
+            self.assertIsNone(shared_cache())
+        with mock.patch.dict(os.environ, {'VANGMAYA_CACHE': 'bogus'}):
+            with self.assertRaises(ValueError):
+                shared_cache()
+        with mock.patch.dict(os.environ, {'VANGMAYA_CACHE': 'memory'}):
+            self.assertIs(shared_cache(), shared_cache())
+
+
+class TestPipelineCache(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ)
+        self.env.start()
+        self.shared = mock.patch.dict(cache_module._shared, clear=True)
+        self.shared.start()
+
+    def tearDown(self):
+        self.shared.stop()
+        self.env.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_second_node_hits_the_shared_cache(self):
+        """A pipeline on another node reuses every stage result through Redis."""
+        clip = make_clips(self.workdir, 1, duration=2.0)[0]
+        # The same audio uploaded under another name
+        copy = os.path.join(self.workdir, "copy.wav")
+        shutil.copy(clip, copy)
+        with MockUpstream() as upstream, MockRedis() as redis:
+            configure_for_upstream(upstream.base_url)
+            os.environ['VANGMAYA_CACHE'] = 'redis'
+            os.environ['VANGMAYA_CACHE_URL'] = redis.url
+            from audio_translation_pipeline import AudioTranslationPipeline
+
+            first = AudioTranslationPipeline().process(clip, 'hi', 'ta', output_dir=self.workdir)
+            counts = dict(upstream.request_counts)
+            self.assertEqual(set(counts.values()), {1})
+
+            # A fresh process: nothing in memory, only the shared backend
+            cache_module._shared.clear()
+            second = AudioTranslationPipeline().process(copy, 'hi', 'ta', output_dir=self.workdir)
+
+        self.assertEqual(upstream.request_counts, counts)
+        self.assertEqual(second['translated_text'], first['translated_text'])
+        self.assertTrue(os.path.exists(second['audio_path']))
+
+    def test_endpoint_deployments_do_not_share_audio(self):
+        """Synthesis cache keys include the endpoint, so staging and production stay apart."""
+        from text_to_speech import TextToSpeech
+        from tts_backends import EndpointBackend
+        clip = make_clips(self.workdir, 1, duration=0.5)[0]
+        os.environ['VANGMAYA_TRANSPORT'] = 'direct'
+        staging = TextToSpeech(backend=EndpointBackend('http://staging:8000'))
+        production = TextToSpeech(backend=EndpointBackend('http://production:8000'))
+        self.assertNotEqual(staging._cache_parts('hello', clip, 'ref'),
+                            production._cache_parts('hello', clip, 'ref'))
+        # Recordings still replay against any endpoint URL
+        self.assertEqual(staging._recording_key('hello', clip, 'ref'),
+                         production._recording_key('hello', clip, 'ref'))
+
+    def test_stage_keys_include_the_upstream(self):
+        """Transcripts and translations from different upstreams are cached apart."""
+        from translator import TextTranslator
+        from voice_to_text import VoiceToTextConverter
+        clip = make_clips(self.workdir, 1, duration=0.5)[0]
+        os.environ['VANGMAYA_TRANSPORT'] = 'direct'
+        self.assertNotEqual(TextTranslator(base_url='http://staging:8000')._cache_parts('hello', 'en', 'hi'),
+                            TextTranslator(base_url='http://production:8000')._cache_parts('hello', 'en', 'hi'))
+        self.assertNotEqual(VoiceToTextConverter(base_url='http://staging:8000')._cache_parts(clip, 'hi'),
+                            VoiceToTextConverter(base_url='http://production:8000')._cache_parts(clip, 'hi'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import soundfile as sf
+
+from benchmark import configure_for_upstream, make_clips
+from mock_upstream import MockUpstream
+from src.metrics import STAGE_SKIPS
+
+
+class TestFastPaths(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ)
+        self.env.start()
+        self.upstream = MockUpstream().__enter__()
+        configure_for_upstream(self.upstream.base_url)
+        from audio_translation_pipeline import AudioTranslationPipeline
+        self.pipeline = AudioTranslationPipeline()
+
+    def tearDown(self):
+        self.upstream.__exit__(None, None, None)
+        self.env.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def write_wav(self, name, samples, sample_rate=16000):
+        path = os.path.join(self.workdir, name)
+        sf.write(path, samples, sample_rate)
+        return path
+
+    def test_silence_skips_every_stage(self):
+        """Silent and near-empty recordings never reach an upstream."""
+        before = STAGE_SKIPS.get(stage='transcribe', reason='silence')
+        hiss = self.write_wav("hiss.wav", np.random.default_rng(0).normal(0, 1e-4, 32000).astype(np.float32))
+        blip = self.write_wav("blip.wav", np.full(800, 0.5, dtype=np.float32))
+
+        for path in (hiss, blip):
+            result = self.pipeline.process(path, "hi", "ta")
+            self.assertEqual(result['skipped_stages'], ['transcribe', 'translate', 'synthesize'])
+            self.assertEqual(result['translated_text'], '')
+            self.assertGreater(result['audio'].duration, 0)
+
+        self.assertEqual(sum(self.upstream.request_counts.values()), 0)
+        self.assertEqual(STAGE_SKIPS.get(stage='transcribe', reason='silence') - before, 2)
+
+    def test_identity_pair_skips_translation(self):
+        """Same source and target language reuses the transcript."""
+        clip = make_clips(self.workdir, 1, duration=0.5)[0]
+        result = self.pipeline.process(clip, "hi", "hi")
+        self.assertEqual(result['translated_text'], result['original_text'])
+        self.assertEqual(result['skipped_stages'], ['translate'])
+        self.assertEqual(self.upstream.request_counts, {'transcribe': 1, 'translate': 0, 'synthesize': 1})
+
+    def test_delivery_encodes_only_on_request(self):
+        """In-memory results are not encoded unless the caller asks for bytes."""
+        clip = make_clips(self.workdir, 1, duration=0.5)[0]
+        self.pipeline.output_format = 'flac'
+        with mock.patch('src.audio.AudioBuffer.encode_async') as encode_async:
+            self.pipeline.process(clip, "hi", "hi")
+            encode_async.assert_not_called()
+            self.pipeline.process(clip, "hi", "hi", encode=True)
+            encode_async.assert_called_once_with('flac')
+
+    def test_empty_transcript_skips_translation_and_synthesis(self):
+        clip = make_clips(self.workdir, 1, duration=0.5)[0]
+        with mock.patch.object(self.pipeline.transcriber, 'transcribe', return_value={'output': [{'source': ' '}]}):
+            result = self.pipeline.process(clip, "hi", "ta", output_dir=os.path.join(self.workdir, "out"))
+        self.assertEqual(result['skipped_stages'], ['translate', 'synthesize'])
+        self.assertTrue(os.path.exists(result['audio_path']))
+        self.assertEqual(self.upstream.request_counts['translate'], 0)
+
+    def test_languages_checked_before_any_work(self):
+        with self.assertRaises(ValueError):
+            self.pipeline.process(os.path.join(self.workdir, "missing.wav"), "hi", "xx")
+
+    def test_check_can_be_disabled(self):
+        """VANGMAYA_SILENCE_DBFS=off sends even silent input to ASR."""
+        os.environ['VANGMAYA_SILENCE_DBFS'] = 'off'
+        from audio_translation_pipeline import AudioTranslationPipeline
+        pipeline = AudioTranslationPipeline()
+        silent = self.write_wav("silent.wav", np.zeros(16000, dtype=np.float32))
+        pipeline.process(silent, "hi", "ta")
+        self.assertEqual(self.upstream.request_counts['transcribe'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+import io
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from src.hedging import HEDGED_REQUESTS, Hedger, hedger_from_env
+from src.request_manager import RequestManager
+from src.transport import Transport
+from translator import TextTranslator
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, name: str):
+        self.name = name
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+class _Upstream:
+    """Answers each call after the next delay in line, naming the call."""
+
+    def __init__(self, *delays: float):
+        self.delays = list(delays)
+        self.calls = 0
+        self.responses = []
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+            delay = self.delays.pop(0) if self.delays else 0.0
+        time.sleep(delay)
+        response = _Response(f'call-{call}')
+        self.responses.append(response)
+        return response
+
+
+def _count(outcome: str, service: str = 'test') -> float:
+    return HEDGED_REQUESTS.get(service=service, outcome=outcome)
+
+
+class TestHedger(unittest.TestCase):
+    def test_slow_request_is_hedged(self):
+        """A stuck original loses to the duplicate, which is closed when it finally answers."""
+        hedger = Hedger(budget=1.0, initial_delay=0.05, service='test')
+        won = _count('won')
+        upstream = _Upstream(1.0, 0.0)
+        start = time.perf_counter()
+        response = hedger.send(upstream)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual((response.name, upstream.calls), ('call-2', 2))
+        self.assertEqual(_count('won'), won + 1)
+        # The abandoned original is closed once it completes
+        deadline = time.time() + 5
+        while len(upstream.responses) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(upstream.responses[1].closed.wait(1))
+
+    def test_fast_request_is_not_hedged(self):
+        """Answers before the delay never send a duplicate."""
+        hedger = Hedger(budget=1.0, initial_delay=0.5, service='test')
+        upstream = _Upstream(0.0)
+        self.assertEqual(hedger.send(upstream).name, 'call-1')
+        self.assertEqual(upstream.calls, 1)
+
+    def test_budget_caps_extra_load(self):
+        """With every request slow, duplicates stay within the budget."""
+        hedger = Hedger(budget=0.1, initial_delay=0.001, min_samples=1000, service='test')
+        suppressed = _count('suppressed')
+        upstream = _Upstream(*[0.01] * 200)
+        for _ in range(50):
+            hedger.send(upstream)
+        self.assertLessEqual(upstream.calls - 50, 5)
+        self.assertGreaterEqual(_count('suppressed') - suppressed, 45)
+
+    def test_delay_follows_p95(self):
+        """After min_samples the delay is the p95 of observed latencies."""
+        hedger = Hedger(budget=0.05, initial_delay=2.0, min_delay=0.0, min_samples=20, service='test')
+        self.assertEqual(hedger.delay, 2.0)
+        for i in range(100):
+            hedger._observe(i / 100)
+        self.assertAlmostEqual(hedger.delay, 0.95)
+
+    def test_error_responses_do_not_lower_the_delay(self):
+        """Fast 5xx answers are not counted as latency samples."""
+        hedger = Hedger(budget=0.05, min_delay=0.0, min_samples=1, initial_delay=2.0, service='test')
+
+        def unavailable():
+            response = _Response('503')
+            response.status_code = 503
+            return response
+
+        for _ in range(5):
+            self.assertEqual(hedger.send(unavailable).status_code, 503)
+        self.assertEqual(hedger.delay, 2.0)
+        hedger.send(_Upstream(0.0))
+        self.assertLess(hedger.delay, 2.0)
+
+    def test_workers_are_bounded_and_reused(self):
+        """Calls reuse a fixed pool, and run inline when it is busy."""
+        hedger = Hedger(budget=1.0, initial_delay=0.5, workers=2, service='test')
+        upstream = _Upstream()
+        for _ in range(20):
+            hedger.send(upstream)
+        names = {t.name for t in threading.enumerate() if t.name.startswith('hedge-test')}
+        self.assertLessEqual(len(names), 2)
+
+        release = threading.Event()
+        threads = [threading.Thread(target=hedger.send, args=(lambda: release.wait(5) and _Response('held'),))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        # Both workers are held; this call runs on the caller's thread instead of queueing
+        self.assertEqual(hedger.send(lambda: _Response('inline')).name, 'inline')
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        hedger.close()
+
+    def test_errors_wait_for_the_other_copy(self):
+        """A failed original does not fail the call while the duplicate can still answer."""
+        hedger = Hedger(budget=1.0, initial_delay=0.02, service='test')
+        attempts = []
+
+        def flaky():
+            attempts.append(None)
+            if len(attempts) == 1:
+                time.sleep(0.05)
+                raise requests.ConnectionError("reset")
+            time.sleep(0.1)
+            return _Response('hedge')
+
+        self.assertEqual(hedger.send(flaky).name, 'hedge')
+
+        def broken():
+            time.sleep(0.05)
+            raise requests.ConnectionError("down")
+
+        with self.assertRaises(requests.ConnectionError):
+            hedger.send(broken)
+
+    def test_server_errors_wait_for_the_other_copy(self):
+        """A fast 5xx from the duplicate does not beat an original that is still running."""
+        hedger = Hedger(budget=1.0, initial_delay=0.02, service='test')
+        calls = []
+
+        def request():
+            calls.append(None)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                return _Response('original')
+            response = _Response('unavailable')
+            response.status_code = 503
+            return response
+
+        self.assertEqual(hedger.send(request).name, 'original')
+        self.assertEqual(len(calls), 2)
+
+    def test_refunds_respect_max_tokens(self):
+        """A refunded token never lifts the bucket past max_tokens."""
+        hedger = Hedger(budget=1.0, max_tokens=2.0, service='test')
+        for _ in range(5):
+            hedger._deposit()
+        hedger._refund()
+        self.assertEqual(hedger._tokens, 2.0)
+
+    def test_configuration(self):
+        """Hedging is off unless a percentage is configured."""
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(hedger_from_env('translate'))
+        with mock.patch.dict(os.environ, {'VANGMAYA_TRANSLATE_HEDGE_PERCENT': '5'}):
+            self.assertAlmostEqual(hedger_from_env('translate').budget, 0.05)
+        with self.assertRaises(ValueError):
+            Hedger(budget=0)
+
+
+class _StallingTransport(Transport):
+    name = "stalling"
+
+    def __init__(self):
+        self.calls = 0
+
+    def send(self, method, url, headers, timeout, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            time.sleep(1.0)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"output": [{"target": "namaste"}]}'
+        response.raw = io.BytesIO(response._content)
+        return response
+
+
+class TestTranslatorHedging(unittest.TestCase):
+    def test_translate_hedges_through_request_manager(self):
+        """TextTranslator hands its attempts to the hedger."""
+        transport = _StallingTransport()
+        with mock.patch.dict(os.environ, {'VANGMAYA_HTTP_CACHE_MODE': 'off', 'VANGMAYA_CACHE': ''}):
+            translator = TextTranslator(transport=transport, base_url='http://upstream', hedge_percent=100)
+        translator.request_manager.hedger.initial_delay = 0.05
+        start = time.perf_counter()
+        self.assertEqual(translator.translate("hello", "hi"), "namaste")
+        self.assertLess(time.perf_counter() - start, 0.8)
+        self.assertEqual(transport.calls, 2)
+
+    def test_record_replay_disables_hedging(self):
+        """Recorded runs send exactly one request per attempt."""
+        with mock.patch.dict(os.environ, {'VANGMAYA_HTTP_CACHE_MODE': 'replay'}):
+            manager = RequestManager(service='translate', hedger=Hedger(service='translate'))
+        self.assertIsNone(manager.hedger)
+
+
+if __name__ == "__main__":
+    unittest.main()
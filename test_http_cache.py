@@ -0,0 +1,186 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from benchmark import configure_for_upstream, make_clips
+from mock_upstream import MockUpstream
+from src.http_cache import (RecordReplayStore, RecordReplayTransport, ReplayMissError,
+                            request_fingerprint)
+from src.request_manager import RequestManager
+from src.transport import DirectTransport
+
+
+class TestRecordReplayStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_fingerprint_ignores_key_order(self):
+        """Equivalent JSON bodies produce the same fingerprint."""
+        a = request_fingerprint('post', 'http://x/translate', json={"a": 1, "b": 2})
+        b = request_fingerprint('POST', 'http://x/translate', json={"b": 2, "a": 1})
+        c = request_fingerprint('POST', 'http://x/translate', json={"a": 1, "b": 3})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test_round_trip_is_compressed(self):
+        """Bodies are stored compressed and read back unchanged."""
+        store = RecordReplayStore(self.directory)
+        body = b'\x00' * 100000
+        store.put('ab' * 32, {'status_code': 200}, body)
+        self.assertIn('ab' * 32, store)
+        self.assertEqual(store.get('ab' * 32), ({'status_code': 200}, body))
+        self.assertLess(os.path.getsize(os.path.join(self.directory, 'ab', 'ab' * 32 + '.bin')), 1000)
+        self.assertIsNone(store.get('cd' * 32))
+
+    def test_record_then_replay_without_network(self):
+        """Recorded responses are served in replay mode after the upstream is gone."""
+        store = RecordReplayStore(self.directory)
+        payload = {"input": "hello", "targetLanguage": "hi"}
+        with MockUpstream() as upstream:
+            recorder = RequestManager(
+                service='translate',
+                transport=RecordReplayTransport(DirectTransport(), store, 'record'),
+                base_url=upstream.base_url
+            )
+            recorded = recorder.post(recorder.url_for('/inference/translate'), json=payload)
+
+        replayer = RequestManager(
+            service='translate',
+            transport=RecordReplayTransport(None, store, 'replay'),
+            base_url=upstream.base_url
+        )
+        replayed = replayer.post(replayer.url_for('/inference/translate'), json=payload)
+        self.assertEqual(replayed.json(), recorded.json())
+        self.assertEqual(replayed.headers['Content-Type'], 'application/json')
+
+        with self.assertRaises(ReplayMissError):
+            replayer.post(replayer.url_for('/inference/translate'), json={"input": "other"})
+
+    def test_replayed_bodies_do_not_claim_an_encoding(self):
+        """Bodies are stored decoded, so replays drop content-encoding and content-length."""
+        class GzipTransport(DirectTransport):
+            def send(self, method, url, headers, timeout, **kwargs):
+                response = requests.Response()
+                response.status_code = 200
+                response.headers = CaseInsensitiveDict({
+                    'Content-Type': 'application/json', 'Content-Encoding': 'gzip', 'Content-Length': '20'})
+                response._content = b'{"output": []}'
+                return response
+
+        store = RecordReplayStore(self.directory)
+        RecordReplayTransport(GzipTransport(), store, 'record').send('POST', 'http://x/t', {}, 5, json={})
+        replayed = RecordReplayTransport(None, store, 'replay').send('POST', 'http://x/t', {}, 5, json={})
+        self.assertEqual(replayed.json(), {"output": []})
+        self.assertEqual(dict(replayed.headers), {'Content-Type': 'application/json'})
+
+
+class TestPipelineReplay(unittest.TestCase):
+    def test_pipeline_replays_recorded_run(self):
+        """A recorded pipeline run replays offline with identical results."""
+        workdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        env = {
+            'VANGMAYA_HTTP_CACHE_DIR': os.path.join(workdir, 'recordings'),
+            'VANGMAYA_HTTP_CACHE_MODE': 'record',
+        }
+        try:
+            with mock.patch.dict(os.environ, env):
+                from audio_translation_pipeline import AudioTranslationPipeline
+                clip = make_clips(workdir, 1, duration=1.0)[0]
+                os.chdir(workdir)
+                with MockUpstream() as upstream:
+                    configure_for_upstream(upstream.base_url)
+                    recorded = AudioTranslationPipeline().process(clip, 'hi', 'ta')
+
+                os.environ['VANGMAYA_HTTP_CACHE_MODE'] = 'replay'
+                os.environ.pop('SCRAPER_API_KEY', None)
+                replayed = AudioTranslationPipeline().process(clip, 'hi', 'ta')
+        finally:
+            os.chdir(cwd)
+
+        try:
+            self.assertEqual(replayed['translated_text'], recorded['translated_text'])
+            self.assertEqual(replayed['audio'].to_bytes(), recorded['audio'].to_bytes())
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def test_recording_with_a_warm_cache_replays(self):
+        """A record run with every stage already cached still records every upstream call."""
+        from audio_translation_pipeline import AudioTranslationPipeline
+
+        workdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        env = {
+            'VANGMAYA_HTTP_CACHE_DIR': os.path.join(workdir, 'recordings'),
+            'VANGMAYA_HTTP_CACHE_MODE': 'off',
+            'VANGMAYA_CACHE': 'disk',
+            'VANGMAYA_CACHE_DIR': os.path.join(workdir, 'cache'),
+        }
+        try:
+            with mock.patch.dict(os.environ, env):
+                clip = make_clips(workdir, 1, duration=1.0)[0]
+                os.chdir(workdir)
+                with MockUpstream() as upstream:
+                    configure_for_upstream(upstream.base_url)
+                    AudioTranslationPipeline().process(clip, 'hi', 'ta')
+                    os.environ['VANGMAYA_HTTP_CACHE_MODE'] = 'record'
+                    recorded = AudioTranslationPipeline().process(clip, 'hi', 'ta')
+
+                os.environ['VANGMAYA_HTTP_CACHE_MODE'] = 'replay'
+                os.environ['VANGMAYA_CACHE'] = 'off'
+                os.environ.pop('SCRAPER_API_KEY', None)
+                replayed = AudioTranslationPipeline().process(clip, 'hi', 'ta')
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.assertEqual(replayed['translated_text'], recorded['translated_text'])
+        self.assertEqual(replayed['audio'].to_bytes(), recorded['audio'].to_bytes())
+
+    def test_tts_replay_miss_fails_fast(self):
+        """A missing TTS recording surfaces as ReplayMissError without retries."""
+        from audio_translation_pipeline import AudioTranslationPipeline
+        from text_to_speech import TextToSpeech
+        from tts_backends import InProcessBackend
+
+        workdir = tempfile.mkdtemp()
+        env = {'VANGMAYA_HTTP_CACHE_DIR': os.path.join(workdir, 'recordings'),
+               'VANGMAYA_HTTP_CACHE_MODE': 'replay'}
+        try:
+            clip = make_clips(workdir, 1, duration=1.0)[0]
+            with mock.patch.dict(os.environ, env):
+                tts = TextToSpeech(backend=InProcessBackend(engine_factory=lambda: None))
+                with self.assertRaises(ReplayMissError):
+                    tts.generate_speech("text", clip, "ref", os.path.join(workdir, 'out.wav'))
+                tts.close()
+
+                os.environ.update({'VANGMAYA_REF_MAX_SECONDS': '0', 'VANGMAYA_SILENCE_DBFS': 'off'})
+                pipeline = AudioTranslationPipeline(
+                    output_format='wav',
+                    transcriber=mock.Mock(**{'transcribe.return_value': {'output': [{'source': 'x'}]}}),
+                    translator=mock.Mock(**{'translate.return_value': 'y'}),
+                    synthesizer=mock.Mock(**{'generate_speech.side_effect': ReplayMissError('miss')}))
+                cwd = os.getcwd()
+                os.chdir(workdir)
+                try:
+                    with mock.patch('audio_translation_pipeline.time.sleep') as sleep:
+                        with self.assertRaises(ReplayMissError):
+                            pipeline.process(clip, 'hi', 'ta')
+                finally:
+                    os.chdir(cwd)
+            self.assertEqual(pipeline.synthesizer.generate_speech.call_count, 1)
+            sleep.assert_not_called()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
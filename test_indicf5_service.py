@@ -0,0 +1,95 @@
+import base64
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+from indicf5.modal_deploy import SAMPLE_RATE, create_app
+
+
+class StubModel:
+    """Stands in for IndicF5: returns half a second of int16 audio per call."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text, ref_audio_path, ref_text):
+        self.calls += 1
+        return (np.sin(np.linspace(0, 100, SAMPLE_RATE // 2)) * 10000).astype(np.int16)
+
+
+class TestIndicF5LocalService(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.loads = 0
+        cls.model = StubModel()
+
+        def loader():
+            cls.loads += 1
+            return cls.model
+
+        handle, cls.ref_audio = tempfile.mkstemp(suffix='.wav')
+        os.close(handle)
+        sf.write(cls.ref_audio, np.zeros(SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE)
+        cls.client_context = TestClient(create_app(loader))
+        cls.client = cls.client_context.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client_context.__exit__(None, None, None)
+        os.remove(cls.ref_audio)
+
+    def request(self, **overrides):
+        payload = {"text": "नमस्ते", "ref_audio_path": self.ref_audio, "ref_text": "ref"}
+        payload.update(overrides)
+        return self.client.post("/generate_speech", json=payload)
+
+    def test_model_loaded_once(self):
+        """The model loads at startup, not per request."""
+        self.request()
+        self.request()
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(self.client.get("/health").json(), {"status": "ok"})
+
+    def test_wav_response(self):
+        """Responses are WAV bytes with the right content type."""
+        response = self.request()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "audio/wav")
+        audio, sample_rate = sf.read(io.BytesIO(response.content), dtype='float32')
+        self.assertEqual(sample_rate, SAMPLE_RATE)
+        self.assertEqual(len(audio), SAMPLE_RATE // 2)
+        self.assertLessEqual(np.abs(audio).max(), 1.0)
+
+    def test_flac_response(self):
+        """FLAC output is smaller than WAV for the same audio."""
+        wav = self.request(format="wav")
+        flac = self.request(format="flac")
+        self.assertEqual(flac.headers["content-type"], "audio/flac")
+        self.assertLess(len(flac.content), len(wav.content))
+
+    def test_uploaded_reference(self):
+        """/synthesize_speech takes the reference clip inline, as EndpointBackend sends it."""
+        with open(self.ref_audio, 'rb') as f:
+            ref_audio_base64 = base64.b64encode(f.read()).decode('utf-8')
+        response = self.client.post("/synthesize_speech", json={
+            "text": "नमस्ते", "ref_audio_base64": ref_audio_base64, "ref_text": "ref"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "audio/wav")
+
+        response = self.client.post("/synthesize_speech", json={
+            "text": "नमस्ते", "ref_audio_base64": "not base64!", "ref_text": "ref"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_requests(self):
+        """Unknown formats and missing reference audio are rejected."""
+        self.assertEqual(self.request(format="mp4").status_code, 400)
+        self.assertEqual(self.request(ref_audio_path="/nonexistent.wav").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
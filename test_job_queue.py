@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from benchmark import configure_for_upstream, make_clips
+from mock_upstream import MockUpstream
+from src.job_queue import JobQueue, WorkerPool, run_worker
+from workers import PIPELINE_HANDLER, enqueue_translation
+
+
+def echo_handler():
+    def handle(job):
+        if job.payload.get('fail'):
+            raise RuntimeError("boom")
+        return {'echo': job.payload['value'], 'pid': os.getpid()}
+    return handle
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, "queue.sqlite3")
+        self.queue = JobQueue(self.path)
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_priority_then_age(self):
+        """Higher priority jobs are claimed first, then the oldest."""
+        low = self.queue.enqueue({'value': 1})
+        high = self.queue.enqueue({'value': 2}, priority=10)
+        later_low = self.queue.enqueue({'value': 3})
+
+        self.assertEqual(self.queue.get(later_low)['position'], 2)
+        self.assertEqual([self.queue.claim("w").id for _ in range(3)], [high, low, later_low])
+        self.assertIsNone(self.queue.claim("w"))
+
+    def test_expired_lease_is_reclaimed(self):
+        """A job whose worker stops heartbeating goes to another worker, then fails after max_attempts."""
+        queue = JobQueue(self.path, visibility_timeout=0.05)
+        job_id = queue.enqueue({'value': 1}, max_attempts=2)
+        self.assertEqual(queue.claim("crashed").id, job_id)
+        self.assertIsNone(queue.claim("other"))
+        time.sleep(0.1)
+
+        reclaimed = queue.claim("other")
+        self.assertEqual((reclaimed.id, reclaimed.attempts), (job_id, 2))
+        # The first worker's late result is dropped
+        self.assertFalse(queue.complete(job_id, "crashed", {}))
+        time.sleep(0.1)
+
+        self.assertIsNone(queue.claim("third"))
+        job = queue.get(job_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn("too many times", job['error'])
+        queue.close()
+
+    def test_worker_records_results_and_failures(self):
+        """run_worker stores handler results and exceptions, and heartbeats keep long jobs leased."""
+        ok = self.queue.enqueue({'value': 'hello'})
+        bad = self.queue.enqueue({'value': 'x', 'fail': True})
+
+        ran = run_worker(self.path, 'test_job_queue:echo_handler', worker="w1", max_jobs=2, poll_interval=0.01)
+
+        self.assertEqual(ran, 2)
+        self.assertEqual(self.queue.get(ok)['result']['echo'], 'hello')
+        self.assertEqual(self.queue.get(bad)['status'], 'failed')
+        self.assertEqual(self.queue.get(bad)['error'], 'boom')
+
+    def test_worker_stops_when_asked(self):
+        """An idle worker exits once its stop event is set."""
+        stop = threading.Event()
+        thread = threading.Thread(target=run_worker, args=(self.path, 'test_job_queue:echo_handler'),
+                                  kwargs={'stop': stop, 'poll_interval': 0.01})
+        thread.start()
+        stop.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, "queue.sqlite3")
+        self.env = mock.patch.dict(os.environ)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_processes_share_the_queue(self):
+        """Jobs enqueued here are run by separate worker processes."""
+        queue = JobQueue(self.path)
+        job_ids = [queue.enqueue({'value': i}) for i in range(6)]
+        with WorkerPool(self.path, 'test_job_queue:echo_handler', processes=2):
+            results = [queue.wait(job_id, timeout=60, poll_interval=0.05) for job_id in job_ids]
+
+        self.assertEqual([job['result']['echo'] for job in results], list(range(6)))
+        self.assertNotIn(os.getpid(), {job['result']['pid'] for job in results})
+        queue.close()
+
+    def test_pipeline_jobs(self):
+        """Pipeline jobs run in worker processes and leave their audio on disk."""
+        with MockUpstream() as upstream:
+            configure_for_upstream(upstream.base_url)
+            clip = make_clips(self.workdir, 1, duration=0.5)[0]
+            queue = JobQueue(self.path)
+            job_id = enqueue_translation(queue, clip, "hi", "ta", output_dir=os.path.join(self.workdir, "out"))
+            with WorkerPool(self.path, PIPELINE_HANDLER, processes=1):
+                job = queue.wait(job_id, timeout=60, poll_interval=0.05)
+            queue.close()
+
+        self.assertEqual(job['status'], 'done', job['error'])
+        self.assertEqual(job['result']['job_id'], job_id)
+        self.assertTrue(os.path.exists(job['result']['audio_path']))
+
+
+if __name__ == "__main__":
+    unittest.main()
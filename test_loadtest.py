@@ -0,0 +1,92 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import loadtest
+from loadtest import ProcessSampler, Workload, parse_pairs, run_ramp, server_timing
+
+
+class TestLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_workload_mix_is_repeatable(self):
+        a = Workload(self.workdir, [0.5, 1.0], [('hi', 'ta'), ('en', 'hi')], clips_per_length=2)
+        b = Workload(self.workdir, [0.5, 1.0], [('hi', 'ta'), ('en', 'hi')], clips_per_length=2)
+        self.assertEqual(len(a.clips), 4)
+        self.assertEqual([a.next() for _ in range(10)], [b.next() for _ in range(10)])
+        self.assertEqual(parse_pairs("hi:ta, ta:hi"), [('hi', 'ta'), ('ta', 'hi')])
+
+    def test_server_timing(self):
+        self.assertEqual(server_timing("queue;dur=12.5, process;desc=\"x\";dur=1000"),
+                         {'queue': 0.0125, 'process': 1.0})
+        self.assertEqual(server_timing(""), {})
+
+    def test_process_sampler(self):
+        sampler = ProcessSampler(os.getpid(), interval=0.05).start()
+        deadline = time.perf_counter() + 0.4
+        while time.perf_counter() < deadline:
+            sum(range(10000))
+        usage = sampler.stop()
+        self.assertGreater(usage['cpu_pct_max'], 20)
+        self.assertGreater(usage['rss_mb_max'], 1)
+
+    def test_saturation(self):
+        """Queueing is detected at the level where waits outgrow the work."""
+        workload = Workload(self.workdir, [0.5], [('hi', 'ta')], clips_per_length=1)
+        # A server with one worker and a FIFO queue in front of it
+        server = ThreadPoolExecutor(max_workers=1)
+
+        def one_at_a_time(clip, source, target):
+            queued = time.perf_counter()
+
+            def work():
+                wait = time.perf_counter() - queued
+                time.sleep(0.02)
+                return wait
+
+            return server.submit(work).result()
+
+        report = run_ramp(one_at_a_time, workload, levels=[1, 4], requests_per_user=3)
+        server.shutdown()
+        self.assertEqual([level['requests'] for level in report['levels']], [3, 12])
+        self.assertLess(report['levels'][0]['queue_wait_s']['p50'], 0.01)
+        self.assertEqual(report['saturation_concurrency'], 4)
+
+    def test_rest_ramp_against_mock_upstream(self):
+        """The CLI starts the REST API on the mock upstream and reports each level."""
+        out = os.path.join(self.workdir, "report.json")
+        loadtest.main(['--levels', '1,2', '--requests-per-user', '2', '--clip-seconds', '0.5',
+                       '--pairs', 'hi:ta,ta:hi', '--json', out])
+        with open(out) as f:
+            report = json.load(f)
+        self.assertEqual(report['target'], 'rest')
+        first, second = report['levels']
+        self.assertEqual((first['requests'], second['requests']), (2, 4))
+        self.assertEqual(second['failed'], 0, second['sample_errors'])
+        self.assertIsNotNone(second['queue_wait_s'])
+        self.assertGreater(second['rss_mb_max'], 0)
+
+    def test_gradio_ramp_against_mock_upstream(self):
+        """Without --url the gradio target gets its own interface on the mock upstream."""
+        report = loadtest.main(['--target', 'gradio', '--levels', '1', '--requests-per-user', '2',
+                                '--clip-seconds', '0.5'])
+        self.assertEqual(report['target'], 'gradio')
+        level = report['levels'][0]
+        self.assertEqual((level['requests'], level['failed']), (2, 0), level['sample_errors'])
+        self.assertGreater(level['rss_mb_max'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import json
+import unittest
+import urllib.request
+
+from src import metrics
+from src.metrics import MetricsRegistry, start_metrics_server
+from src.request_manager import RequestManager
+from src.transport import DirectTransport
+from mock_upstream import MockUpstream
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_openmetrics_rendering(self):
+        """Counters, gauges and histograms render in OpenMetrics text format."""
+        requests_total = self.registry.counter('jobs', 'Jobs seen', ('stage',))
+        in_flight = self.registry.gauge('in_flight', 'Jobs running')
+        latency = self.registry.histogram('latency_seconds', 'Latency', ('stage',), buckets=(0.1, 1.0))
+
+        requests_total.inc(stage='asr')
+        requests_total.inc(2, stage='asr')
+        in_flight.set(3)
+        latency.observe(0.05, stage='asr')
+        latency.observe(0.5, stage='asr')
+
+        text = self.registry.render()
+        self.assertIn('# TYPE jobs counter', text)
+        self.assertIn('jobs_total{stage="asr"} 3', text)
+        self.assertIn('in_flight 3', text)
+        self.assertIn('latency_seconds_bucket{stage="asr",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{stage="asr",le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{stage="asr",le="+Inf"} 2', text)
+        self.assertIn('latency_seconds_count{stage="asr"} 2', text)
+        self.assertTrue(text.endswith('# EOF\n'))
+
+    def test_wrong_labels(self):
+        """Metrics reject label sets that don't match their definition."""
+        counter = self.registry.counter('jobs', 'Jobs seen', ('stage',))
+        with self.assertRaises(ValueError):
+            counter.inc(service='asr')
+
+    def test_duplicate_registration(self):
+        """A metric name can only be registered once."""
+        self.registry.gauge('in_flight', 'Jobs running')
+        with self.assertRaises(ValueError):
+            self.registry.gauge('in_flight', 'Jobs running')
+
+    def test_cache_hit_ratio(self):
+        """Hit ratios are derived from the cache lookup counter."""
+        cache = self.registry.counter('vangmaya_cache_requests', 'Lookups', ('cache', 'result'))
+        cache.inc(3, cache='transcription', result='hit')
+        cache.inc(1, cache='transcription', result='miss')
+        self.assertEqual(self.registry.to_dict()['cache_hit_ratio'], {'transcription': 0.75})
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_request_manager_metrics(self):
+        """RequestManager records attempt latency, retries and payload sizes."""
+        before_success = metrics.REQUEST_DURATION.get_count(service='translate', outcome='success')
+        before_retries = metrics.REQUEST_RETRIES.get(service='translate')
+        with MockUpstream() as upstream:
+            manager = RequestManager(service='translate', transport=DirectTransport(), base_url=upstream.base_url)
+            manager.post(manager.url_for('/inference/translate'),
+                         json={"input": "hello", "targetLanguage": "hi"})
+            with self.assertRaises(Exception):
+                manager.post(manager.url_for('/inference/unknown'), json={})
+
+        self.assertEqual(metrics.REQUEST_DURATION.get_count(service='translate', outcome='success'),
+                         before_success + 1)
+        self.assertEqual(metrics.REQUEST_RETRIES.get(service='translate'),
+                         before_retries + manager.max_retries - 1)
+        self.assertEqual(metrics.REQUESTS_IN_FLIGHT.get(service='translate'), 0)
+        self.assertGreater(metrics.PAYLOAD_BYTES.get_count(service='translate', direction='out'), 0)
+
+    def test_metrics_endpoint(self):
+        """The exporter serves OpenMetrics text and a JSON snapshot."""
+        registry = MetricsRegistry()
+        registry.counter('jobs', 'Jobs seen').inc()
+        server = start_metrics_server(0, host='127.0.0.1', registry=registry)
+        try:
+            base = f"http://127.0.0.1:{server.server_address[1]}"
+            with urllib.request.urlopen(base + '/metrics') as response:
+                self.assertTrue(response.headers['Content-Type'].startswith('application/openmetrics-text'))
+                self.assertIn('jobs_total 1', response.read().decode('utf-8'))
+            with urllib.request.urlopen(base + '/metrics.json') as response:
+                self.assertEqual(json.load(response)['jobs'], {'': 1})
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
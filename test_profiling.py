@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from batch import jobs_from_directory, run_batch
+from benchmark import configure_for_upstream, make_clips
+from mock_upstream import MockUpstream
+from src.journal import JobJournal
+from src.profiling import JobProfiler
+from src.tracing import span
+
+
+def hot_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(1000))
+    return total
+
+
+class TestJobProfiler(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_every_nth_or_forced(self):
+        profiler = JobProfiler(self.workdir, every=3)
+        self.assertEqual([profiler.wants() for _ in range(6)], [False, False, True, False, False, True])
+        self.assertTrue(profiler.wants(force=True))
+        self.assertFalse(JobProfiler(self.workdir).wants())
+
+    def test_profile_is_written_next_to_the_trace(self):
+        """The hot function tops the summary, which records the job's trace ID."""
+        profiler = JobProfiler(self.workdir, interval=0.001)
+        with span('pipeline.process', job_id='job-1') as job_span:
+            with profiler.profile('job-1', force=True) as profile:
+                hot_loop(0.3)
+        self.assertGreater(profile.samples, 20)
+
+        with open(os.path.join(self.workdir, 'job-1.json')) as f:
+            summary = json.load(f)
+        self.assertEqual(summary['trace_id'], job_span.trace_id)
+        self.assertEqual(job_span.attributes['profile.path'], os.path.join(self.workdir, 'job-1.json'))
+        hottest = [entry['function'] for entry in summary['top'][:3]]
+        self.assertTrue(any('hot_loop' in name for name in hottest), hottest)
+
+        with open(summary['collapsed']) as f:
+            lines = f.read().splitlines()
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertIn('hot_loop', stack)
+        self.assertEqual(sum(int(line.rsplit(' ', 1)[1]) for line in lines), profile.samples)
+
+    def test_unselected_jobs_are_not_sampled(self):
+        profiler = JobProfiler(self.workdir)
+        with profiler.profile('job-2') as profile:
+            hot_loop(0.05)
+        self.assertIsNone(profile)
+        self.assertEqual(os.listdir(self.workdir), [])
+
+
+class TestBatchProfiling(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_batch_profiles_every_nth_job(self):
+        clips = os.path.join(self.workdir, "clips")
+        os.makedirs(clips)
+        make_clips(clips, 4, duration=0.5)
+        profiles = os.path.join(self.workdir, "profiles")
+        with MockUpstream() as upstream:
+            configure_for_upstream(upstream.base_url)
+            from audio_translation_pipeline import AudioTranslationPipeline
+            pipeline = AudioTranslationPipeline()
+            pipeline.profiler.directory = profiles
+            with JobJournal(os.path.join(self.workdir, "journal.jsonl")) as journal:
+                summary = run_batch(pipeline, jobs_from_directory(clips, "hi", "ta"), journal,
+                                    os.path.join(self.workdir, "out"), concurrency=2, profile_every=2)
+
+        self.assertEqual(summary['succeeded'], 4)
+        self.assertEqual(len(summary['profiled_jobs']), 2)
+        self.assertEqual(sorted(os.listdir(profiles)),
+                         sorted(f"{job_id}.{ext}" for job_id in summary['profiled_jobs']
+                                for ext in ('collapsed', 'json')))
+
+
+if __name__ == "__main__":
+    unittest.main()
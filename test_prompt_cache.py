@@ -0,0 +1,116 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+from src.prompt_cache import PromptStore
+
+
+def make_clip(frequency: float, sample_rate: int = 16000, channels: int = 2) -> bytes:
+    t = np.arange(sample_rate) / sample_rate
+    tone = 0.3 * np.sin(2 * np.pi * frequency * t)
+    buffer = io.BytesIO()
+    sf.write(buffer, np.stack([tone] * channels, axis=1), sample_rate, format='WAV')
+    return buffer.getvalue()
+
+
+class TestPromptStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_prepare_resamples_and_caches(self):
+        """Prompts are downmixed, resampled and prepared only once."""
+        store = PromptStore(self.directory, sample_rate=24000)
+        clip = make_clip(220)
+        first = store.prepare(clip)
+        second = store.prepare(clip)
+
+        self.assertIs(first, second)
+        self.assertEqual((store.misses, store.hits), (1, 1))
+        self.assertAlmostEqual(first.duration, 1.0)
+        info = sf.info(first.path)
+        self.assertEqual((info.samplerate, info.channels), (24000, 1))
+        self.assertEqual(os.path.basename(first.path), f"{store.content_key(clip)}.wav")
+
+    def test_concurrent_speakers_get_separate_files(self):
+        """Concurrent requests with different prompts never share a file."""
+        store = PromptStore(self.directory)
+        clips = [make_clip(200 + 50 * i) for i in range(6)] * 3
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            prompts = list(executor.map(store.prepare, clips))
+
+        self.assertEqual(len({p.path for p in prompts}), 6)
+        self.assertEqual(store.misses, 6)
+        for clip, prompt in zip(clips, prompts):
+            self.assertEqual(prompt.key, store.content_key(clip))
+        self.assertEqual(len([f for f in os.listdir(self.directory) if f.endswith('.tmp')]), 0)
+
+    def test_lru_eviction(self):
+        """The LRU keeps max_entries prompts and deletes the files it wrote for evicted ones."""
+        store = PromptStore(self.directory, max_entries=2)
+        a, b, c = make_clip(200), make_clip(300), make_clip(400)
+        store.prepare(a)
+        evicted = store.prepare(b)
+        store.prepare(a)
+        store.prepare(c)  # evicts b, the least recently used
+        store.prepare(a)
+        self.assertEqual(store.misses, 3)
+        self.assertFalse(os.path.exists(evicted.path))
+        store.prepare(b)
+        self.assertEqual(store.misses, 4)
+
+        # An entry whose file vanished is rebuilt rather than returned
+        rebuilt = store.prepare(b)
+        os.remove(rebuilt.path)
+        self.assertTrue(os.path.exists(store.prepare(b).path))
+
+    def test_shared_directory_keeps_files_in_use(self):
+        """Stores sharing a directory only delete their own files, or ones unused for max_age."""
+        writer = PromptStore(self.directory, max_entries=4)
+        shared = writer.prepare(make_clip(200))
+        other = PromptStore(self.directory, max_entries=1)
+        self.assertEqual(other.prepare(make_clip(200)).path, shared.path)
+        self.assertEqual(other.misses, 1)
+        other.prepare(make_clip(300))  # evicts the shared prompt from other's LRU only
+        self.assertTrue(os.path.exists(shared.path))
+
+        # A new store prunes only files nobody has touched for max_age
+        stale = writer.prepare(make_clip(400))
+        os.utime(stale.path, (0, 0))
+        PromptStore(self.directory, max_entries=1, max_age=3600)
+        self.assertFalse(os.path.exists(stale.path))
+        self.assertTrue(os.path.exists(shared.path))
+
+    def test_volume_hooks(self):
+        """Writes are committed and missing files reloaded; hook failures are only logged."""
+        calls = []
+        store = PromptStore(self.directory, commit=lambda: calls.append('commit'),
+                            reload=lambda: calls.append('reload'))
+        store.prepare(make_clip(200))
+        self.assertEqual(calls, ['reload', 'reload', 'commit'])
+
+        def broken():
+            raise OSError("volume busy")
+
+        store = PromptStore(self.directory, commit=broken, reload=broken)
+        with self.assertLogs('src.prompt_cache', level='WARNING'):
+            self.assertTrue(os.path.exists(store.prepare(make_clip(300)).path))
+
+    def test_failed_build_releases_its_lock(self):
+        """A clip that cannot be decoded leaves no per-key lock behind."""
+        store = PromptStore(self.directory)
+        with self.assertRaises(Exception):
+            store.prepare(b"not audio")
+        self.assertEqual(store._key_locks, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import soundfile as sf
+
+from src.reference import align_text, select_reference, select_window
+
+RATE = 16000
+
+
+def bursts(seconds: float, level: float, rng: np.random.Generator) -> np.ndarray:
+    """Half-second tone bursts separated by short pauses, like syllables and gaps."""
+    t = np.arange(int(seconds * RATE)) / RATE
+    envelope = (np.sin(2 * np.pi * 0.8 * t) > -0.3).astype(np.float32)
+    return level * envelope * np.sin(2 * np.pi * 180 * t) + 0.002 * rng.standard_normal(len(t))
+
+
+class TestReferenceSelection(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        # 10 s of noisy, quiet speech, 15 s of clean speech, then 15 s of clipped speech
+        noisy = bursts(10, 0.05, rng) + 0.03 * rng.standard_normal(10 * RATE)
+        clean = bursts(15, 0.3, rng)
+        clipped = np.clip(bursts(15, 3.0, rng), -1, 1)
+        self.samples = np.concatenate([noisy, clean, clipped]).astype(np.float32)
+        self.path = os.path.join(self.directory, 'long.wav')
+        sf.write(self.path, self.samples, RATE)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_picks_clean_bounded_window(self):
+        """The window is 5-12 s long and falls inside the clean stretch."""
+        start, end = select_window(self.samples, RATE)
+        self.assertGreaterEqual(end - start, 5.0)
+        self.assertLessEqual(end - start, 12.0)
+        self.assertGreaterEqual(start, 9.5)
+        self.assertLessEqual(end, 25.5)
+
+    def test_short_input_is_kept(self):
+        """Inputs shorter than the minimum are used whole."""
+        short = self.samples[12 * RATE:15 * RATE]
+        self.assertEqual(select_window(short, RATE), (0.0, 3.0))
+
+    def test_text_aligned_with_chunk_timestamps(self):
+        """ASR chunk timestamps decide which words go with the window."""
+        transcription = {'source': 'one two three four', 'chunks': [
+            {'text': 'one', 'timestamp': [0.0, 4.0]}, {'text': 'two', 'timestamp': [11.0, 14.0]},
+            {'text': 'three', 'timestamp': [15.0, 18.0]}, {'text': 'four', 'timestamp': [30.0, 33.0]}]}
+        clip = select_reference(self.path, transcription)
+        self.assertEqual(clip.text, 'two three')
+        self.assertTrue(clip.trimmed)
+        self.assertEqual(clip.audio.sample_rate, 24000)
+        self.assertAlmostEqual(clip.audio.duration, clip.end - clip.start, places=2)
+
+    def test_text_spread_over_speech_without_timestamps(self):
+        """Without timestamps, words are spread evenly over the speech frames."""
+        words = ' '.join(f"w{i}" for i in range(40))
+        text = align_text({'source': words}, 10.0, 20.0, np.linspace(0, 40, 400))
+        self.assertEqual(text.split(), [f"w{i}" for i in range(10, 20)])
+
+    def test_window_without_words_falls_back(self):
+        """A window no word falls in gets no text, and the pipeline uses the whole input."""
+        self.assertEqual(align_text({'source': 'a b c'}, 30.0, 40.0, np.linspace(0, 10, 100)), '')
+        self.assertEqual(align_text({'source': 'a b c'}, 0.0, 10.0, np.array([])), '')
+
+        transcription = {'source': 'one four', 'chunks': [
+            {'text': 'one', 'timestamp': [0.0, 2.0]}, {'text': 'four', 'timestamp': [38.0, 40.0]}]}
+        clip = select_reference(self.path, transcription)
+        self.assertTrue(clip.trimmed)
+        self.assertEqual(clip.text, '')
+
+        from unittest import mock
+        from audio_translation_pipeline import AudioTranslationPipeline
+        with mock.patch.dict(os.environ, {'VANGMAYA_REF_MAX_SECONDS': '12'}):
+            pipeline = AudioTranslationPipeline(transcriber=mock.Mock(), translator=mock.Mock(),
+                                                synthesizer=mock.Mock())
+        with mock.patch('audio_translation_pipeline.select_reference', return_value=clip):
+            ref_audio, ref_text = pipeline._select_reference(self.path, transcription, 'one four')
+        self.assertEqual((ref_audio, ref_text), (self.path, 'one four'))
+
+    def test_pipeline_bounds_the_reference(self):
+        """A long input reaches TTS as a trimmed reference, whatever its length."""
+        from unittest import mock
+        from audio_translation_pipeline import AudioTranslationPipeline
+        from benchmark import configure_for_upstream
+        from mock_upstream import MockUpstream
+        from tts_backends import InProcessBackend
+
+        references = []
+
+        def engine(text, ref_audio_path, ref_text):
+            references.append((sf.info(ref_audio_path).duration, ref_text))
+            return np.zeros(24000, dtype=np.float32)
+
+        with mock.patch.dict(os.environ), MockUpstream() as upstream:
+            configure_for_upstream(upstream.base_url)
+            pipeline = AudioTranslationPipeline(tts_backend=InProcessBackend(engine_factory=lambda: engine))
+            pipeline.process(self.path, 'hi', 'ta')
+            pipeline.synthesizer.close()
+
+        duration, ref_text = references[0]
+        self.assertGreaterEqual(duration, 5.0)
+        self.assertLessEqual(duration, 12.0)
+        self.assertTrue(ref_text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from src.request_manager import RequestManager
+from src.transport import DirectTransport, ScraperAPITransport, create_transport
+from translator import TextTranslator
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        payload = json.dumps({
+            "path": self.path,
+            "output": [{"source": body.get("input"), "target": "translated:" + body.get("input", "")}]
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestRequestManagerTransport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _EchoHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_direct_mode_does_not_need_api_key(self):
+        """Direct transport starts without SCRAPER_API_KEY."""
+        with mock.patch.dict(os.environ, {"VANGMAYA_TRANSPORT": "direct"}, clear=True):
+            manager = RequestManager(service="translate")
+        self.assertIsInstance(manager.transport, DirectTransport)
+        self.assertTrue(manager.transport.verify)
+
+    def test_proxy_mode_requires_api_key(self):
+        """Proxy transport still refuses to start without SCRAPER_API_KEY."""
+        with mock.patch.dict(os.environ, {}, clear=True):
+            with self.assertRaises(ValueError):
+                RequestManager()
+
+    def test_per_service_settings(self):
+        """Per-service variables override the global ones."""
+        env = {
+            "SCRAPER_API_KEY": "test",
+            "VANGMAYA_TRANSPORT": "proxy",
+            "VANGMAYA_ASR_TRANSPORT": "direct",
+            "VANGMAYA_ASR_BASE_URL": "http://localhost:9000/",
+        }
+        with mock.patch.dict(os.environ, env, clear=True):
+            self.assertIsInstance(create_transport(service="asr"), DirectTransport)
+            self.assertIsInstance(create_transport(service="translate"), ScraperAPITransport)
+            manager = RequestManager(service="asr")
+        self.assertEqual(manager.url_for('/inference/transcribe'),
+                         "http://localhost:9000/inference/transcribe")
+
+    def test_unknown_transport(self):
+        """Unknown transport names are rejected."""
+        with self.assertRaises(ValueError):
+            create_transport("carrier-pigeon")
+
+    def test_translator_against_local_server(self):
+        """Translator talks to a local server over the direct transport."""
+        translator = TextTranslator(transport=DirectTransport(), base_url=self.base_url)
+        self.assertEqual(translator.API_URL, self.base_url + "/inference/translate")
+        self.assertEqual(translator.translate("hello", target_lang="hi"), "translated:hello")
+
+
+if __name__ == "__main__":
+    unittest.main()
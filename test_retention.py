@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from src.prompt_cache import PromptStore
+from src.retention import RetentionManager, parse_age, parse_size, shard_path
+from benchmark import make_clips
+
+
+class TestRetention(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.outputs = os.path.join(self.workdir, "outputs")
+        self.cache = os.path.join(self.workdir, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def write(self, directory, name, size, age):
+        path = shard_path(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'\0' * size)
+        used = time.time() - age
+        os.utime(path, (used, used))
+        return path
+
+    def test_parsing(self):
+        self.assertEqual(parse_size("2K"), 2048)
+        self.assertEqual(parse_size("1.5mb"), int(1.5 * 1024 ** 2))
+        self.assertEqual(parse_size("100"), 100)
+        self.assertEqual(parse_age("30m"), 1800)
+        self.assertEqual(parse_age("2d"), 172800)
+
+    def test_shards_are_stable(self):
+        """The same name always lands in the same two-hex-digit shard."""
+        path = shard_path("outputs", "job.wav")
+        self.assertEqual(path, shard_path("outputs", "job.wav"))
+        self.assertEqual(len(os.path.basename(os.path.dirname(path))), 2)
+
+    def test_one_budget_across_directories(self):
+        """The least recently used files go first, whichever directory they are in."""
+        oldest = self.write(self.outputs, "a.wav", 400, age=500)
+        older = self.write(self.cache, "b.flac", 400, age=400)
+        recent = self.write(self.outputs, "c.wav", 400, age=300)
+        manager = RetentionManager([self.outputs, self.cache], max_bytes=500, min_age=0)
+
+        stats = manager.sweep()
+
+        self.assertEqual((stats['evicted'], stats['bytes']), (2, 400))
+        self.assertFalse(os.path.exists(oldest) or os.path.exists(older))
+        self.assertTrue(os.path.exists(recent))
+        # Emptied shards are removed, the managed roots are kept
+        self.assertFalse(os.path.exists(os.path.dirname(oldest)))
+        self.assertTrue(os.path.isdir(self.cache))
+
+    def test_age_limit_and_grace_period(self):
+        """Expired files go regardless of budget; fresh files survive even over budget."""
+        expired = self.write(self.outputs, "old.wav", 10, age=7200)
+        fresh = self.write(self.outputs, "new.wav", 1000, age=1)
+        manager = RetentionManager([self.outputs], max_bytes=100, max_age=3600, min_age=60)
+
+        manager.sweep()
+
+        self.assertFalse(os.path.exists(expired))
+        self.assertTrue(os.path.exists(fresh))
+
+    def test_only_evictable_files(self):
+        """Queue databases, journals and in-flight temp files are never touched."""
+        keep = [self.write(self.outputs, name, 100, age=10000)
+                for name in ("queue.sqlite3", "journal.jsonl", "x.wav.123.tmp")]
+        RetentionManager([self.outputs], max_bytes=0, max_age=1, min_age=0).sweep()
+        self.assertTrue(all(os.path.exists(path) for path in keep))
+
+    def test_background_sweeper(self):
+        path = self.write(self.outputs, "a.wav", 100, age=100)
+        manager = RetentionManager([self.outputs], max_age=10, min_age=0).start(interval=0.05)
+        deadline = time.time() + 5
+        while os.path.exists(path) and time.time() < deadline:
+            time.sleep(0.02)
+        manager.stop()
+        self.assertFalse(os.path.exists(path))
+
+    def test_prompt_store_survives_eviction(self):
+        """A prompt evicted by the sweeper is rebuilt on its next use."""
+        clip = make_clips(self.workdir, 1, duration=0.5)[0]
+        with open(clip, 'rb') as f:
+            audio = f.read()
+        store = PromptStore(self.cache)
+        prompt = store.prepare(audio)
+
+        RetentionManager([self.cache], max_bytes=0, min_age=0).sweep()
+        self.assertFalse(os.path.exists(prompt.path))
+
+        self.assertTrue(os.path.exists(store.prepare(audio).path))
+        self.assertEqual(store.misses, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmark import configure_for_upstream, make_clips
+from mock_upstream import MockUpstream
+from src.tracing import (MEMORY_EXPORTER, InMemoryExporter, JsonFileExporter, Tracer,
+                         current_span, format_waterfall)
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.exporter = InMemoryExporter()
+        self.tracer = Tracer([self.exporter])
+
+    def test_nested_spans_inherit_job_id(self):
+        """Child spans share the trace and job ID of their parent."""
+        with self.tracer.start_span('process', job_id='job-1') as parent:
+            with self.tracer.start_span('stage') as child:
+                self.assertIs(current_span(), child)
+            self.assertIs(current_span(), parent)
+        self.assertIsNone(current_span())
+
+        self.assertEqual(child.trace_id, parent.trace_id)
+        self.assertEqual(child.parent_span_id, parent.span_id)
+        self.assertEqual(child.job_id, 'job-1')
+        self.assertEqual([s.name for s in self.exporter.get_spans('job-1')], ['stage', 'process'])
+
+    def test_error_status(self):
+        """Exceptions mark the span as failed and propagate."""
+        with self.assertRaises(ValueError):
+            with self.tracer.start_span('boom'):
+                raise ValueError("bad input")
+        span = self.exporter.get_spans()[0]
+        self.assertEqual(span.status, 'ERROR')
+        self.assertEqual(span.status_message, 'bad input')
+
+    def test_file_exporter_writes_otlp_json(self):
+        """The file exporter writes one OTLP/JSON span per line."""
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'spans.jsonl')
+            tracer = Tracer([JsonFileExporter(path)])
+            with tracer.start_span('process', job_id='job-2', attempt=1):
+                pass
+            with open(path, encoding='utf-8') as f:
+                record = json.loads(f.readline())
+            self.assertEqual(record['name'], 'process')
+            self.assertEqual(len(record['traceId']), 32)
+            self.assertIn({'key': 'job.id', 'value': {'stringValue': 'job-2'}}, record['attributes'])
+            self.assertIn({'key': 'attempt', 'value': {'intValue': '1'}}, record['attributes'])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_waterfall(self):
+        """The waterfall lists spans in start order, indented by depth."""
+        with self.tracer.start_span('process', job_id='job-3'):
+            with self.tracer.start_span('stage.translate'):
+                pass
+        lines = format_waterfall(self.exporter.get_spans('job-3')).splitlines()
+        self.assertTrue(lines[0].endswith('process'))
+        self.assertTrue(lines[1].endswith('  stage.translate'))
+
+
+class TestPipelineTracing(unittest.TestCase):
+    def test_pipeline_job_spans(self):
+        """A pipeline job produces spans for each stage, HTTP attempt and file operation."""
+        workdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        try:
+            with mock.patch.dict(os.environ), MockUpstream() as upstream:
+                configure_for_upstream(upstream.base_url)
+                from audio_translation_pipeline import AudioTranslationPipeline
+                clip = make_clips(workdir, 1, duration=1.0)[0]
+                os.chdir(workdir)
+                result = AudioTranslationPipeline().process(clip, 'hi', 'ta', job_id='traced-job',
+                                                            output_dir='outputs')
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.assertEqual(result['job_id'], 'traced-job')
+        names = [s.name for s in MEMORY_EXPORTER.get_spans('traced-job')]
+        for expected in ('pipeline.process', 'stage.transcribe', 'stage.translate', 'stage.synthesize',
+                         'audio.base64_encode', 'file.write'):
+            self.assertIn(expected, names)
+        self.assertEqual(names.count('http.attempt'), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
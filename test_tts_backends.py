@@ -0,0 +1,253 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import soundfile as sf
+
+from benchmark import configure_for_upstream, make_clips
+from mock_upstream import MockUpstream
+from text_to_speech import TextToSpeech
+from tts_backends import EndpointBackend, HostedSpaceBackend, InProcessBackend, create_backend
+
+
+class FakeStatus:
+    def __init__(self, rank, eta):
+        self.code = type('Code', (), {'name': 'IN_QUEUE'})()
+        self.rank = rank
+        self.queue_size = 10
+        self.eta = eta
+
+
+class FakeJob:
+    """Stands in for a gradio_client Job: finishes when release() is called."""
+
+    def __init__(self, output_path, rank):
+        self.output_path = output_path
+        self.rank = rank
+        self.released = threading.Event()
+
+    def status(self):
+        return FakeStatus(self.rank, self.rank * 1.5)
+
+    def done(self):
+        return self.released.is_set()
+
+    def result(self, timeout=None):
+        # Never wait forever: a job nobody releases fails the test instead
+        if not self.released.wait(5 if timeout is None else timeout):
+            raise TimeoutError("job was never released")
+        return self.output_path
+
+    def release(self):
+        self.released.set()
+
+
+class FakeClient:
+    def __init__(self, directory, auto_release=False):
+        self.directory = directory
+        self.auto_release = auto_release
+        self.jobs = []
+
+    def submit(self, text, ref_audio, ref_text, api_name):
+        path = os.path.join(self.directory, f"space_{id(self)}_{len(self.jobs)}.wav")
+        sf.write(path, np.zeros(2400, dtype=np.float32), 24000)
+        job = FakeJob(path, rank=len(self.jobs))
+        if self.auto_release:
+            job.release()
+        self.jobs.append(job)
+        return job
+
+
+class StubEngine:
+    """Tiny engine with the IndicF5 call signature: one second of tone per 10 characters."""
+
+    def __init__(self):
+        self.threads = set()
+
+    def __call__(self, text, ref_audio_path, ref_text):
+        self.threads.add(threading.current_thread().name)
+        samples = 24000 * max(1, len(text) // 10)
+        return (np.sin(np.arange(samples) / 10.0) * 8000).astype(np.int16)
+
+
+class TestBackendSelection(unittest.TestCase):
+    def test_default_is_hosted_space(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertIsInstance(create_backend(), HostedSpaceBackend)
+
+    def test_endpoint_url_selects_endpoint(self):
+        env = {"VANGMAYA_TTS_BASE_URL": "http://localhost:9000", "VANGMAYA_TRANSPORT": "direct"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            backend = create_backend()
+        self.assertIsInstance(backend, EndpointBackend)
+        self.assertEqual(backend.endpoint_url, "http://localhost:9000")
+
+    def test_named_backend(self):
+        with mock.patch.dict(os.environ, {"VANGMAYA_TTS_BACKEND": "local"}, clear=True):
+            self.assertIsInstance(create_backend(), InProcessBackend)
+        with self.assertRaises(ValueError):
+            create_backend("carrier-pigeon")
+
+
+class TestHostedSpaceJobs(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.ref_audio = os.path.join(self.directory, 'ref.wav')
+        sf.write(self.ref_audio, np.zeros(16000, dtype=np.float32), 16000)
+        self.clients = []
+        self.auto_release = False
+
+        def factory(space):
+            self.clients.append(FakeClient(self.directory, auto_release=self.auto_release))
+            return self.clients[-1]
+
+        self.backend = HostedSpaceBackend(pool_size=2, client_factory=factory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_jobs_are_submitted_without_blocking(self):
+        """Many jobs can be queued at once across the client pool."""
+        tts = TextToSpeech(backend=self.backend)
+        jobs = [tts.submit_speech(f"text {i}", self.ref_audio, "ref") for i in range(5)]
+
+        self.assertEqual(len(self.clients), 2)
+        self.assertEqual([len(c.jobs) for c in self.clients], [3, 2])
+        self.assertFalse(any(job.done() for job in jobs))
+        # Round-robin puts the fifth job third in line on the first client
+        status = jobs[4].status()
+        self.assertEqual(status['code'], 'IN_QUEUE')
+        self.assertEqual(status['queue_position'], 2)
+        self.assertEqual(jobs[4].eta, 3.0)
+
+        for client in self.clients:
+            for job in client.jobs:
+                job.release()
+        output = Path(self.directory, "out.wav")
+        jobs[0].save(output, timeout=5)
+        self.assertTrue(output.exists())
+        self.assertFalse(os.path.exists(self.clients[0].jobs[0].output_path))
+
+    def test_blocking_generate_speech(self):
+        """generate_speech still works on top of the job API."""
+        self.auto_release = True
+        tts = TextToSpeech(backend=self.backend)
+        result = tts.generate_speech("text", self.ref_audio, "ref", os.path.join(self.directory, "o.wav"))
+        self.assertTrue(os.path.exists(result['file_path']))
+
+    def test_submitted_jobs_are_recorded_and_replayed(self):
+        """submit_speech goes through the same record/replay store as generate_speech."""
+        self.auto_release = True
+        cache_dir = os.path.join(self.directory, 'cache')
+        env = {'VANGMAYA_HTTP_CACHE_DIR': cache_dir, 'VANGMAYA_HTTP_CACHE_MODE': 'record'}
+        with mock.patch.dict(os.environ, env):
+            tts = TextToSpeech(backend=self.backend)
+            recorded = tts.submit_speech("text", self.ref_audio, "ref").save(Path(self.directory, "rec.wav"))
+
+            os.environ['VANGMAYA_HTTP_CACHE_MODE'] = 'replay'
+            tts = TextToSpeech(backend=self.backend)
+            job = tts.submit_speech("text", self.ref_audio, "ref")
+            self.assertTrue(job.done())
+            replayed = job.save(Path(self.directory, "rep.wav"))
+            self.assertEqual(Path(replayed['file_path']).read_bytes(), Path(recorded['file_path']).read_bytes())
+            self.assertEqual(sum(len(c.jobs) for c in self.clients), 1)
+
+    def test_submit_needs_job_api(self):
+        """Backends without a job API reject submit_speech."""
+        tts = TextToSpeech(backend=InProcessBackend(engine_factory=StubEngine))
+        with self.assertRaises(NotImplementedError):
+            tts.submit_speech("text", self.ref_audio, "ref")
+        tts.close()
+
+
+class TestInProcessBackend(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.ref_audio = os.path.join(self.directory, 'ref.wav')
+        sf.write(self.ref_audio, np.zeros(16000, dtype=np.float32), 16000)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_engine_loaded_once_on_worker_thread(self):
+        """The engine loads once and every call runs on the worker thread."""
+        loads = []
+        engine = StubEngine()
+
+        def factory():
+            loads.append(threading.current_thread().name)
+            return engine
+
+        tts = TextToSpeech(backend=InProcessBackend(engine_factory=factory))
+        try:
+            for i in range(3):
+                result = tts.generate_speech("नमस्ते दुनिया, कैसे हो?", self.ref_audio, "ref",
+                                             output_path=os.path.join(self.directory, f"out{i}.wav"))
+        finally:
+            tts.close()
+
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(len(engine.threads), 1)
+        self.assertTrue(next(iter(engine.threads)).startswith('tts-engine'))
+        info = sf.info(result['file_path'])
+        self.assertEqual(info.samplerate, 24000)
+        self.assertAlmostEqual(info.duration, 2.0)
+
+    def test_inference_spans_join_the_job_trace(self):
+        """Spans from the worker thread belong to the caller's job, and no proxy key is needed."""
+        from src.tracing import MEMORY_EXPORTER, span
+        with mock.patch.dict(os.environ, {}, clear=True):
+            tts = TextToSpeech(backend=InProcessBackend(engine_factory=StubEngine))
+            try:
+                with span('pipeline.process', job_id='tts-local-job') as parent:
+                    tts.generate_speech("text", self.ref_audio, "ref", os.path.join(self.directory, "t.wav"))
+            finally:
+                tts.close()
+
+        spans = {s.name: s for s in MEMORY_EXPORTER.get_spans('tts-local-job')}
+        self.assertIn('tts.inference', spans)
+        self.assertIn('tts.engine_load', spans)
+        self.assertEqual(spans['tts.inference'].trace_id, parent.trace_id)
+
+    def test_engine_errors_surface(self):
+        """Engine failures are reported as TTS errors."""
+        def broken(text, ref_audio_path, ref_text):
+            raise ValueError("out of memory")
+
+        tts = TextToSpeech(backend=InProcessBackend(engine_factory=lambda: broken))
+        try:
+            with self.assertRaises(RuntimeError) as context:
+                tts.generate_speech("text", self.ref_audio, "ref", os.path.join(self.directory, "x.wav"))
+        finally:
+            tts.close()
+        self.assertIn("out of memory", str(context.exception))
+
+    def test_pipeline_with_local_backend(self):
+        """The pipeline synthesizes in-process while ASR and translation hit the mock upstream."""
+        from audio_translation_pipeline import AudioTranslationPipeline
+        clip = make_clips(self.directory, 1, duration=1.0)[0]
+        cwd = os.getcwd()
+        try:
+            with mock.patch.dict(os.environ), MockUpstream() as upstream:
+                configure_for_upstream(upstream.base_url)
+                del os.environ['VANGMAYA_TTS_BASE_URL']
+                os.chdir(self.directory)
+                pipeline = AudioTranslationPipeline(tts_backend=InProcessBackend(engine_factory=StubEngine))
+                result = pipeline.process(clip, 'hi', 'ta')
+        finally:
+            os.chdir(cwd)
+
+        self.assertEqual(upstream.request_counts['synthesize'], 0)
+        self.assertGreater(result['audio'].duration, 0)
+        # Nothing is written unless the caller asks for it
+        self.assertIsNone(result['audio_path'])
+        self.assertFalse(Path(self.directory, 'outputs').exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
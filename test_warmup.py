@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+from benchmark import configure_for_upstream
+from mock_upstream import MockUpstream
+from src.metrics import MetricsRegistry, start_metrics_server
+from src.request_manager import RequestManager
+from src.transport import DirectTransport
+from src.warmup import Readiness
+from tts_backends import HostedSpaceBackend
+
+
+class TestReadiness(unittest.TestCase):
+    def test_ready_once_every_check_passes(self):
+        """A failing check is retried; readiness waits for all of them."""
+        calls = {'flaky': 0}
+        release = threading.Event()
+
+        def flaky():
+            calls['flaky'] += 1
+            if calls['flaky'] < 3:
+                raise ConnectionError("refused")
+
+        readiness = Readiness({'flaky': flaky, 'slow': lambda: release.wait(5)},
+                              retry_interval=0.01).start()
+        self.assertFalse(readiness.wait(0.2))
+        self.assertTrue(readiness.status()['components']['flaky']['ready'])
+        self.assertFalse(readiness.status()['components']['slow']['ready'])
+
+        release.set()
+        self.assertTrue(readiness.wait(5))
+        self.assertEqual(readiness.status()['components']['flaky']['attempts'], 3)
+
+    def test_no_checks_is_ready(self):
+        self.assertTrue(Readiness({}).start().ready)
+
+    def test_ready_endpoint(self):
+        """The metrics server answers /ready with 503 until warm-up is done."""
+        release = threading.Event()
+        readiness = Readiness({'tts': lambda: release.wait(5)}).start()
+        server = start_metrics_server(0, host='127.0.0.1', registry=MetricsRegistry(), readiness=readiness)
+        url = f"http://127.0.0.1:{server.server_address[1]}/ready"
+        try:
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                urllib.request.urlopen(url)
+            self.assertEqual(raised.exception.code, 503)
+
+            release.set()
+            readiness.wait(5)
+            with urllib.request.urlopen(url) as response:
+                self.assertTrue(json.load(response)['ready'])
+        finally:
+            server.shutdown()
+
+
+class TestComponentWarmUp(unittest.TestCase):
+    def setUp(self):
+        self.env = mock.patch.dict(os.environ)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+
+    def test_probe(self):
+        """Probes report the status of a reachable upstream and raise for an unreachable one."""
+        with MockUpstream() as upstream:
+            manager = RequestManager(transport=DirectTransport(), base_url=upstream.base_url)
+            self.assertEqual(manager.probe('/health'), 200)
+            self.assertEqual(manager.probe('/'), 404)
+        # Nothing listens there any more
+        stale = RequestManager(transport=DirectTransport(), base_url=upstream.base_url)
+        with self.assertRaises(Exception):
+            stale.probe('/health', timeout=1)
+
+    def test_space_pool_is_filled(self):
+        """Warming the hosted space builds every pooled client up front."""
+        built = []
+        backend = HostedSpaceBackend(pool_size=3, client_factory=lambda space: built.append(space) or mock.Mock())
+        backend.warm_up()
+        backend.warm_up()
+        self.assertEqual(len(built), 3)
+        self.assertEqual(len(backend._clients), 3)
+
+    def test_pipeline_checks(self):
+        """Every stage of a configured pipeline warms up against the mock upstream."""
+        with MockUpstream() as upstream:
+            configure_for_upstream(upstream.base_url)
+            from audio_translation_pipeline import AudioTranslationPipeline
+            readiness = Readiness(AudioTranslationPipeline().warm_up_checks()).start()
+            self.assertTrue(readiness.wait(10), readiness.status())
+        self.assertEqual(set(readiness.status()['components']), {'asr', 'translate', 'tts'})
+        self.assertEqual(sum(upstream.request_counts.values()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
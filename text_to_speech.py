@@ -1,18 +1,130 @@
 import logging
 import os
-import base64
-import shutil
-from pathlib import Path
-from gradio_client import Client, handle_file
+import tempfile
+from typing import Any, Dict, Optional, Union
+from src.audio import LOSSY_FORMATS, AudioBuffer
+from src.cache import file_digest, shared_cache
+from src.http_cache import RecordReplayStore, ReplayMissError, fingerprint, get_cache_mode
 from src.request_manager import RequestManager
+from src.transport import UPSTREAM_ERRORS, UpstreamError
+from tts_backends import TTSBackend, create_backend
 
 logger = logging.getLogger(__name__)
 
 class TextToSpeech:
-    def __init__(self):
-        """Initialize text to speech converter using Hugging Face hosted Gradio space."""
-        self._client = None
-        self.request_manager = RequestManager()
+    def __init__(self, endpoint_url: Optional[str] = None, backend: Optional[TTSBackend] = None):
+        """
+        Initialize text to speech converter.
+
+        Args:
+            endpoint_url: Self-hosted endpoint to post to (see EndpointBackend)
+            backend: Synthesis backend; defaults to the one named by
+                VANGMAYA_TTS_BACKEND ("space", "endpoint" or "local"), the
+                endpoint if a URL is configured, or the hosted Gradio space
+        """
+        self.backend = backend or create_backend(endpoint_url=endpoint_url)
+        # Only needed to download URL references; built on first use so
+        # backends that never touch the network do not need a proxy key
+        self._request_manager = None
+        # HTTP backends are recorded by their request manager; the rest are recorded here
+        self.cache_mode = get_cache_mode()
+        self.recordings = None
+        if self.cache_mode != 'off' and not self.backend.recorded_by_transport:
+            self.recordings = RecordReplayStore()
+        # Synthesized audio shared across instances when VANGMAYA_CACHE is set
+        self.cache = shared_cache()
+
+    @property
+    def request_manager(self) -> RequestManager:
+        if self._request_manager is None:
+            self._request_manager = RequestManager(service="tts")
+        return self._request_manager
+
+    def _cache_parts(self, text: str, ref_file: str, ref_text: str) -> tuple:
+        """What a synthesis depends on: the deployment, the texts and the reference audio content."""
+        return (self.backend.identity, text, ref_text, file_digest(ref_file))
+
+    def _recording_key(self, text: str, ref_file: str, ref_text: str) -> str:
+        """
+        Fingerprint a synthesis by its inputs and the reference audio content.
+
+        Keyed by engine rather than deployment, so recordings replay against
+        any endpoint URL.
+        """
+        return fingerprint('tts', self.backend.name, getattr(self.backend, 'space', ''),
+                           text, ref_text, file_digest(ref_file))
+
+    def _cached(self, cache_parts: tuple) -> Optional[AudioBuffer]:
+        value, payload = self.cache.get('synthesis', *cache_parts)
+        if payload is None:
+            return None
+        logger.info("Using cached synthesis")
+        return AudioBuffer.from_bytes(payload, value['format'])
+
+    def _store(self, cache_parts: tuple, audio: AudioBuffer) -> None:
+        # Lossless audio is cached as FLAC; lossy audio as it came
+        audio_format = audio.format if audio.format in LOSSY_FORMATS else 'flac'
+        self.cache.set('synthesis', {'format': audio_format}, *cache_parts, payload=audio.to_bytes(audio_format))
+
+    def _fetch_reference(self, ref_audio_path: Union[str, AudioBuffer]):
+        """Get a local reference file, downloading URLs to a temp file; returns (path, temp_path)."""
+        if isinstance(ref_audio_path, AudioBuffer):
+            # Backends take a file, so an in-memory reference is spilled to a temp WAV
+            handle, temp_ref = tempfile.mkstemp(suffix='.wav')
+            with os.fdopen(handle, 'wb') as f:
+                f.write(ref_audio_path.to_bytes('wav'))
+            return temp_ref, temp_ref
+        # Handle reference audio file through ScraperAPI if it's a URL
+        if not ref_audio_path.startswith(('http://', 'https://')):
+            return ref_audio_path, None
+        logger.info("Downloading reference audio through ScraperAPI...")
+        response = self.request_manager.get(ref_audio_path)
+        response.raise_for_status()
+        handle, temp_ref = tempfile.mkstemp(suffix='.wav')
+        with os.fdopen(handle, 'wb') as f:
+            f.write(response.content)
+        return temp_ref, temp_ref
+
+    @staticmethod
+    def _remove_temp(temp_ref: Optional[str]) -> None:
+        # Clean up temp file if we created one
+        if temp_ref is not None:
+            try:
+                os.remove(temp_ref)
+            except:
+                pass
+
+    @staticmethod
+    def _tts_error(e: Exception) -> RuntimeError:
+        # Upstream failures stay UpstreamError so callers can tell them from our own bugs
+        error_type = UpstreamError if isinstance(e, UPSTREAM_ERRORS) else RuntimeError
+        error_msg = str(e)
+        if "Proxy Authentication Required" in error_msg:
+            return error_type("ScraperAPI authentication failed. Check your SCRAPER_API_KEY environment variable.")
+        elif "Connection refused" in error_msg:
+            return error_type("Failed to connect. Check your network connection.")
+        else:
+            return error_type(f"TTS generation failed: {error_msg}")
+
+    def _replayed(self, recording_key: str) -> AudioBuffer:
+        entry = self.recordings.get(recording_key)
+        if entry is None:
+            raise ReplayMissError(f"No recording for TTS request ({recording_key[:12]})")
+        return AudioBuffer.from_bytes(entry[1], entry[0].get('format', 'wav'))
+
+    def _record(self, recording_key: str, audio: AudioBuffer) -> None:
+        # Lossless audio is kept as FLAC, about half the size of the WAV
+        audio_format = audio.format if audio.format in LOSSY_FORMATS else 'flac'
+        self.recordings.put(recording_key, {'kind': 'tts', 'backend': self.backend.name, 'format': audio_format},
+                            audio.to_bytes(audio_format))
+
+    @staticmethod
+    def _result(audio: AudioBuffer, output_path: Optional[str]) -> dict:
+        file_path = None
+        if output_path is not None:
+            file_path = audio.save(str(output_path))
+            logger.info(f"Audio saved to: {file_path}")
+        return {'audio': audio, 'file_path': file_path}
 
     def generate_speech(self, text: str, ref_audio_path: str, ref_text: str, output_path: str = None) -> dict:
         """
@@ -20,75 +132,161 @@ class TextToSpeech:
 
         Args:
             text: Text to convert to speech (translated text)
-            ref_audio_path: Path to reference audio file
+            ref_audio_path: Path (or URL) of reference audio file, or the
+                reference itself as an AudioBuffer
             ref_text: Text from reference audio (transcribed text)
-            output_path: Optional path to save the output audio file
+            output_path: Optional path to also save the audio to
 
         Returns:
             Dictionary containing:
-                - file_path: Path to saved audio file
+                - audio: The generated AudioBuffer
+                - file_path: Path to saved audio file (None unless output_path was given)
+        """
+        temp_ref = None
+        try:
+            logger.info(f"Generating speech with the {self.backend.name} backend...")
+            ref_file, temp_ref = self._fetch_reference(ref_audio_path)
+
+            if self.recordings is not None:
+                recording_key = self._recording_key(text, ref_file, ref_text)
+            if self.recordings is not None and self.cache_mode == 'replay':
+                logger.info("Replaying recorded audio")
+                return self._result(self._replayed(recording_key), output_path)
+
+            cache_parts = None
+            if self.cache is not None:
+                cache_parts = self._cache_parts(text, ref_file, ref_text)
+                cached = self._cached(cache_parts)
+                if cached is not None:
+                    return self._result(cached, output_path)
+
+            audio = self.backend.synthesize(text, ref_file, ref_text)
+
+            if self.recordings is not None and self.cache_mode == 'record':
+                self._record(recording_key, audio)
+            if cache_parts is not None:
+                self._store(cache_parts, audio)
+            return self._result(audio, output_path)
+
+        except ReplayMissError:
+            # A missing recording is not a TTS failure; let callers fail fast
+            raise
+        except Exception as e:
+            raise self._tts_error(e)
+        finally:
+            self._remove_temp(temp_ref)
+
+    def submit_speech(self, text: str, ref_audio_path: str, ref_text: str) -> 'SpeechJob':
         """
-        if output_path is None:
-            output_path = "output.wav"
+        Queue a synthesis without blocking.
 
+        Takes the same inputs as generate_speech and goes through the same
+        reference download and record/replay handling. Only backends with a
+        job API (the hosted space) support it; in replay mode no backend
+        call is made. Call audio() or save(output_path) on the returned job
+        to wait for the result.
+        """
+        temp_ref = None
         try:
-            logger.info("Generating speech...")
-            
-            # Initialize HF space client
-            if self._client is None:
-                self._client = Client("ai4bharat/IndicF5")
-
-            # Handle reference audio file through ScraperAPI if it's a URL
-            if ref_audio_path.startswith(('http://', 'https://')):
-                logger.info("Downloading reference audio through ScraperAPI...")
-                with Path("temp_ref.wav").open("wb") as f:
-                    response = self.request_manager.session.get(ref_audio_path)
-                    response.raise_for_status()
-                    f.write(response.content)
-                ref_file = "temp_ref.wav"
-            else:
-                ref_file = ref_audio_path
+            ref_file, temp_ref = self._fetch_reference(ref_audio_path)
+            recording_key = None
+            if self.recordings is not None:
+                recording_key = self._recording_key(text, ref_file, ref_text)
+                if self.cache_mode == 'replay':
+                    replayed = self._replayed(recording_key)
+                    self._remove_temp(temp_ref)
+                    return SpeechJob(self, replayed=replayed)
+            cache_parts = None
+            if self.cache is not None:
+                cache_parts = self._cache_parts(text, ref_file, ref_text)
+                cached = self._cached(cache_parts)
+                if cached is not None:
+                    self._remove_temp(temp_ref)
+                    return SpeechJob(self, replayed=cached)
+            job = self.backend.submit(text, ref_file, ref_text)
+        except NotImplementedError:
+            self._remove_temp(temp_ref)
+            raise NotImplementedError(f"The {self.backend.name} backend has no job API")
+        except ReplayMissError:
+            self._remove_temp(temp_ref)
+            raise
+        except Exception as e:
+            self._remove_temp(temp_ref)
+            raise self._tts_error(e)
+        return SpeechJob(self, job=job, recording_key=recording_key, temp_ref=temp_ref, cache_parts=cache_parts)
+
+    def warm_up(self) -> None:
+        """Get the backend ready to synthesize (clients built, model loaded or endpoint probed)."""
+        self.backend.warm_up()
+
+    def close(self) -> None:
+        """Release the backend."""
+        self.backend.close()
+        if self._request_manager is not None:
+            self._request_manager.close()
 
-            try:
-                # Make prediction using reference audio
-                result = self._client.predict(
-                    text=text,                    # Translated text
-                    ref_audio=handle_file(ref_file),  # Input audio
-                    ref_text=ref_text,            # Transcribed text
-                    api_name="/synthesize_speech"
-                )
-            finally:
-                # Clean up temp file if we created one
-                if ref_audio_path.startswith(('http://', 'https://')):
-                    try:
-                        os.remove("temp_ref.wav")
-                    except:
-                        pass
-
-            # Save result to output path
-            output_path = Path(output_path)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            if isinstance(result, str) and os.path.exists(result):
-                # Copy the file first, then remove original to work across drives
-                shutil.copy2(result, str(output_path))
-                try:
-                    os.remove(result)  # Clean up the temp file
-                except:
-                    pass  # Ignore cleanup errors
-                logger.info(f"Audio saved to: {output_path}")
-                return {'file_path': str(output_path)}
-            else:
-                raise Exception("Failed to get valid output from TTS service")
 
+class SpeechJob:
+    """
+    A synthesis queued by TextToSpeech.submit_speech.
+
+    status() reports the backend job's state, queue position and ETA;
+    audio() waits for the result and records it when recording.
+    """
+
+    def __init__(self, tts: TextToSpeech, job=None, recording_key: Optional[str] = None,
+                 temp_ref: Optional[str] = None, replayed: Optional[AudioBuffer] = None,
+                 cache_parts: Optional[tuple] = None):
+        self._tts = tts
+        self._cache_parts = cache_parts
+        self._job = job
+        self._recording_key = recording_key
+        self._temp_ref = temp_ref
+        self._audio = replayed
+
+    def status(self) -> Dict[str, Any]:
+        if self._job is None:
+            return {'code': 'FINISHED', 'queue_position': None, 'queue_size': None, 'eta': 0.0, 'elapsed': 0.0}
+        return self._job.status()
+
+    @property
+    def queue_position(self) -> Optional[int]:
+        return self.status()['queue_position']
+
+    @property
+    def eta(self) -> Optional[float]:
+        return self.status()['eta']
+
+    def done(self) -> bool:
+        return self._job is None or self._job.done()
+
+    def cancel(self) -> bool:
+        cancelled = self._job is not None and self._job.cancel()
+        if cancelled:
+            TextToSpeech._remove_temp(self._temp_ref)
+        return cancelled
+
+    def audio(self, timeout: Optional[float] = None) -> AudioBuffer:
+        """Wait for the synthesized audio."""
+        if self._audio is not None:
+            return self._audio
+        try:
+            self._audio = self._job.audio(timeout)
+            if self._recording_key is not None and self._tts.cache_mode == 'record':
+                self._tts._record(self._recording_key, self._audio)
+            if self._cache_parts is not None:
+                self._tts._store(self._cache_parts, self._audio)
+            return self._audio
         except Exception as e:
-            error_msg = str(e)
-            if "Proxy Authentication Required" in error_msg:
-                raise RuntimeError("ScraperAPI authentication failed. Check your SCRAPER_API_KEY environment variable.")
-            elif "Connection refused" in error_msg:
-                raise RuntimeError("Failed to connect. Check your network connection.")
-            else:
-                raise RuntimeError(f"TTS generation failed: {error_msg}")
+            raise self._tts._tts_error(e)
+        finally:
+            TextToSpeech._remove_temp(self._temp_ref)
+            self._temp_ref = None
+
+    def save(self, output_path: str, timeout: Optional[float] = None) -> dict:
+        """Wait for the audio and save it; returns a dict like generate_speech."""
+        return TextToSpeech._result(self.audio(timeout), output_path)
+
 
 if __name__ == "__main__":
     # Configure logging
@@ -1,6 +1,9 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import requests
+from src.cache import shared_cache
+from src.hedging import Hedger, hedger_from_env
 from src.request_manager import RequestManager
+from src.transport import Transport, UpstreamError
 
 class TextTranslator:
     SUPPORTED_LANGUAGES = {
@@ -29,11 +32,45 @@ class TextTranslator:
         "en": "English"
     }
     
-    def __init__(self):
-        """Initialize the translator with request manager."""
-        self.API_URL = 'https://admin.models.ai4bharat.org/inference/translate'
-        self.request_manager = RequestManager(timeout=15)  # Shorter timeout for translation
+    def __init__(
+        self,
+        transport: Optional[Transport] = None,
+        base_url: Optional[str] = None,
+        hedge_percent: Optional[float] = None
+    ):
+        """
+        Initialize the translator with request manager.
+
+        Args:
+            transport: Transport for the translation requests (see src/transport.py)
+            base_url: Translation server base URL
+            hedge_percent: Extra upstream load, in percent, that hedging slow
+                requests may add; defaults to VANGMAYA_TRANSLATE_HEDGE_PERCENT,
+                and 0 turns hedging off
+        """
+        if hedge_percent is None:
+            hedger = hedger_from_env("translate")
+        else:
+            hedger = Hedger(budget=hedge_percent / 100, service="translate") if hedge_percent > 0 else None
+        self.request_manager = RequestManager(
+            timeout=15,  # Shorter timeout for translation
+            service="translate",
+            transport=transport,
+            base_url=base_url,
+            hedger=hedger
+        )
+        self.API_URL = self.request_manager.url_for('/inference/translate')
+        # Translations shared across instances when VANGMAYA_CACHE is set
+        self.cache = shared_cache()
     
+    def _cache_parts(self, text: str, source_lang: str, target_lang: str) -> tuple:
+        """What a translation depends on: the upstream it came from and its inputs."""
+        return (self.API_URL, text, source_lang, target_lang)
+
+    def warm_up(self) -> None:
+        """Open a pooled connection to the translation upstream and check it answers."""
+        self.request_manager.probe()
+
     def is_language_supported(self, language_code: str) -> bool:
         """Check if the language code is supported."""
         return language_code in self.SUPPORTED_LANGUAGES
@@ -59,6 +96,11 @@ class TextTranslator:
         if not self.is_language_supported(source_lang):
             raise ValueError(f"Source language {source_lang} is not supported")
 
+        if self.cache is not None:
+            cached, _ = self.cache.get('translation', *self._cache_parts(text, source_lang, target_lang))
+            if cached is not None:
+                return cached
+
         try:
             payload = {
                 "sourceLanguage": source_lang,
@@ -86,13 +128,16 @@ class TextTranslator:
             result = response.json()
             
             if 'output' in result and isinstance(result['output'], list) and len(result['output']) > 0:
-                return result['output'][0].get('target', '')
-            raise Exception("Unexpected response format")
+                translated = result['output'][0].get('target', '')
+                if self.cache is not None:
+                    self.cache.set('translation', translated, *self._cache_parts(text, source_lang, target_lang))
+                return translated
+            raise UpstreamError("Unexpected response format")
 
         except requests.exceptions.RequestException as e:
             if hasattr(e.response, 'text'):
-                raise Exception(f"API Error: {e.response.status_code} - {e.response.text}")
-            raise Exception(f"Translation failed: {str(e)}")
+                raise UpstreamError(f"API Error: {e.response.status_code} - {e.response.text}")
+            raise UpstreamError(f"Translation failed: {str(e)}")
     
     def get_supported_languages(self) -> Dict[str, str]:
         """Get dictionary of supported languages."""
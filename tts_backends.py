@@ -0,0 +1,338 @@
+import base64
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from src.audio import AudioBuffer, format_for_content_type
+from src.request_manager import RequestManager
+from src.tracing import span
+from src.transport import UpstreamError, get_base_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPACE = "ai4bharat/IndicF5"
+
+
+class TTSBackend:
+    """Interface for speech synthesis engines used by TextToSpeech."""
+
+    name = "base"
+    # True when every call goes through a RequestManager, which already
+    # handles record/replay; TextToSpeech records the other backends itself
+    recorded_by_transport = False
+
+    @property
+    def identity(self) -> str:
+        """Which deployment this backend synthesizes with, for cache keys."""
+        return self.name
+
+    def synthesize(self, text: str, ref_audio_path: str, ref_text: str) -> AudioBuffer:
+        """Synthesize text in the voice of the reference audio."""
+        raise NotImplementedError
+
+    def submit(self, text: str, ref_audio_path: str, ref_text: str) -> "SpaceJob":
+        """
+        Queue a synthesis and return a job without waiting for it.
+
+        Backends without a job API raise NotImplementedError.
+        """
+        raise NotImplementedError
+
+    def warm_up(self) -> None:
+        """Do the one-off setup the first synthesis would otherwise pay for."""
+        pass
+
+    def close(self) -> None:
+        """Release clients, threads or models held by the backend."""
+        pass
+
+
+class SpaceJob:
+    """
+    A synthesis submitted to the hosted space without blocking.
+
+    Wraps a gradio_client Job so callers can poll queue position and ETA
+    while many jobs run at once, then collect the audio when it is ready.
+    """
+
+    def __init__(self, job, space: str, text_chars: int):
+        self._job = job
+        self.space = space
+        self.text_chars = text_chars
+        self.submitted_at = time.perf_counter()
+
+    def status(self) -> Dict[str, Any]:
+        """Get the job state, queue position (0 = running next) and ETA in seconds."""
+        update = self._job.status()
+        code = getattr(update.code, 'name', str(update.code))
+        return {
+            'code': code,
+            'queue_position': update.rank,
+            'queue_size': update.queue_size,
+            'eta': update.eta,
+            'elapsed': time.perf_counter() - self.submitted_at,
+        }
+
+    @property
+    def queue_position(self) -> Optional[int]:
+        return self._job.status().rank
+
+    @property
+    def eta(self) -> Optional[float]:
+        return self._job.status().eta
+
+    def done(self) -> bool:
+        return self._job.done()
+
+    def cancel(self) -> bool:
+        return self._job.cancel()
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        """Wait for the space and return the path of its temporary output file."""
+        with span('tts.predict', **{'tts.space': self.space, 'tts.text_chars': self.text_chars}):
+            try:
+                result = self._job.result(timeout=timeout)
+            except Exception as e:
+                # AppError, QueueError and timeouts all mean the space failed us
+                raise UpstreamError(f"TTS space {self.space} failed: {str(e)}") from e
+        if not (isinstance(result, str) and os.path.exists(result)):
+            raise UpstreamError("Failed to get valid output from TTS service")
+        return result
+
+    def audio(self, timeout: Optional[float] = None) -> AudioBuffer:
+        """Wait for the result and read it into memory, removing gradio_client's download."""
+        result = self.result(timeout)
+        with span('file.read', **{'file.path': result}):
+            audio = AudioBuffer.from_file(result)
+        try:
+            os.remove(result)  # Clean up the temp file
+        except:
+            pass  # Ignore cleanup errors
+        return audio
+
+    def save(self, output_path: Path, timeout: Optional[float] = None) -> None:
+        """Wait for the result and write it to output_path."""
+        self.audio(timeout).save(str(output_path))
+
+
+class HostedSpaceBackend(TTSBackend):
+    """
+    The public IndicF5 Gradio space on Hugging Face.
+
+    Jobs are submitted through the non-blocking gradio_client job API over
+    a small pool of clients used round-robin, so one process can keep many
+    syntheses in the space queue at once.
+    """
+
+    name = "space"
+
+    def __init__(
+        self,
+        space: str = DEFAULT_SPACE,
+        pool_size: Optional[int] = None,
+        client_factory: Optional[Callable[[str], Any]] = None
+    ):
+        self.space = space
+        self.pool_size = pool_size or int(os.getenv('VANGMAYA_TTS_CLIENT_POOL', '2'))
+        self.client_factory = client_factory or self._default_client_factory
+        self._clients = []
+        self._next_client = 0
+        self._client_lock = threading.Lock()
+
+    @property
+    def identity(self) -> str:
+        return f"{self.name}:{self.space}"
+
+    @staticmethod
+    def _default_client_factory(space: str):
+        from gradio_client import Client
+        return Client(space, verbose=False)
+
+    def _get_client(self):
+        # Building a client fetches the space config, so clients are created
+        # lazily, once, and then shared round-robin
+        with self._client_lock:
+            if len(self._clients) < self.pool_size:
+                self._clients.append(self.client_factory(self.space))
+                return self._clients[-1]
+            client = self._clients[self._next_client % len(self._clients)]
+            self._next_client += 1
+            return client
+
+    def warm_up(self) -> None:
+        """Build the whole client pool at once; each client fetches the space config."""
+        with self._client_lock:
+            missing = self.pool_size - len(self._clients)
+        if missing <= 0:
+            return
+        with ThreadPoolExecutor(max_workers=missing, thread_name_prefix='tts-warmup') as executor:
+            clients = list(executor.map(self.client_factory, [self.space] * missing))
+        with self._client_lock:
+            room = max(0, self.pool_size - len(self._clients))
+            self._clients.extend(clients[:room])
+        for client in clients[room:]:
+            client.close()
+
+    def submit(self, text: str, ref_audio_path: str, ref_text: str) -> SpaceJob:
+        """Queue a synthesis on the space and return immediately."""
+        from gradio_client import handle_file
+
+        ref_audio = handle_file(ref_audio_path)
+        try:
+            job = self._get_client().submit(
+                text=text,                    # Translated text
+                ref_audio=ref_audio,          # Input audio
+                ref_text=ref_text,            # Transcribed text
+                api_name="/synthesize_speech"
+            )
+        except Exception as e:
+            # Building a client fetches the space config, so an unreachable space fails here
+            raise UpstreamError(f"TTS space {self.space} failed: {str(e)}") from e
+        return SpaceJob(job, self.space, len(text))
+
+    def synthesize(self, text, ref_audio_path, ref_text):
+        return self.submit(text, ref_audio_path, ref_text).audio()
+
+    def close(self) -> None:
+        with self._client_lock:
+            for client in self._clients:
+                try:
+                    client.close()
+                except Exception:
+                    pass
+            self._clients = []
+
+
+class EndpointBackend(TTSBackend):
+    """
+    A self-hosted HTTP endpoint: POST <url>/synthesize_speech returns the WAV body.
+
+    The request is JSON {text, ref_audio_base64, ref_text}, as served by
+    indicf5/modal_deploy.py (Modal or --local) and by mock_upstream.py.
+    """
+
+    name = "endpoint"
+    recorded_by_transport = True
+
+    def __init__(self, endpoint_url: Optional[str] = None, request_manager: Optional[RequestManager] = None):
+        endpoint_url = endpoint_url or get_base_url("tts")
+        if not endpoint_url:
+            raise ValueError("Endpoint backend needs an endpoint URL (or VANGMAYA_TTS_BASE_URL)")
+        self.endpoint_url = endpoint_url.rstrip('/')
+        self.request_manager = request_manager or RequestManager(service="tts", base_url=self.endpoint_url)
+
+    @property
+    def identity(self) -> str:
+        # Staging and production (or two model versions) must not share cached audio
+        return f"{self.name}:{self.endpoint_url}"
+
+    def warm_up(self) -> None:
+        self.request_manager.probe('/health')
+
+    def synthesize(self, text, ref_audio_path, ref_text):
+        with span('file.read_base64', **{'file.path': ref_audio_path}):
+            with open(ref_audio_path, 'rb') as f:
+                ref_audio_base64 = base64.b64encode(f.read()).decode('utf-8')
+
+        response = self.request_manager.post(
+            url=self.request_manager.url_for('/synthesize_speech'),
+            json={
+                "text": text,
+                "ref_audio_base64": ref_audio_base64,
+                "ref_text": ref_text
+            }
+        )
+        return AudioBuffer.from_bytes(
+            response.content, format_for_content_type(response.headers.get('Content-Type')))
+
+    def close(self) -> None:
+        self.request_manager.close()
+
+
+def _load_indicf5(device: Optional[str] = None):
+    # Shares the loading logic of the self-hosted deployment
+    from indicf5.modal_deploy import load_model
+    return load_model(device)
+
+
+class InProcessBackend(TTSBackend):
+    """
+    Runs the model inside this process on a dedicated worker thread.
+
+    The engine is loaded once, on the worker, the first time it is needed
+    (or right away with preload=True). Calls are serialized on that thread,
+    so the engine never sees concurrent use. Any callable with the IndicF5
+    signature engine(text, ref_audio_path=..., ref_text=...) -> waveform
+    works as an engine.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        engine_factory: Optional[Callable[[], Callable]] = None,
+        device: Optional[str] = None,
+        preload: bool = False
+    ):
+        self.engine_factory = engine_factory or (lambda: _load_indicf5(device or os.getenv('VANGMAYA_TTS_DEVICE')))
+        self._engine = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tts-engine')
+        if preload:
+            self._executor.submit(self._get_engine)
+
+    def _get_engine(self):
+        if self._engine is None:
+            logger.info("Loading in-process TTS engine...")
+            with span('tts.engine_load'):
+                self._engine = self.engine_factory()
+        return self._engine
+
+    def warm_up(self) -> None:
+        self._executor.submit(self._get_engine).result()
+
+    def _run(self, text, ref_audio_path, ref_text):
+        from indicf5.modal_deploy import synthesize
+        with span('tts.inference', **{'tts.text_chars': len(text)}):
+            return synthesize(self._get_engine(), text, ref_audio_path, ref_text)
+
+    def synthesize(self, text, ref_audio_path, ref_text):
+        from indicf5.modal_deploy import SAMPLE_RATE
+
+        # Run in a copy of the caller's context so the worker's spans join the job's trace
+        context = contextvars.copy_context()
+        audio = self._executor.submit(context.run, self._run, text, ref_audio_path, ref_text).result()
+        # The waveform is handed on as is; it is only encoded if someone asks for bytes
+        return AudioBuffer(samples=audio, sample_rate=SAMPLE_RATE)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._engine = None
+
+
+BACKENDS = {
+    HostedSpaceBackend.name: HostedSpaceBackend,
+    EndpointBackend.name: EndpointBackend,
+    InProcessBackend.name: InProcessBackend,
+}
+
+
+def create_backend(name: Optional[str] = None, endpoint_url: Optional[str] = None) -> TTSBackend:
+    """
+    Create a TTS backend by name.
+
+    The name comes from the argument or VANGMAYA_TTS_BACKEND; without
+    either, an endpoint URL selects the endpoint backend and otherwise
+    the hosted space is used.
+    """
+    endpoint_url = endpoint_url or get_base_url("tts")
+    name = (name or os.getenv('VANGMAYA_TTS_BACKEND') or
+            (EndpointBackend.name if endpoint_url else HostedSpaceBackend.name)).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown TTS backend {name}. Choose from: {', '.join(BACKENDS)}")
+    if name == EndpointBackend.name:
+        return EndpointBackend(endpoint_url)
+    return BACKENDS[name]()
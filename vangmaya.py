@@ -0,0 +1,30 @@
+import argparse
+import logging
+import sys
+from typing import List, Optional
+
+import batch
+import workers
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog='vangmaya', description="Vangmaya audio translation tools")
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log progress at INFO level')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    batch_parser = commands.add_parser('batch', help='Translate a directory or manifest of audio files')
+    batch.add_arguments(batch_parser)
+    batch_parser.set_defaults(handler=batch.main)
+
+    worker_parser = commands.add_parser('worker', help='Run queue worker processes')
+    workers.add_arguments(worker_parser)
+    worker_parser.set_defaults(handler=workers.main)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,9 +1,15 @@
 import base64
+import mmap
+import os
 import requests
 import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from src.audio import encode_for_upload
+from src.cache import MemoryCache, StageCache, file_digest, shared_cache
 from src.request_manager import RequestManager
+from src.tracing import span
+from src.transport import Transport, UpstreamError
 
 logger = logging.getLogger(__name__)
 
@@ -33,25 +39,63 @@ class VoiceToTextConverter:
         "doi": "Dogri"
     }
 
-    def __init__(self):
-        """Initialize the converter with request manager optimized for audio processing."""
-        self.API_URL = 'https://admin.models.ai4bharat.org/inference/transcribe'
+    # "raw" sends the file as uploaded; the others re-encode it as 16 kHz mono first
+    UPLOAD_FORMATS = ("raw", "flac", "wav")
+
+    def __init__(
+        self,
+        transport: Optional[Transport] = None,
+        base_url: Optional[str] = None,
+        upload_format: Optional[str] = None
+    ):
+        """
+        Initialize the converter with request manager optimized for audio processing.
+
+        Args:
+            transport: Transport for the ASR requests (see src/transport.py)
+            base_url: ASR server base URL
+            upload_format: How audio is uploaded; defaults to
+                VANGMAYA_ASR_UPLOAD_FORMAT or "raw". "flac" is lossless and
+                usually several times smaller, if the upstream accepts it.
+        """
         logger.info("Initializing VoiceToTextConverter...")
+        self.upload_format = (upload_format or os.getenv('VANGMAYA_ASR_UPLOAD_FORMAT', 'raw')).lower()
+        if self.upload_format not in self.UPLOAD_FORMATS:
+            raise ValueError(f"Unknown upload format {self.upload_format}. Choose from: {', '.join(self.UPLOAD_FORMATS)}")
         self.request_manager = RequestManager(
-            timeout=30  # Longer timeout for audio processing
+            timeout=30,  # Longer timeout for audio processing
+            service="asr",
+            transport=transport,
+            base_url=base_url
         )
-        # Initialize empty cache for frequently used audio
-        self.result_cache = {}
+        self.API_URL = self.request_manager.url_for('/inference/transcribe')
+        # Transcripts keyed by audio content; shared across instances when
+        # VANGMAYA_CACHE is set, otherwise private to this converter
+        self.cache = shared_cache() or StageCache(MemoryCache(max_bytes=16 * 1024 * 1024))
+
+    def _cache_parts(self, audio_file_path: str, source_language: str) -> tuple:
+        """What a transcript depends on: the upstream, the audio content, the language and upload format."""
+        return (self.API_URL, file_digest(audio_file_path), source_language, self.upload_format)
+
+    def warm_up(self) -> None:
+        """Open a pooled connection to the ASR upstream and check it answers."""
+        self.request_manager.probe()
 
     def is_language_supported(self, language_code: str) -> bool:
         """Check if the language code is supported."""
         return language_code in self.SUPPORTED_LANGUAGES
 
     def convert_audio_to_base64(self, audio_file_path: str) -> str:
-        """Convert audio file to base64 string."""
+        """Convert audio file to base64 string, re-encoding it first unless uploading raw."""
         try:
+            if self.upload_format != 'raw':
+                return base64.b64encode(encode_for_upload(audio_file_path, self.upload_format)).decode('utf-8')
             with open(audio_file_path, 'rb') as audio_file:
-                return base64.b64encode(audio_file.read()).decode('utf-8')
+                if os.fstat(audio_file.fileno()).st_size == 0:
+                    return ''
+                # Encode straight from the page cache instead of copying the file into memory first
+                with mmap.mmap(audio_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return base64.b64encode(mapped).decode('utf-8')
         except Exception as e:
             raise Exception(f"Error reading audio file: {str(e)}")
 
@@ -61,14 +105,21 @@ class VoiceToTextConverter:
             raise ValueError(f"Language {source_language} is not supported")
 
         # Check cache first
-        cache_key = f"{audio_file_path}:{source_language}"
-        if cache_key in self.result_cache:
-            return self.result_cache[cache_key]
+        try:
+            cache_parts = self._cache_parts(audio_file_path, source_language)
+        except OSError as e:
+            raise Exception(f"Error reading audio file: {str(e)}")
+        cached, _ = self.cache.get('transcription', *cache_parts)
+        if cached is not None:
+            return cached
 
         try:
             logger.info(f"Processing audio file: {audio_file_path}")
             logger.info(f"Converting audio to base64...")
-            audio_content = self.convert_audio_to_base64(audio_file_path)
+            with span('audio.base64_encode', **{'file.path': audio_file_path,
+                                                'audio.upload_format': self.upload_format}) as encode_span:
+                audio_content = self.convert_audio_to_base64(audio_file_path)
+                encode_span.set_attribute('payload.base64_chars', len(audio_content))
             logger.info(f"Audio conversion successful, sending to API...")
 
             payload = {
@@ -82,6 +133,8 @@ class VoiceToTextConverter:
                 "preProcessors": [],
                 "postProcessors": []
             }
+            if self.upload_format != 'raw':
+                payload["audioFormat"] = self.upload_format
 
             # Headers optimized for audio upload
             base_headers = {
@@ -103,14 +156,14 @@ class VoiceToTextConverter:
             result = response.json()
             
             # Cache successful results
-            self.result_cache[cache_key] = result
+            self.cache.set('transcription', result, *cache_parts)
             
             return result
 
         except requests.exceptions.RequestException as e:
             if hasattr(e.response, 'text'):
-                raise Exception(f"API Error: {e.response.status_code} - {e.response.text}")
-            raise Exception(f"Transcription failed: {str(e)}")
+                raise UpstreamError(f"API Error: {e.response.status_code} - {e.response.text}")
+            raise UpstreamError(f"Transcription failed: {str(e)}")
 
     def get_supported_languages(self) -> Dict[str, str]:
         """Get dictionary of supported languages."""
@@ -0,0 +1,80 @@
+import argparse
+import logging
+import os
+import signal
+import threading
+from typing import Any, Callable, Dict
+
+from src.job_queue import DEFAULT_VISIBILITY_TIMEOUT, Job, JobQueue, WorkerPool
+from src.retention import retention_from_env
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = os.path.join('outputs', 'queue.sqlite3')
+PIPELINE_HANDLER = 'workers:pipeline_handler'
+# Interactive requests jump ahead of bulk work
+INTERACTIVE_PRIORITY = 10
+BATCH_PRIORITY = 0
+
+
+def queue_path() -> str:
+    return os.getenv('VANGMAYA_QUEUE_PATH', DEFAULT_QUEUE_PATH)
+
+
+def enqueue_translation(
+    queue: JobQueue,
+    audio_file_path: str,
+    source_lang: str,
+    target_lang: str,
+    priority: int = BATCH_PRIORITY,
+    output_dir: str = 'outputs'
+) -> str:
+    """Queue one pipeline job; its result is saved under output_dir since it crosses processes."""
+    return queue.enqueue({
+        'audio': os.path.abspath(audio_file_path),
+        'source': source_lang,
+        'target': target_lang,
+        'output_dir': os.path.abspath(output_dir),
+    }, priority=priority)
+
+
+def pipeline_handler() -> Callable[[Job], Dict[str, Any]]:
+    """Build this worker's pipeline once and return the job function."""
+    from audio_translation_pipeline import AudioTranslationPipeline
+    pipeline = AudioTranslationPipeline()
+
+    def handle(job: Job) -> Dict[str, Any]:
+        payload = job.payload
+        result = pipeline.process(
+            audio_file_path=payload['audio'],
+            source_lang=payload['source'],
+            target_lang=payload['target'],
+            job_id=job.id,
+            output_dir=payload.get('output_dir', 'outputs')
+        )
+        return {key: value for key, value in result.items() if key != 'audio'}
+
+    return handle
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--queue', default=None, help=f'Queue database (default: {DEFAULT_QUEUE_PATH})')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: one per core)')
+    parser.add_argument('--visibility-timeout', type=float, default=DEFAULT_VISIBILITY_TIMEOUT,
+                        help='Seconds before a silent worker\'s job is handed to another worker')
+    parser.add_argument('--job-handler', default=PIPELINE_HANDLER, help=argparse.SUPPRESS)
+
+
+def main(args) -> None:
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    pool = WorkerPool(args.queue or queue_path(), args.job_handler, args.processes, args.visibility_timeout)
+    retention = retention_from_env()
+    with pool:
+        try:
+            stopped.wait()
+        except KeyboardInterrupt:
+            pass
+        logger.info("Stopping workers after their current jobs")
+    if retention is not None:
+        retention.stop()